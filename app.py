@@ -1,30 +1,230 @@
 
 import streamlit as st
-import json
 from pathlib import Path
+import shutil
 import sys
-import io
-import contextlib
+import uuid
+from functools import partial
 
 # Add the project root to the Python path to allow imports from other modules
 sys.path.append(str(Path(__file__).parent))
 
 from platforms.shopee_client import ShopeeClient
-from product_processor import clone_single_product
-from config import SHOPEE_PARTNER_ID, SHOPEE_PARTNER_KEY
+from user_manager import load_users
+from product_processor import PIPELINE_STEPS, clone_with_retry
+from config import SHOPEE_PARTNER_ID, SHOPEE_PARTNER_KEY, CLONE_MAX_ATTEMPTS, JOB_POLL_INTERVAL, JOB_SHEET_DIR
+from image_cache import ImageUploadCache
+from product_cache import ProductDetailsCache
+from fanout_processor import clone_to_shops
+from metrics import get_default_metrics
+from job_journal import JobJournal
+from job_queue import JobQueue, JobRunner, FINISHED_STATUSES
+from job_sheet import REQUIRED_COLUMNS, clone_job_sheet, missing_sheet_columns
+from image_preflight import get_default_image_preflight
 
 # --- Helper Functions ---
 
 def load_profiles():
-    """Loads shop profiles from the users.json file."""
-    users_file = Path("users.json")
-    if not users_file.exists():
-        return {}
-    with open(users_file, "r") as f:
-        try:
-            return json.load(f)
-        except json.JSONDecodeError:
-            return {}
+    """Loads shop profiles from st.secrets or the local profile store (cached there, so cheap on every rerun)."""
+    return load_users()
+
+@st.cache_resource
+def get_image_cache():
+    """One image upload cache per server process, shared across reruns and sessions."""
+    return ImageUploadCache()
+
+@st.cache_resource
+def get_details_cache():
+    """Source product details cache shared across reruns and sessions."""
+    return ProductDetailsCache()
+
+def make_client(profile, image_cache=None, details_cache=None):
+    """
+    Creates a Shopee client for a shop profile, sharing the app-wide caches.
+    Job worker threads pass the caches in, as they run outside any script run.
+    """
+    # The app signs with its own partner credentials; the profile's tokens are kept fresh by the shared TokenManager.
+    return ShopeeClient.from_profile(
+        dict(profile, partner_id=int(SHOPEE_PARTNER_ID), partner_key=SHOPEE_PARTNER_KEY),
+        image_cache=image_cache if image_cache is not None else get_image_cache(),
+        details_cache=details_cache if details_cache is not None else get_details_cache()
+    )
+
+# --- Background Jobs ---
+
+def run_clone_job(params, reporter, client_factory, journal):
+    """Job handler: clones one product, streaming the pipeline's log and steps to the job."""
+    profile = load_profiles()[params["profile"]]
+    return clone_with_retry(
+        platform_client=client_factory(profile),
+        source_item_id=params["source_item_id"],
+        image_hosting_url=profile["hosting_url"],
+        shop_code_for_image=params["shop_code"],
+        journal=journal,
+        max_attempts=CLONE_MAX_ATTEMPTS,
+        log=reporter.log,
+        on_step=reporter.step
+    )
+
+def run_fanout_job(params, reporter, client_factory, journal):
+    """Job handler: clones one product into several shops, reporting each shop as it finishes."""
+    profiles = load_profiles()
+    results = []
+    for result in clone_to_shops(
+        source_client=client_factory(profiles[params["source_profile"]]),
+        source_item_id=params["source_item_id"],
+        target_profiles={name: profiles[name] for name in params["target_profiles"]},
+        shop_code_for_image=params["shop_code"],
+        client_factory=client_factory,
+        journal=journal,
+        max_attempts=CLONE_MAX_ATTEMPTS,
+        preflight=get_default_image_preflight()
+    ):
+        reporter.partial(result)
+        results.append(result)
+    return results
+
+def run_sheet_job(params, reporter, client_factory, journal):
+    """Job handler: clones every row of an uploaded job sheet, reporting progress as rows finish."""
+    reporter.log(f"Cloning the rows of {params['name']}...")
+    counts = clone_job_sheet(
+        path=params["path"],
+        profiles=load_profiles(),
+        default_profile=params["default_profile"],
+        client_factory=client_factory,
+        results_path=params["results_path"],
+        journal=journal,
+        max_attempts=CLONE_MAX_ATTEMPTS,
+        on_progress=reporter.partial,
+        preflight=get_default_image_preflight()
+    )
+    reporter.log(f"Done: {counts['succeeded']} cloned, {counts['failed']} failed, {counts['invalid']} invalid row(s).")
+    return counts
+
+def save_job_sheet(uploaded_file):
+    """Saves an uploaded sheet for its background job. Returns (sheet path, results file path)."""
+    directory = Path(JOB_SHEET_DIR)
+    directory.mkdir(exist_ok=True)
+    stem = f"{uuid.uuid4().hex[:8]}_{Path(uploaded_file.name).stem}"
+    path = directory / f"{stem}{Path(uploaded_file.name).suffix.lower()}"
+    with open(path, "wb") as f:
+        shutil.copyfileobj(uploaded_file, f)
+    return str(path), str(directory / f"{stem}_results.csv")
+
+@st.cache_resource
+def get_job_runner():
+    """
+    One job runner per server process. Jobs outlive the browser tab that submitted them and are
+    kept in job_queue.db; with the step journal, a job interrupted by a restart resumes where it stopped.
+    """
+    client_factory = partial(make_client, image_cache=get_image_cache(), details_cache=get_details_cache())
+    journal = JobJournal()
+    handlers = {
+        "clone": partial(run_clone_job, client_factory=client_factory, journal=journal),
+        "fanout": partial(run_fanout_job, client_factory=client_factory, journal=journal),
+        "sheet": partial(run_sheet_job, client_factory=client_factory, journal=journal),
+    }
+    return JobRunner(JobQueue(), handlers).start()
+
+def job_events(job_id):
+    """The job's events so far, fetching only the ones this session hasn't seen yet."""
+    seen = st.session_state.setdefault("job_events", {}).setdefault(job_id, [])
+    seen.extend(get_job_runner().queue.events(job_id, after_seq=seen[-1]["seq"] if seen else 0))
+    return seen
+
+def fanout_row(result):
+    return {
+        "Profile": result["profile"],
+        "Status": "✅ success" if result["status"] == "success" else f"❌ {result['failed_step'] or 'error'}",
+        "New Item ID": result["new_item_id"],
+        "Error": result["error"] or "",
+        "Time (s)": round(result["elapsed"], 2),
+    }
+
+def show_job(job):
+    """Renders one job's progress, log and outcome."""
+    queue = get_job_runner().queue
+    events = job_events(job["id"])
+    params = job["params"]
+
+    if job["status"] == "queued":
+        st.caption(f"Waiting for a worker ({queue.position(job['id'])} job(s) ahead).")
+        if st.button("Cancel", key=f"cancel-{job['id']}"):
+            queue.cancel(job["id"])
+            st.rerun(scope="fragment")
+    elif job["status"] == "cancelled":
+        st.caption("Cancelled before it started.")
+
+    if job["kind"] == "clone":
+        if job["status"] == "running" and job["step"] in PIPELINE_STEPS:
+            index = PIPELINE_STEPS.index(job["step"])
+            st.progress(index / len(PIPELINE_STEPS), text=f"Step {index + 1}/{len(PIPELINE_STEPS)}: {job['step']}")
+        result = job["result"]
+        if result:
+            if result["status"] == "success":
+                st.success(f"Cloning process completed successfully! New Item ID: {result['new_item_id']}", icon="✅")
+            else:
+                st.error(f"Cloning failed at the '{result['failed_step']}' step: {result['error']}", icon="❌")
+            st.caption("Step timings: " + ", ".join(f"{step} {seconds * 1000:.0f} ms" for step, seconds in result["timings"].items()))
+    elif job["kind"] == "sheet":
+        progress = ([event["data"] for event in events if event["kind"] == "result"] or [job["result"]])[-1]
+        if progress:
+            st.caption(f"{progress['rows']} row(s) read: {progress['succeeded']} cloned, {progress['failed']} failed, "
+                       f"{progress['invalid']} invalid ({progress['elapsed']:.0f}s).")
+        results_path = Path(params["results_path"])
+        if results_path.exists():
+            # Rows are appended as they finish, so this is a snapshot while the job runs
+            st.download_button(
+                "Download results (CSV)" if job["status"] in FINISHED_STATUSES else "Download results so far (CSV)",
+                data=results_path.read_bytes(),
+                file_name=f"{Path(params['name']).stem}_results.csv",
+                mime="text/csv",
+                key=f"results-{job['id']}-{progress['rows'] if progress else 0}"
+            )
+    else:
+        # One row per shop: a job requeued after a restart reports its shops again, and the latest report wins
+        rows = list({event["data"]["profile"]: fanout_row(event["data"])
+                     for event in events if event["kind"] == "result"}.values())
+        total = len(params["target_profiles"])
+        if job["status"] == "running":
+            st.progress(len(rows) / total, text=f"{len(rows)}/{total} shops done")
+        if rows:
+            st.dataframe(rows, use_container_width=True)
+        if job["status"] == "done":
+            succeeded = sum(1 for row in rows if row["Status"].startswith("✅"))
+            if succeeded == len(rows):
+                st.success(f"Cloned into all {succeeded} shops.", icon="✅")
+            else:
+                st.error(f"Cloned into {succeeded} of {len(rows)} shops. See the table above for errors.", icon="❌")
+
+    if job["status"] == "failed":
+        st.error(f"An unexpected error occurred during the process: {job['error']}")
+    log_lines = [event["message"] for event in events if event["kind"] == "log"]
+    if log_lines:
+        st.code("\n".join(log_lines), language="log")
+
+def show_jobs(owner):
+    """Lists this session's recent jobs, refreshing while any of them is still queued or running."""
+    jobs = get_job_runner().queue.list_jobs(owner=owner, limit=10)
+    if not jobs:
+        st.caption("Jobs you start appear here.")
+        return
+    active = any(job["status"] not in FINISHED_STATUSES for job in jobs)
+    if st.session_state.get("jobs_active") and not active:
+        st.session_state["jobs_active"] = False
+        st.rerun() # Stop polling now that everything has finished
+    for job in jobs:
+        icon = {"queued": "🕒", "running": "⏳", "done": "✅", "failed": "❌", "cancelled": "🚫"}[job["status"]]
+        if job["status"] == "done" and job["kind"] == "clone" and job["result"]["status"] != "success":
+            icon = "❌"
+        params = job["params"]
+        if job["kind"] == "sheet":
+            title = f"{icon} #{job['id']} · job sheet {params['name']}"
+        else:
+            title = f"{icon} #{job['id']} · product {params['source_item_id']} → " + (
+                params["profile"] if job["kind"] == "clone" else f"{len(params['target_profiles'])} shops")
+        with st.expander(title, expanded=job["status"] not in FINISHED_STATUSES or job is jobs[0]):
+            show_job(job)
 
 # --- Streamlit UI ---
 
@@ -33,6 +233,20 @@ st.title("🚀 Shopee Product Cloner")
 
 st.info("This tool clones a Shopee product, replacing its cover image based on a naming convention.")
 
+with st.sidebar:
+    cache_stats = get_details_cache().stats
+    st.caption(f"Cached source products: {cache_stats['entries']} (hits: {cache_stats['hits']}, misses: {cache_stats['misses']})")
+    if st.button("Clear cached product data", help="Forces source products to be fetched again, e.g. after editing them on Shopee."):
+        get_details_cache().clear()
+        st.toast("Product cache cleared.")
+
+    st.download_button(
+        "Download metrics (Prometheus)",
+        data=get_default_metrics().to_prometheus(),
+        file_name="metrics.prom",
+        help="Request latency per API path, errors by Shopee error code, retries and bytes transferred since the server started."
+    )
+
 # --- Profile Selection ---
 profiles = load_profiles()
 
@@ -74,49 +288,84 @@ with col2:
 st.markdown("---বাস")
 st.subheader("**Step 3: Run the Cloner**")
 
+# Jobs are listed per browser session; the ID lives in the URL so a refresh keeps showing them.
+if "session" not in st.query_params:
+    st.query_params["session"] = uuid.uuid4().hex[:12]
+session_owner = st.query_params["session"]
+
 if st.button("✨ Clone Product", type="primary", use_container_width=True):
     if not source_item_id_str or not shop_code_for_image:
         st.warning("Please provide both a Source Product ID and a Shop Code before starting.", icon="⚠️")
     elif not source_item_id_str.isdigit():
         st.error("The Product ID must be a number.", icon="❌")
     else:
-        source_item_id = int(source_item_id_str)
-        selected_profile = profiles[selected_profile_name]
-
-        # Prepare client
-        client = ShopeeClient(
-            partner_id=int(SHOPEE_PARTNER_ID),
-            partner_key=SHOPEE_PARTNER_KEY,
-            access_token=selected_profile["access_token"],
-            shop_id=int(selected_profile["shop_id"])
-        )
-
-        st.info(f"Starting the cloning process for Product ID: {source_item_id}...", icon="⏳")
-        
-        log_placeholder = st.empty()
-        log_placeholder.text("Logs will appear here...")
-
-        try:
-            # Redirect stdout to a string buffer to capture logs
-            log_stream = io.StringIO()
-            with contextlib.redirect_stdout(log_stream):
-                clone_single_product(
-                    platform_client=client,
-                    source_item_id=source_item_id,
-                    image_hosting_url=selected_profile["image_hosting_url"],
-                    shop_code_for_image=shop_code_for_image
-                )
-            
-            # Display the captured logs
-            log_output = log_stream.getvalue()
-            log_placeholder.code(log_output, language="log")
-
-            if "🎉 Product cloning process completed! 🎉" in log_output:
-                st.success("Cloning process completed successfully!", icon="✅")
-            else:
-                st.error("The process finished, but an error may have occurred. Please check the logs above.", icon="❌")
+        job_id = get_job_runner().submit("clone", {
+            "profile": selected_profile_name,
+            "source_item_id": int(source_item_id_str),
+            "shop_code": shop_code_for_image,
+        }, owner=session_owner)
+        st.toast(f"Cloning product {source_item_id_str} queued as job #{job_id}.", icon="⏳")
+
+
+# --- Fan-out ---
+st.markdown("---")
+st.subheader("**Optional: Clone into multiple shops**")
+st.caption("Fetches the source product from the shop selected in Step 1 once, then clones it into every shop below at the same time.")
+
+target_profile_names = st.multiselect(
+    "Target Shop Profiles",
+    profile_names,
+    help="Each selected shop gets its own copy of the product, using that shop's image hosting URL."
+)
+
+if st.button("🚚 Clone into Selected Shops", use_container_width=True):
+    if not source_item_id_str or not shop_code_for_image or not target_profile_names:
+        st.warning("Please provide a Source Product ID, a Shop Code and at least one target shop.", icon="⚠️")
+    elif not source_item_id_str.isdigit():
+        st.error("The Product ID must be a number.", icon="❌")
+    else:
+        job_id = get_job_runner().submit("fanout", {
+            "source_profile": selected_profile_name,
+            "source_item_id": int(source_item_id_str),
+            "target_profiles": target_profile_names,
+            "shop_code": shop_code_for_image,
+        }, owner=session_owner)
+        st.toast(f"Cloning into {len(target_profile_names)} shops queued as job #{job_id}.", icon="⏳")
+
+
+# --- Job Sheet ---
+st.markdown("---")
+st.subheader("**Optional: Import a job sheet**")
+st.caption(
+    "Upload a CSV or Excel sheet with one product per row: `source_item_id`, `shop_code` and, optionally, "
+    "`profile` (rows without one use the shop selected in Step 1). Invalid rows are listed in the results file."
+)
+
+job_sheet = st.file_uploader("Job Sheet", type=["csv", "xlsx"])
+
+if st.button("📄 Clone Sheet Rows", use_container_width=True):
+    if job_sheet is None:
+        st.warning("Please upload a job sheet first.", icon="⚠️")
+    else:
+        sheet_path, results_path = save_job_sheet(job_sheet)
+        missing_columns = missing_sheet_columns(sheet_path)
+        if missing_columns:
+            st.error(f"The sheet needs the columns {', '.join(REQUIRED_COLUMNS)}; missing: {', '.join(missing_columns)}.", icon="❌")
+        else:
+            job_id = get_job_runner().submit("sheet", {
+                "name": job_sheet.name,
+                "path": sheet_path,
+                "results_path": results_path,
+                "default_profile": selected_profile_name,
+            }, owner=session_owner)
+            st.toast(f"Job sheet {job_sheet.name} queued as job #{job_id}.", icon="⏳")
+
 
-        except Exception as e:
-            st.error(f"An unexpected error occurred during the process: {e}")
-            st.exception(e)
+# --- Jobs ---
+st.markdown("---")
+st.subheader("**Your Jobs**")
+st.caption("Jobs run in the background: you can keep working, start more jobs or refresh the page while they run.")
 
+jobs_active = any(job["status"] not in FINISHED_STATUSES for job in get_job_runner().queue.list_jobs(owner=session_owner, limit=10))
+st.session_state["jobs_active"] = jobs_active
+st.fragment(show_jobs, run_every=JOB_POLL_INTERVAL if jobs_active else None)(session_owner)
@@ -1,23 +1,15 @@
 # auth_util.py: Shopee OAuth2.0 Authorization Utility
 
 import time
-import hmac
-import hashlib
 import rich
 
-from config import SHOPEE_API_V2_URL, REDIRECT_URL
-from platforms.shopee_client import ShopeeClient
-from user_manager import load_users, save_users
+from config import REDIRECT_URL
+from platforms.shopee_signer import get_signer
+from user_manager import save_user
 
 def generate_auth_url(partner_id, partner_key):
     """Generates the authorization URL for a user to grant access."""
-    timestamp = int(time.time())
-    full_path = "/api/v2/shop/auth_partner"
-    base_string = f"{partner_id}{full_path}{timestamp}"
-    sign = hmac.new(partner_key.encode('utf-8'), base_string.encode('utf-8'), hashlib.sha256).hexdigest()
-    
-    url = f"{SHOPEE_API_V2_URL.rstrip('/')}{full_path}?partner_id={partner_id}&redirect={REDIRECT_URL}&timestamp={timestamp}&sign={sign}"
-    return url
+    return get_signer(partner_id, partner_key).auth_partner_url(REDIRECT_URL)
 
 if __name__ == "__main__":
     rich.print("[bold green]--- Shopee Shop Authorization Utility ---[/bold green]")
@@ -44,6 +36,7 @@ if __name__ == "__main__":
         exit()
 
     rich.print("\n[bold yellow]Step 2: Acquiring Access Token...[/bold yellow]")
+    from platforms.shopee_client import ShopeeClient # Loads requests; not needed for the prompts above
     client = ShopeeClient(partner_id=partner_id_input, partner_key=partner_key_input)
     token_data = client.get_access_token(auth_code=auth_code, shop_id=shop_id_input)
 
@@ -78,16 +71,40 @@ if __name__ == "__main__":
     username = input("Enter a local username for this profile (e.g., 'my_sg_shop'): ")
     hosting_url = input(f"Enter the image hosting URL for {username} (e.g., https://unisiashop.com/): ")
 
-    users = load_users()
-    users[username] = {
+    profile = {
         "partner_id": partner_id_input,
         "partner_key": partner_key_input,
         "shop_id": shop_id_input,
         "shop_name": shop_name,
         "access_token": access_token,
         "refresh_token": refresh_token,
-        "hosting_url": hosting_url.rstrip('/') # Ensure no trailing slash
+        "expire_at": time.time() + int(token_data.get("expire_in", 0)), # Refreshed ahead of this by the TokenManager
+        "hosting_url": hosting_url.rstrip('/'), # Ensure no trailing slash
+        "region": shop_info.get("region")
     }
+    if shop_info.get("merchant_id"): # A China Seller Center shop; its merchant can publish global products
+        profile["merchant_id"] = int(shop_info["merchant_id"])
+        answer = input("\nThis shop belongs to a China Seller Center merchant. Authorize its main account for global products? (y/N): ")
+        if answer.strip().lower() == "y":
+            rich.print("\n[bold yellow]Step 5: Authorize Main Account[/bold yellow]")
+            rich.print("Open the authorization URL again and log in with the merchant's main account:")
+            rich.print(f"[link={auth_url}]{auth_url}[/link]")
+            main_code = input("\nEnter the authorization [bold cyan]code[/bold cyan]: ")
+            try:
+                main_account_id = int(input("Enter the [bold cyan]main_account_id[/bold cyan]: "))
+            except ValueError:
+                main_account_id = None
+                rich.print("[bold red]Invalid main account ID. It must be a number.[/bold red]")
+            main_tokens = client.get_main_account_token(main_code, main_account_id) if main_account_id is not None else None
+            if main_tokens and "access_token" in main_tokens and profile["merchant_id"] in (main_tokens.get("merchant_id_list") or []):
+                profile.update(
+                    merchant_access_token=main_tokens["access_token"],
+                    merchant_refresh_token=main_tokens["refresh_token"],
+                    merchant_expire_at=time.time() + int(main_tokens.get("expire_in", 0)),
+                )
+                rich.print("[bold green]Main account authorized.[/bold green]")
+            else:
+                rich.print("[bold red]Could not authorize the merchant's main account;[/bold red] the profile is saved without it.")
     
-    save_users(users)
-    rich.print(f"\n[bold green]Success![/bold green] Profile [bold cyan]'{username}'[/bold cyan] has been saved to [bold]users.json[/bold].")
+    save_user(username, profile)
+    rich.print(f"\n[bold green]Success![/bold green] Profile [bold cyan]'{username}'[/bold cyan] has been saved.")
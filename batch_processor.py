@@ -0,0 +1,302 @@
+# batch_processor.py: Bulk cloning of many products with a bounded worker pool.
+
+import asyncio
+import csv
+import math
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import rich
+from rich.table import Table
+
+from config import BATCH_MAX_WORKERS
+from product_processor import PIPELINE_STEPS, clone_with_retry, clone_with_retry_async, failed_clone_result, cover_image_url
+
+RESULT_COLUMNS = ["source_item_id", "shop_code", "status", "new_item_id", "failed_step", "error", "attempts", "elapsed"]
+
+def _normalize_job(job):
+    """Accepts a (source_item_id, shop_code) pair or a dict and returns a job dict."""
+    if isinstance(job, dict):
+        source_item_id, shop_code = job["source_item_id"], job["shop_code"]
+    else:
+        source_item_id, shop_code = job
+    return {"source_item_id": int(source_item_id), "shop_code": str(shop_code).strip()}
+
+def load_jobs_from_csv(path):
+    """
+    Reads clone jobs from a CSV file.
+    The file may have a `source_item_id,shop_code` header; otherwise the first two columns are used.
+    """
+    jobs = []
+    with open(path, newline="", encoding="utf-8-sig") as f:
+        rows = list(csv.reader(f))
+    if rows and rows[0] and not rows[0][0].strip().isdigit():
+        rows = rows[1:] # Skip the header row
+    for line_no, row in enumerate(rows, start=1):
+        if not row or not "".join(row).strip():
+            continue
+        if len(row) < 2 or not row[0].strip().isdigit() or not row[1].strip():
+            rich.print(f"[yellow]Skipping invalid row {line_no}: {row}[/yellow]")
+            continue
+        jobs.append(_normalize_job((row[0].strip(), row[1])))
+    return jobs
+
+def _failed_result(job, step, error):
+    return failed_clone_result(job["source_item_id"], job["shop_code"], step, error)
+
+def _run_job(platform_client, job, image_hosting_url, source_product_data=None, journal=None, max_attempts=1):
+    """Runs the clone pipeline for one job, turning unexpected exceptions into a failed result."""
+    started = time.perf_counter()
+    try:
+        result = clone_with_retry(
+            platform_client=platform_client,
+            source_item_id=job["source_item_id"],
+            image_hosting_url=image_hosting_url,
+            shop_code_for_image=job["shop_code"],
+            journal=journal,
+            max_attempts=max_attempts,
+            verbose=False,
+            source_product_data=source_product_data
+        )
+    except Exception as e:
+        result = _failed_result(job, None, f"{type(e).__name__}: {e}")
+    result["elapsed"] = time.perf_counter() - started
+    return result
+
+def _jobs_needing_source(platform_client, jobs, journal):
+    """Drops jobs whose item was already created by an earlier run; they don't need the source data."""
+    if journal is None:
+        return jobs
+    shop_id = getattr(platform_client, "shop_id", None)
+    return [
+        job for job in jobs
+        if "create" not in journal.completed_steps(job["source_item_id"], job["shop_code"], shop_id)
+    ]
+
+def prefetch_source_details(platform_client, jobs):
+    """
+    Fetches the source data of every distinct source item in as few calls as possible.
+    Returns (details, missing) keyed by item_id, or empty dicts if the client has no batched fetch.
+    """
+    if not hasattr(platform_client, "get_product_details_batch"):
+        return {}, {}
+    return platform_client.get_product_details_batch(job["source_item_id"] for job in jobs)
+
+def preflight_cover_images(preflight, jobs, details, image_hosting_url):
+    """
+    Checks the cover image of every job whose source details are known, all URLs at once.
+    Returns {job index: {"source_item_id", "item_sku", "shop_code", "url"}} for jobs whose image is missing.
+    """
+    urls = {}
+    for index, job in enumerate(jobs):
+        item = details.get(job["source_item_id"])
+        if item and item.get("item_sku"):
+            urls[index] = cover_image_url(image_hosting_url, item["item_sku"], job["shop_code"])
+    found = preflight.check(urls.values())
+    return {
+        index: {"source_item_id": jobs[index]["source_item_id"], "item_sku": details[jobs[index]["source_item_id"]]["item_sku"],
+                "shop_code": jobs[index]["shop_code"], "url": url}
+        for index, url in urls.items() if found.get(url) is False
+    }
+
+def _skipped_result(job, missing, missing_images, index):
+    """The failed result of a job that is not run because its source or its cover image is missing, else None."""
+    if job["source_item_id"] in missing:
+        result = _failed_result(job, "fetch", f"Failed to fetch source product ({missing[job['source_item_id']]}).")
+    elif index in missing_images:
+        result = _failed_result(job, "preflight", f"Cover image not found at {missing_images[index]['url']}")
+    else:
+        return None
+    result["elapsed"] = 0.0
+    return result
+
+def run_batch(platform_client, jobs, image_hosting_url, max_workers=BATCH_MAX_WORKERS, on_result=None,
+              journal=None, max_attempts=1, preflight=None):
+    """
+    Clones every job using a pool of `max_workers` threads.
+    Each job is tried up to `max_attempts` times; with a `journal` (JobJournal), a re-run of the
+    same batch skips every step that already finished.
+    With a `preflight` (ImagePreflight), every cover image is checked on the image host first and
+    jobs whose image is missing fail without any upload or create call; stats["missing_images"] lists them.
+    `on_result` is called with each result as soon as it finishes.
+    Returns (results, stats) where results follow the input order.
+    """
+    jobs = [_normalize_job(job) for job in jobs]
+    results = [None] * len(jobs)
+    started = time.perf_counter()
+
+    # Multi-item runs read all source items up front with batched calls instead of one call per job.
+    # The pre-flight needs each item's SKU, so it always reads them up front.
+    details, missing = {}, {}
+    prefetch_elapsed = None
+    pending = _jobs_needing_source(platform_client, jobs, journal)
+    if pending and (preflight is not None or len({job["source_item_id"] for job in pending}) > 1):
+        details, missing = prefetch_source_details(platform_client, pending)
+        prefetch_elapsed = time.perf_counter() - started
+
+    missing_images, preflight_elapsed = {}, None
+    if preflight is not None:
+        preflight_started = time.perf_counter()
+        missing_images = preflight_cover_images(preflight, jobs, details, image_hosting_url)
+        preflight_elapsed = time.perf_counter() - preflight_started
+
+    with ThreadPoolExecutor(max_workers=max(1, max_workers)) as executor:
+        futures = {}
+        for index, job in enumerate(jobs):
+            result = _skipped_result(job, missing, missing_images, index)
+            if result is not None:
+                results[index] = result
+                if on_result:
+                    on_result(result)
+                continue
+            future = executor.submit(_run_job, platform_client, job, image_hosting_url,
+                                     details.get(job["source_item_id"]), journal, max_attempts)
+            futures[future] = index
+        for future in as_completed(futures):
+            result = future.result()
+            results[futures[future]] = result
+            if on_result:
+                on_result(result)
+
+    stats = summarize_results(results, time.perf_counter() - started)
+    stats.update(prefetch_elapsed=prefetch_elapsed, preflight_elapsed=preflight_elapsed,
+                 missing_images=list(missing_images.values()))
+    return results, stats
+
+async def _run_job_async(platform_client, job, image_hosting_url, source_product_data, semaphore, journal, max_attempts):
+    """Async variant of _run_job; `semaphore` bounds how many items are in the pipeline at once."""
+    async with semaphore:
+        started = time.perf_counter()
+        try:
+            result = await clone_with_retry_async(
+                platform_client=platform_client,
+                source_item_id=job["source_item_id"],
+                image_hosting_url=image_hosting_url,
+                shop_code_for_image=job["shop_code"],
+                journal=journal,
+                max_attempts=max_attempts,
+                verbose=False,
+                source_product_data=source_product_data
+            )
+        except Exception as e:
+            result = _failed_result(job, None, f"{type(e).__name__}: {e}")
+        result["elapsed"] = time.perf_counter() - started
+        return result
+
+async def run_batch_async(platform_client, jobs, image_hosting_url, max_concurrency=BATCH_MAX_WORKERS, on_result=None,
+                          journal=None, max_attempts=1, preflight=None):
+    """
+    Async variant of run_batch for async clients (e.g. AsyncShopeeClient).
+    Runs up to `max_concurrency` items at once on the current event loop instead of a thread pool.
+    """
+    jobs = [_normalize_job(job) for job in jobs]
+    results = [None] * len(jobs)
+    started = time.perf_counter()
+
+    details, missing = {}, {}
+    prefetch_elapsed = None
+    pending = _jobs_needing_source(platform_client, jobs, journal)
+    if (pending and (preflight is not None or len({job["source_item_id"] for job in pending}) > 1)
+            and hasattr(platform_client, "get_product_details_batch")):
+        details, missing = await platform_client.get_product_details_batch(job["source_item_id"] for job in pending)
+        prefetch_elapsed = time.perf_counter() - started
+
+    missing_images, preflight_elapsed = {}, None
+    if preflight is not None:
+        preflight_started = time.perf_counter()
+        # The probes run on the pooled (blocking) image host session, off the event loop.
+        missing_images = await asyncio.to_thread(preflight_cover_images, preflight, jobs, details, image_hosting_url)
+        preflight_elapsed = time.perf_counter() - preflight_started
+
+    semaphore = asyncio.Semaphore(max(1, max_concurrency))
+
+    async def run(index, job):
+        result = _skipped_result(job, missing, missing_images, index)
+        if result is None:
+            result = await _run_job_async(platform_client, job, image_hosting_url, details.get(job["source_item_id"]),
+                                          semaphore, journal, max_attempts)
+        results[index] = result
+        if on_result:
+            on_result(result)
+
+    await asyncio.gather(*(run(index, job) for index, job in enumerate(jobs)))
+
+    stats = summarize_results(results, time.perf_counter() - started)
+    stats.update(prefetch_elapsed=prefetch_elapsed, preflight_elapsed=preflight_elapsed,
+                 missing_images=list(missing_images.values()))
+    return results, stats
+
+def _percentile(values, pct):
+    """Nearest-rank percentile of a list of numbers."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(1, math.ceil(pct / 100 * len(ordered)))
+    return ordered[rank - 1]
+
+def summarize_results(results, elapsed):
+    """Computes throughput and p50/p95 latency per pipeline step."""
+    succeeded = sum(1 for r in results if r["status"] == "success")
+    step_latency = {}
+    for step in PIPELINE_STEPS:
+        samples = [r["timings"][step] for r in results if step in r["timings"]]
+        step_latency[step] = {
+            "count": len(samples),
+            "p50": _percentile(samples, 50),
+            "p95": _percentile(samples, 95),
+        }
+    item_samples = [r["elapsed"] for r in results if "elapsed" in r]
+    return {
+        "total": len(results),
+        "succeeded": succeeded,
+        "failed": len(results) - succeeded,
+        "elapsed": elapsed,
+        "items_per_sec": len(results) / elapsed if elapsed > 0 else 0.0,
+        "item_latency": {"p50": _percentile(item_samples, 50), "p95": _percentile(item_samples, 95)},
+        "step_latency": step_latency,
+    }
+
+def write_results_csv(results, path):
+    """Writes the per-item result table to a CSV file."""
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=RESULT_COLUMNS, extrasaction="ignore")
+        writer.writeheader()
+        writer.writerows(results)
+
+def _fmt_ms(seconds):
+    return "-" if seconds is None else f"{seconds * 1000:.0f} ms"
+
+def print_batch_report(results, stats):
+    """Prints the per-item result table and throughput numbers."""
+    table = Table(title="Batch Clone Results")
+    for column in ("Source ID", "Shop Code", "Status", "New Item ID", "Error", "Time"):
+        table.add_column(column)
+    for r in results:
+        status = "[green]success[/green]" if r["status"] == "success" else f"[red]failed ({r['failed_step'] or 'error'})[/red]"
+        table.add_row(str(r["source_item_id"]), r["shop_code"], status, str(r["new_item_id"] or "-"), r["error"] or "", _fmt_ms(r.get("elapsed")))
+    rich.print(table)
+    print_stats(stats)
+    print_missing_images(stats.get("missing_images"))
+
+def print_missing_images(missing_images):
+    """Lists the SKUs whose cover image the pre-flight could not find, so they can be uploaded before a re-run."""
+    if not missing_images:
+        return
+    rich.print(f"\n[bold yellow]{len(missing_images)} cover image(s) missing on the image host[/bold yellow] (no Shopee calls were made for these):")
+    for image in missing_images:
+        rich.print(f"  {image['item_sku']} ({image['shop_code']}, source {image['source_item_id']}): [link={image['url']}]{image['url']}[/link]")
+
+def print_stats(stats):
+    """Prints throughput and per-step latency numbers from summarize_results."""
+    rich.print(
+        f"\n[bold]{stats['succeeded']}/{stats['total']} succeeded[/bold] in {stats['elapsed']:.1f}s "
+        f"([bold cyan]{stats['items_per_sec']:.2f} items/sec[/bold cyan], "
+        f"p50 {_fmt_ms(stats['item_latency']['p50'])}, p95 {_fmt_ms(stats['item_latency']['p95'])} per item)"
+    )
+    if stats.get("prefetch_elapsed") is not None:
+        rich.print(f"  batched source fetch took {_fmt_ms(stats['prefetch_elapsed'])}")
+    if stats.get("preflight_elapsed") is not None:
+        rich.print(f"  cover image pre-flight took {_fmt_ms(stats['preflight_elapsed'])}")
+    for step, latency in stats["step_latency"].items():
+        if latency["count"]:
+            rich.print(f"  {step:<10} p50 {_fmt_ms(latency['p50']):>8}   p95 {_fmt_ms(latency['p95']):>8}   (n={latency['count']})")
@@ -0,0 +1,193 @@
+# benchmarks/bench_pipeline.py: End-to-end throughput benchmarks against the mock Shopee server.
+#
+# Usage:
+#   python benchmarks/bench_pipeline.py                       # run, save benchmarks/results/<git sha>.json
+#   python benchmarks/bench_pipeline.py --compare benchmarks/results/<old>.json
+#
+# Each scenario clones products through the real client and pipeline code against a local
+# MockShopeeServer, so numbers reflect our overhead plus the simulated API latency only.
+
+import argparse
+import asyncio
+import json
+import platform
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+# Add the project root to the Python path to allow imports from other modules
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+import rich
+
+from mock_shopee_server import MockShopeeServer
+from platforms.shopee_client import ShopeeClient
+from platforms.shopee_async_client import AsyncShopeeClient
+from platforms.rate_limiter import RequestScheduler
+from metrics import MetricsRegistry
+import batch_processor
+import fanout_processor
+from product_processor import clone_single_product
+
+RESULTS_DIR = Path(__file__).resolve().parent / "results"
+# A scenario regresses when throughput drops, or p95 latency grows, by more than this fraction.
+DEFAULT_THRESHOLD = 0.10
+
+def _unlimited_scheduler():
+    """Scheduler that never paces, so the benchmark measures the pipeline rather than our quotas."""
+    return RequestScheduler(partner_qps=1e9, shop_qps=1e9, path_qps={}, safety_factor=1.0)
+
+def _client(mock, profile, scheduler, metrics):
+    return ShopeeClient.from_profile(profile, base_url=mock.api_url, scheduler=scheduler, metrics=metrics)
+
+def _request_latency(metrics):
+    """p50/p95 request latency per API path from a metrics registry."""
+    return {
+        h["labels"]["path"]: {"p50": h["p50"], "p95": h["p95"], "count": h["count"]}
+        for h in metrics.snapshot()["histograms"] if h["name"] == "shopee_request_duration_seconds"
+    }
+
+def _summary(stats, metrics):
+    return {
+        "total": stats["total"],
+        "succeeded": stats["succeeded"],
+        "items_per_sec": stats["items_per_sec"],
+        "item_p50": stats["item_latency"]["p50"],
+        "item_p95": stats["item_latency"]["p95"],
+        "step_latency": stats["step_latency"],
+        "request_latency": _request_latency(metrics),
+    }
+
+def bench_single(mock, items, scheduler):
+    """clone_single_product, one item after another."""
+    metrics = MetricsRegistry()
+    client = _client(mock, mock.make_profile(1001), scheduler, metrics)
+    started = time.perf_counter()
+    results = []
+    for item_id in range(1, items + 1):
+        item_started = time.perf_counter()
+        result = clone_single_product(client, item_id, mock.image_url, "ONE", verbose=False)
+        result["elapsed"] = time.perf_counter() - item_started
+        results.append(result)
+    return _summary(batch_processor.summarize_results(results, time.perf_counter() - started), metrics)
+
+def bench_batch(mock, items, workers, scheduler):
+    """run_batch over `items` distinct source items with a pool of `workers` threads."""
+    metrics = MetricsRegistry()
+    client = _client(mock, mock.make_profile(1002), scheduler, metrics)
+    jobs = [(item_id, "ONE") for item_id in range(1, items + 1)]
+    _, stats = batch_processor.run_batch(client, jobs, mock.image_url, max_workers=workers)
+    return _summary(stats, metrics)
+
+def bench_batch_async(mock, items, concurrency, scheduler):
+    """run_batch_async on one event loop with up to `concurrency` items in flight."""
+    metrics = MetricsRegistry()
+    profile = mock.make_profile(1003)
+
+    async def run():
+        async with AsyncShopeeClient(profile["partner_id"], profile["partner_key"], profile["access_token"], profile["shop_id"],
+                                     base_url=mock.api_url, scheduler=scheduler, metrics=metrics) as client:
+            jobs = [(item_id, "ONE") for item_id in range(1, items + 1)]
+            return await batch_processor.run_batch_async(client, jobs, mock.image_url, max_concurrency=concurrency)
+
+    _, stats = asyncio.run(run())
+    return _summary(stats, metrics)
+
+def bench_fanout(mock, shops, workers, scheduler):
+    """clone_to_shops: one source item into `shops` shops with `workers` shops in flight."""
+    metrics = MetricsRegistry()
+    targets = {f"shop{shop_id}": mock.make_profile(shop_id) for shop_id in range(2001, 2001 + shops)}
+
+    def factory(profile):
+        return _client(mock, profile, scheduler, metrics)
+
+    started = time.perf_counter()
+    results = list(fanout_processor.clone_to_shops(
+        factory(mock.make_profile(2000)), 1, targets, "ONE", client_factory=factory, max_workers=workers
+    ))
+    return _summary(batch_processor.summarize_results(results, time.perf_counter() - started), metrics)
+
+def run_suite(args):
+    scheduler = RequestScheduler() if args.with_rate_limits else _unlimited_scheduler()
+    scenarios = {}
+    with MockShopeeServer(latency=args.latency, jitter=args.jitter, error_rate=args.error_rate,
+                          rate_limit_qps=args.mock_rate_limit, seed=42) as mock:
+        scenarios["single"] = bench_single(mock, min(args.items, 20), scheduler)
+        for concurrency in args.concurrency:
+            scenarios[f"batch_c{concurrency}"] = bench_batch(mock, args.items, concurrency, scheduler)
+            scenarios[f"batch_async_c{concurrency}"] = bench_batch_async(mock, args.items, concurrency, scheduler)
+            scenarios[f"fanout_c{concurrency}"] = bench_fanout(mock, args.shops, concurrency, scheduler)
+    return scenarios
+
+def _git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def compare(current, baseline, threshold):
+    """Prints per-scenario changes against a baseline run. Returns the names of regressed scenarios."""
+    regressions = []
+    for name, now in current["scenarios"].items():
+        before = baseline["scenarios"].get(name)
+        if not before:
+            continue
+        throughput_change = (now["items_per_sec"] - before["items_per_sec"]) / before["items_per_sec"] if before["items_per_sec"] else 0.0
+        p95_change = (now["item_p95"] - before["item_p95"]) / before["item_p95"] if before["item_p95"] and now["item_p95"] else 0.0
+        regressed = throughput_change < -threshold or p95_change > threshold
+        colour = "red" if regressed else "green"
+        rich.print(f"  [{colour}]{name:<22}[/{colour}] items/sec {before['items_per_sec']:8.2f} -> {now['items_per_sec']:8.2f} "
+                   f"({throughput_change:+.0%})   p95 {p95_change:+.0%}")
+        if regressed:
+            regressions.append(name)
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the clone pipeline against a local mock Shopee API.")
+    parser.add_argument("--items", type=int, default=200, help="Items per batch scenario.")
+    parser.add_argument("--shops", type=int, default=20, help="Target shops in the fan-out scenarios.")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 16, 32])
+    parser.add_argument("--latency", type=float, default=0.03, help="Simulated API latency (seconds).")
+    parser.add_argument("--jitter", type=float, default=0.01)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--mock-rate-limit", type=float, default=None, help="Per-shop quota enforced by the mock.")
+    parser.add_argument("--with-rate-limits", action="store_true", help="Pace calls with the configured RequestScheduler quotas.")
+    parser.add_argument("--label", default=None, help="Result file name (defaults to the git commit).")
+    parser.add_argument("--compare", type=Path, default=None, help="Baseline result file to compare against.")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD)
+    args = parser.parse_args()
+
+    scenarios = run_suite(args)
+    label = args.label or _git_commit() or time.strftime("%Y%m%d-%H%M%S")
+    report = {
+        "meta": {
+            "label": label,
+            "git_commit": _git_commit(),
+            "python": platform.python_version(),
+            "timestamp": time.time(),
+            "settings": {k: v for k, v in vars(args).items() if k not in ("compare", "label")},
+        },
+        "scenarios": scenarios,
+    }
+
+    rich.print("\n[bold]Scenario                 items/sec   item p50   item p95[/bold]")
+    for name, result in scenarios.items():
+        rich.print(f"  {name:<22} {result['items_per_sec']:9.2f} {result['item_p50'] * 1000:8.0f} ms {result['item_p95'] * 1000:8.0f} ms"
+                   f"   ({result['succeeded']}/{result['total']} ok)")
+
+    RESULTS_DIR.mkdir(exist_ok=True)
+    result_path = RESULTS_DIR / f"{label}.json"
+    result_path.write_text(json.dumps(report, indent=2, default=str))
+    rich.print(f"\nResults saved to [bold]{result_path}[/bold]")
+
+    if args.compare:
+        rich.print(f"\n[bold]Compared with {args.compare}:[/bold]")
+        regressions = compare(report, json.loads(args.compare.read_text()), args.threshold)
+        if regressions:
+            rich.print(f"[bold red]{len(regressions)} scenario(s) regressed by more than {args.threshold:.0%}.[/bold red]")
+            sys.exit(1)
+        rich.print("[bold green]No regressions.[/bold green]")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+# benchmarks/bench_signer.py: Per-request cost of signing and building Shopee API URLs.
+#
+# Usage:
+#   python benchmarks/bench_signer.py [--calls 50000]
+#
+# Compares ShopeeSigner with the previous implementation, which built a new HMAC from the
+# raw partner key and re-assembled the whole URL on every call.
+
+import argparse
+import hashlib
+import hmac
+import sys
+import time
+from pathlib import Path
+
+# Add the project root to the Python path to allow imports from other modules
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+import rich
+
+from config import SHOPEE_API_V2_URL
+from platforms.shopee_signer import ShopeeSigner
+
+PARTNER_ID = 1000001
+PARTNER_KEY = "shpk" + "0123456789abcdef" * 4
+ACCESS_TOKEN = "4a6f6b656e4a6f6b656e4a6f6b656e4a"
+SHOP_ID = 220012345
+PATHS = ["/product/get_item_base_info", "/media_space/upload_image", "/product/add_item", "/product/unlist_item"]
+
+def legacy_signed_url(partner_id, partner_key, api_path, access_token, shop_id, timestamp):
+    """The per-call signing code this benchmark measures against."""
+    full_path = f"/api/v2{api_path}"
+    api_root = SHOPEE_API_V2_URL.rstrip('/').removesuffix("/api/v2")
+    common_params = f"?partner_id={partner_id}&timestamp={timestamp}"
+    base_string = f"{partner_id}{full_path}{timestamp}{access_token}{shop_id}"
+    sign = hmac.new(partner_key.encode('utf-8'), base_string.encode('utf-8'), hashlib.sha256).hexdigest()
+    return f"{api_root}{full_path}{common_params}&access_token={access_token}&shop_id={shop_id}&sign={sign}"
+
+def measure(label, sign_one, calls):
+    """Runs `calls` signatures round-robin over PATHS and returns ns per call."""
+    timestamp = int(time.time())
+    paths = PATHS * (calls // len(PATHS) + 1)
+    started = time.perf_counter_ns()
+    for i in range(calls):
+        sign_one(paths[i], timestamp + (i & 1023))
+    per_call = (time.perf_counter_ns() - started) / calls
+    rich.print(f"  {label:<36} {per_call:8.0f} ns/call   ({1e9 / per_call:,.0f} calls/sec)")
+    return per_call
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark request signing.")
+    parser.add_argument("--calls", type=int, default=50000)
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per variant; the fastest is reported.")
+    args = parser.parse_args()
+
+    signer = ShopeeSigner(PARTNER_ID, PARTNER_KEY)
+    timestamp = int(time.time())
+    for path in PATHS: # Both implementations must produce the same URL
+        assert signer.signed_url(path, ACCESS_TOKEN, SHOP_ID, timestamp=timestamp) == \
+            legacy_signed_url(PARTNER_ID, PARTNER_KEY, path, ACCESS_TOKEN, SHOP_ID, timestamp)
+
+    rich.print(f"\n[bold]Signing {args.calls:,} requests (best of {args.repeat}):[/bold]")
+    legacy = min(
+        measure("per-call HMAC + URL (previous)",
+                lambda path, ts: legacy_signed_url(PARTNER_ID, PARTNER_KEY, path, ACCESS_TOKEN, SHOP_ID, ts), args.calls)
+        for _ in range(args.repeat)
+    )
+    current = min(
+        measure("ShopeeSigner.signed_url",
+                lambda path, ts: signer.signed_url(path, ACCESS_TOKEN, SHOP_ID, timestamp=ts), args.calls)
+        for _ in range(args.repeat)
+    )
+    rich.print(f"\n[bold green]{legacy / current:.2f}x faster[/bold green], "
+               f"saving {(legacy - current) / 1000:.2f} µs per request.")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+# benchmarks/bench_startup.py: Startup time of the CLI entry points.
+#
+# Usage:
+#   python benchmarks/bench_startup.py [--runs 10] [--target-ms 100]
+#
+# Starts each entry point in a fresh interpreter and reports its time over a bare `python -c pass`.
+# Exits with status 1 if any entry point's median overhead is above the target, or if a heavy
+# module (Streamlit, pandas, requests, aiohttp) is imported before a command needs it, so the
+# benchmark can guard startup time in CI.
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import rich
+
+ROOT = Path(__file__).resolve().parent.parent
+
+# Median milliseconds an entry point may add on top of the bare interpreter.
+TARGET_MS = 100
+
+# Modules that must not be loaded just to start the CLI.
+HEAVY_MODULES = ("streamlit", "pandas", "numpy", "requests", "aiohttp")
+
+SCENARIOS = [
+    ("python -c pass (baseline)", ["-c", "pass"]),
+    ("import main", ["-c", "import main"]),
+    ("main.py --help", [str(ROOT / "main.py"), "--help"]),
+    ("main.py profiles", [str(ROOT / "main.py"), "profiles"]),
+    ("import auth_util", ["-c", "import auth_util"]),
+]
+
+def time_command(args, runs, cwd):
+    """Runs `python <args>` `runs` times and returns the wall times in milliseconds."""
+    times = []
+    env = dict(os.environ, PYTHONPATH=str(ROOT))
+    for _ in range(runs):
+        started = time.perf_counter()
+        subprocess.run([sys.executable, *args], cwd=cwd, env=env, check=True, stdin=subprocess.DEVNULL,
+                       stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        times.append((time.perf_counter() - started) * 1000)
+    return times
+
+def heavy_imports(module, cwd):
+    """The HEAVY_MODULES that importing `module` loads."""
+    code = f"import sys, {module}; print(','.join(m for m in {HEAVY_MODULES!r} if m in sys.modules))"
+    output = subprocess.run([sys.executable, "-c", code], cwd=cwd, env=dict(os.environ, PYTHONPATH=str(ROOT)),
+                            check=True, capture_output=True, text=True).stdout.strip()
+    return [name for name in output.split(",") if name]
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark CLI startup time.")
+    parser.add_argument("--runs", type=int, default=10, help="Runs per entry point; the median is reported.")
+    parser.add_argument("--target-ms", type=float, default=TARGET_MS, help="Max median overhead over the bare interpreter.")
+    args = parser.parse_args()
+
+    # A scratch working directory, so `profiles` reads an empty profile store instead of the real one.
+    with tempfile.TemporaryDirectory() as cwd:
+        time_command(SCENARIOS[1][1], 2, cwd) # Warm the OS file cache
+
+        rich.print(f"\n[bold]Startup time ({args.runs} runs each, median / best):[/bold]")
+        baseline = None
+        failed = []
+        for label, command in SCENARIOS:
+            times = time_command(command, args.runs, cwd)
+            median = statistics.median(times)
+            if baseline is None:
+                baseline = median
+                rich.print(f"  {label:<28} {median:7.1f} ms / {min(times):7.1f} ms")
+                continue
+            overhead = median - baseline
+            ok = overhead <= args.target_ms
+            if not ok:
+                failed.append(label)
+            mark = "[green]ok[/green]" if ok else "[red]over target[/red]"
+            rich.print(f"  {label:<28} {median:7.1f} ms / {min(times):7.1f} ms   +{overhead:6.1f} ms  {mark}")
+
+        for module in ("main", "auth_util"):
+            loaded = heavy_imports(module, cwd)
+            if loaded:
+                failed.append(f"import {module} loads {', '.join(loaded)}")
+                rich.print(f"  [red]import {module} loads {', '.join(loaded)}[/red]")
+
+    if failed:
+        rich.print(f"\n[bold red]Above the {args.target_ms:.0f} ms target:[/bold red] {'; '.join(failed)}")
+        sys.exit(1)
+    rich.print(f"\n[bold green]Every entry point starts within {args.target_ms:.0f} ms of the bare interpreter.[/bold green]")
+
+if __name__ == "__main__":
+    main()
@@ -2,6 +2,15 @@
 
 SHOPEE_API_V2_URL = "https://partner.shopeemobile.com/api/v2/"
 
+# --- HTTP Connection Pool ---
+# Max keep-alive connections kept open per partner. Should be >= the number of batch workers.
+HTTP_POOL_SIZE = 32
+# Seconds to wait for the TCP/TLS connection and for the response, respectively.
+HTTP_CONNECT_TIMEOUT = 5
+HTTP_READ_TIMEOUT = 30
+# Max Shopee calls in flight at once per AsyncShopeeClient (or per shared semaphore).
+ASYNC_MAX_CONCURRENCY = 100
+
 # This redirect URL must be registered in your Shopee Partner App console
 REDIRECT_URL = "https://your-registered-redirect-url.com/callback"
 
@@ -10,3 +19,134 @@ REDIRECT_URL = "https://your-registered-redirect-url.com/callback"
 # In the future, this will be moved to a per-user profile setting.
 SHOPEE_PARTNER_ID = 1206273
 SHOPEE_PARTNER_KEY = "shpk4a525761574851474f706352787655696957515843686e48416a6666477a"
+
+# --- Shop Profiles ---
+# Profiles live in this SQLite file; an existing users.json is imported into it on first use.
+PROFILE_DB_PATH = "profiles.db"
+USERS_JSON_PATH = "users.json"
+
+# --- Rate Limiting ---
+# Sustained call budgets (requests/sec). Requests are paced to RATE_LIMIT_SAFETY_FACTOR of these
+# so bulk runs stay just under Shopee's quotas.
+RATE_LIMIT_PARTNER_QPS = 40
+RATE_LIMIT_SHOP_QPS = 10
+# Per-partner budgets for individual API paths with tighter limits.
+RATE_LIMIT_PATH_QPS = {
+    "/media_space/upload_image": 5,
+    "/product/add_item": 5,
+}
+RATE_LIMIT_SAFETY_FACTOR = 0.9
+# Shopee error codes (and HTTP 429) that mean "slow down".
+SHOPEE_THROTTLE_ERRORS = {"error_too_many_request", "error_rate_limit", "error_frequency_limit"}
+# How often a throttled call is retried, and the backoff (seconds) between tries.
+THROTTLE_MAX_RETRIES = 5
+THROTTLE_BACKOFF_BASE = 1.0
+THROTTLE_BACKOFF_MAX = 30.0
+
+# --- Access Tokens ---
+# Access tokens are refreshed this many seconds before they expire (they last about 4 hours).
+TOKEN_REFRESH_MARGIN = 10 * 60
+# After a failed refresh, the current token is kept and the refresh retried this many seconds later.
+TOKEN_REFRESH_RETRY_DELAY = 60
+# Error codes meaning the access token was rejected; the call is retried once with a refreshed token.
+SHOPEE_AUTH_ERRORS = {"invalid_access_token", "invalid_acceess_token", "error_auth"}
+
+# --- Retries & Job Journal ---
+# SQLite file recording finished clone steps so interrupted runs resume instead of redoing API calls.
+JOURNAL_DB_PATH = "clone_journal.db"
+# Attempts per product before giving up, with exponential backoff (plus jitter) between attempts.
+CLONE_MAX_ATTEMPTS = 3
+CLONE_RETRY_BASE_DELAY = 1.0
+CLONE_RETRY_MAX_DELAY = 30.0
+# When a create call's response was lost, the next attempt looks for the item by SKU among items created
+# since the call started, allowing for this much clock skew (seconds) between us and Shopee.
+CLONE_LOOKUP_CLOCK_SKEW = 300
+
+# --- Image Upload Cache ---
+# Uploaded cover images are remembered by URL + content fingerprint so unchanged images aren't re-uploaded.
+IMAGE_CACHE_PATH = "image_cache.json"
+IMAGE_CACHE_TTL = 7 * 24 * 3600 # seconds
+IMAGE_CACHE_MAX_ENTRIES = 50000
+# Hosts that send neither ETag nor Last-Modified are fingerprinted by downloading the image. That digest is
+# reused for this long (seconds) without asking the host again; lower it to pick up changed images sooner.
+IMAGE_DIGEST_TTL = IMAGE_CACHE_TTL
+
+# --- Image Pre-flight ---
+# Batches check every cover image URL on the image host (HEAD) before spending Shopee calls on it.
+# A found image is trusted this long (seconds), then re-checked with a conditional request.
+IMAGE_PREFLIGHT_TTL = 10 * 60
+# A missing image is re-checked after this long, as it may have been uploaded since.
+IMAGE_PREFLIGHT_MISSING_TTL = 60
+# Answers and their ETag / Last-Modified validators are kept this long for conditional re-checks.
+IMAGE_PREFLIGHT_MAX_AGE = 24 * 3600
+IMAGE_PREFLIGHT_MAX_ENTRIES = 50000
+# Image URLs probed concurrently (within the image host session's HTTP_POOL_SIZE connections).
+IMAGE_PREFLIGHT_MAX_WORKERS = 16
+
+# --- Source Product Cache ---
+# Source item details are reused for this long (seconds) before being fetched again.
+PRODUCT_CACHE_TTL = 15 * 60
+PRODUCT_CACHE_MAX_ENTRIES = 5000
+# Set to a file path (e.g. "product_cache.json") to keep cached details between CLI runs.
+PRODUCT_CACHE_PATH = None
+
+# --- Metrics ---
+# Where the CLI writes request/step metrics after each run (JSON snapshot and Prometheus text format).
+METRICS_JSON_PATH = "metrics.json"
+METRICS_PROMETHEUS_PATH = "metrics.prom"
+
+# --- Batch Cloning ---
+# Number of products cloned concurrently in batch mode.
+BATCH_MAX_WORKERS = 8
+# Number of target shops cloned into concurrently in fan-out mode.
+FANOUT_MAX_WORKERS = 8
+# Max item IDs accepted by one v2.product.get_item_base_info call, and how many such calls run at once.
+ITEM_BASE_INFO_BATCH_SIZE = 50
+ITEM_BASE_INFO_MAX_WORKERS = 4
+
+# --- Sharded Runs ---
+# Very large runs can be split by shop across worker processes, so each shop's rate limits and
+# access token live in exactly one process. Number of worker processes:
+SHARD_MAX_PROCESSES = 4
+# Each process clones its shop's jobs this many at a time; Ctrl-C stops a shard after its current chunk.
+SHARD_CHUNK_JOBS = 100
+
+# --- Variations ---
+# Models sent per v2.product.init_tier_variation / add_model call (the API maximum), so an item's
+# models are created in as few calls as possible.
+MODEL_BATCH_SIZE = 50
+# Variation images (and model lists) fetched or uploaded concurrently per item.
+VARIATION_MAX_WORKERS = 4
+
+# --- Global Products (CNSC) ---
+# Profiles of shops under a China Seller Center merchant (with a merchant_id) can be cloned to as one
+# global product published to each shop. Publish tasks created concurrently, one per shop:
+GLOBAL_PUBLISH_MAX_WORKERS = 8
+# Seconds between polls of the publish tasks, and how long to wait for them before giving up.
+GLOBAL_PUBLISH_POLL_INTERVAL = 1.0
+GLOBAL_PUBLISH_TIMEOUT = 120
+
+# --- Incremental Sync ---
+# Local index of synced items (source fingerprint -> target listing) and per shop pair watermarks.
+SYNC_INDEX_DB_PATH = "sync_index.db"
+# Items per v2.product.get_item_list page (the API maximum).
+ITEM_LIST_PAGE_SIZE = 100
+# Each run re-lists items updated this many seconds before the previous run started, to absorb
+# clock skew; unchanged items are recognized by their fingerprint and skipped.
+SYNC_WATERMARK_OVERLAP = 300
+
+# --- Job Sheets (Streamlit UI) ---
+# Uploaded CSV/XLSX job sheets and their results files are kept here.
+JOB_SHEET_DIR = "job_sheets"
+# Sheet rows read, validated and cloned per chunk, so a large sheet is never loaded into memory at once.
+JOB_SHEET_CHUNK_ROWS = 500
+# Profiles (target shops) of a chunk cloned into at once, each with up to BATCH_MAX_WORKERS rows in flight.
+# Shops have their own rate limits, so a slow shop doesn't hold up the others.
+JOB_SHEET_MAX_PROFILES = 4
+
+# --- Background Jobs (Streamlit UI) ---
+# Clone jobs submitted from the web UI are queued here and run by a pool of worker threads.
+JOB_QUEUE_DB_PATH = "job_queue.db"
+JOB_RUNNER_WORKERS = 4
+# Seconds between queue polls by idle workers, and between progress refreshes in the UI.
+JOB_POLL_INTERVAL = 1.0
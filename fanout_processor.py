@@ -0,0 +1,145 @@
+# fanout_processor.py: Clones one source product into many shops in a single job.
+
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from config import FANOUT_MAX_WORKERS
+from platforms.shopee_client import ShopeeClient
+from product_processor import prepare_product_template, cover_image_url, clone_with_retry, failed_clone_result
+
+def fetch_source_product(platform_client, source_item_id):
+    """Returns the source item's data, or None if it could not be fetched."""
+    response = platform_client.get_product_details(source_item_id)
+    if not response or not response.get("response") or not response["response"].get("item_list"):
+        return None
+    return response["response"]["item_list"][0]
+
+def _tag(result, username, profile, started):
+    result["profile"] = username
+    result["shop_id"] = profile.get("shop_id")
+    result["elapsed"] = time.perf_counter() - started
+    return result
+
+def _clone_into_shop(username, profile, client_factory, source_item_id, shop_code_for_image, source_product_data,
+                     product_template, journal, max_attempts):
+    """Runs the upload/create/publish steps for one target shop with that shop's own client. Returns [result]."""
+    started = time.perf_counter()
+    try:
+        result = clone_with_retry(
+            platform_client=client_factory(profile),
+            source_item_id=source_item_id,
+            image_hosting_url=profile["hosting_url"],
+            shop_code_for_image=shop_code_for_image,
+            journal=journal,
+            max_attempts=max_attempts,
+            verbose=False,
+            source_product_data=source_product_data,
+            product_template=product_template
+        )
+    except Exception as e:
+        result = failed_clone_result(source_item_id, shop_code_for_image, None, f"{type(e).__name__}: {e}")
+    return [_tag(result, username, profile, started)]
+
+def _shop_result(result, shop_id):
+    """One shop's share of a global clone's result."""
+    shop_result = dict(result, timings=dict(result["timings"]))
+    item_id = result.get("published", {}).get(shop_id)
+    if item_id:
+        shop_result.update(status="success", new_item_id=item_id, failed_step=None, error=None)
+    else:
+        shop_result.update(status="failed", failed_step=result["failed_step"] or "publish",
+                           error=result.get("publish_failures", {}).get(shop_id) or result["error"])
+    return shop_result
+
+def _clone_into_merchant(group, client_factory, source_item_id, shop_code_for_image, source_product_data,
+                         product_template, journal, max_attempts):
+    """
+    Clones into several shops of one merchant ({username: profile}) as a single global product, created
+    once and published to every shop in one batched call. A global product has one cover image, taken
+    from the first shop's image host. Returns a result per shop.
+    """
+    started = time.perf_counter()
+    profiles = list(group.values())
+    shops = [{"shop_id": int(profile["shop_id"]), "shop_region": profile.get("region")} for profile in profiles]
+    try:
+        result = clone_with_retry(
+            platform_client=client_factory(profiles[0]),
+            source_item_id=source_item_id,
+            image_hosting_url=profiles[0]["hosting_url"],
+            shop_code_for_image=shop_code_for_image,
+            journal=journal,
+            max_attempts=max_attempts,
+            verbose=False,
+            source_product_data=source_product_data,
+            product_template=product_template,
+            global_shops=shops
+        )
+    except Exception as e:
+        result = failed_clone_result(source_item_id, shop_code_for_image, None, f"{type(e).__name__}: {e}")
+    return [_tag(_shop_result(result, int(profile["shop_id"])), username, profile, started)
+            for username, profile in group.items()]
+
+def group_by_merchant(target_profiles):
+    """
+    Splits target profiles ({username: profile}) into ({(partner_id, merchant_id): {username: profile}},
+    {username: profile} of the other shops). Each merchant's shops can share one global product; shops
+    whose profile has no merchant main-account token can't, and are left to be cloned into one by one.
+    """
+    merchants, shops = {}, {}
+    for username, profile in target_profiles.items():
+        if profile.get("merchant_id") is None or not profile.get("merchant_access_token"):
+            shops[username] = profile
+        else:
+            key = (int(profile["partner_id"]), int(profile["merchant_id"]))
+            merchants.setdefault(key, {})[username] = profile
+    return merchants, shops
+
+def clone_to_shops(source_client, source_item_id, target_profiles, shop_code_for_image,
+                   client_factory=ShopeeClient.from_profile, max_workers=FANOUT_MAX_WORKERS, journal=None, max_attempts=1,
+                   preflight=None, global_product=False):
+    """
+    Clones one source product into every shop in `target_profiles` ({username: profile}).
+    The source is fetched and its payload prepared once; the per-shop steps then run concurrently,
+    each shop with its own client from `client_factory(profile)`. With a `preflight` (ImagePreflight),
+    every shop's cover image is checked first and shops whose image is missing fail without any Shopee call.
+    With `global_product`, the shops of each CNSC merchant (profiles with a merchant_id) get one global
+    product published to all of them, signed with the merchant's main-account token saved in the
+    profiles (see auth_util); other shops are cloned into one by one.
+    Yields one result per shop (tagged with `profile` and `shop_id`) as soon as that shop finishes.
+    """
+    started = time.perf_counter()
+    source_product_data = fetch_source_product(source_client, source_item_id)
+    if source_product_data is None:
+        for username, profile in target_profiles.items():
+            result = failed_clone_result(source_item_id, shop_code_for_image, "fetch",
+                                         "Failed to fetch product details or the product does not exist.")
+            yield _tag(result, username, profile, started)
+        return
+    product_template = prepare_product_template(source_product_data)
+
+    target_profiles = dict(target_profiles)
+    parent_sku = source_product_data.get("item_sku")
+    if preflight is not None and parent_sku:
+        cover_urls = {username: cover_image_url(profile["hosting_url"], parent_sku, shop_code_for_image)
+                      for username, profile in target_profiles.items()}
+        found = preflight.check(cover_urls.values())
+        for username, url in cover_urls.items():
+            if found.get(url) is False:
+                result = failed_clone_result(source_item_id, shop_code_for_image, "preflight", f"Cover image not found at {url}")
+                yield _tag(result, username, target_profiles.pop(username), started)
+        if not target_profiles:
+            return
+
+    merchants, shops = group_by_merchant(target_profiles) if global_product else ({}, target_profiles)
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(merchants) + len(shops)))) as executor:
+        futures = [
+            executor.submit(_clone_into_merchant, group, client_factory, source_item_id, shop_code_for_image,
+                            source_product_data, product_template, journal, max_attempts)
+            for group in merchants.values()
+        ] + [
+            executor.submit(_clone_into_shop, username, profile, client_factory, source_item_id, shop_code_for_image,
+                            source_product_data, product_template, journal, max_attempts)
+            for username, profile in shops.items()
+        ]
+        for future in as_completed(futures):
+            yield from future.result()
@@ -0,0 +1,106 @@
+# image_cache.py: Skips re-uploading cover images that Shopee already has.
+
+import hashlib
+import threading
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from config import (
+    IMAGE_CACHE_PATH, IMAGE_CACHE_TTL, IMAGE_CACHE_MAX_ENTRIES, IMAGE_DIGEST_TTL,
+    HTTP_POOL_SIZE, HTTP_CONNECT_TIMEOUT, HTTP_READ_TIMEOUT,
+)
+from ttl_cache import TTLCache
+
+_image_host_session = None
+_image_host_session_lock = threading.Lock()
+
+def get_image_host_session():
+    """Returns the pooled keep-alive session used for requests to image hosts."""
+    global _image_host_session
+    with _image_host_session_lock:
+        if _image_host_session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_maxsize=HTTP_POOL_SIZE, pool_block=True)
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            _image_host_session = session
+        return _image_host_session
+
+def image_fingerprint(image_url, session=None, timeout=(HTTP_CONNECT_TIMEOUT, HTTP_READ_TIMEOUT)):
+    """
+    Identifies the current content of an image URL without trusting the URL alone.
+    Uses the ETag or Last-Modified (+ size) from a HEAD request, falling back to a SHA-256
+    of the body when the host sends neither. Returns None if the image is unreachable.
+    """
+    session = session or get_image_host_session()
+    try:
+        response = session.head(image_url, timeout=timeout, allow_redirects=True)
+        if response.status_code == 200:
+            etag = response.headers.get("ETag")
+            if etag:
+                return f"etag:{etag}"
+            last_modified = response.headers.get("Last-Modified")
+            if last_modified:
+                return f"lm:{last_modified}:{response.headers.get('Content-Length', '')}"
+        elif response.status_code not in (405, 501): # HEAD not supported -> try GET
+            return None
+
+        response = session.get(image_url, timeout=timeout)
+        if response.status_code != 200:
+            return None
+        return f"sha256:{hashlib.sha256(response.content).hexdigest()}"
+    except requests.exceptions.RequestException:
+        return None
+
+class ImageUploadCache:
+    """
+    Maps an image's URL and content fingerprint to the Shopee image ID it was uploaded as.
+    A changed image gets a new fingerprint and is uploaded again; an unchanged one is reused
+    until the entry expires (TTL) or is evicted (LRU). Persisted to disk between runs.
+    Body digests of images on hosts without validators are kept too (for `digest_ttl`), so such
+    images aren't downloaded on every lookup.
+    """
+
+    def __init__(self, path=IMAGE_CACHE_PATH, ttl=IMAGE_CACHE_TTL, max_entries=IMAGE_CACHE_MAX_ENTRIES, session=None,
+                 digest_ttl=IMAGE_DIGEST_TTL):
+        self._cache = TTLCache(max_entries=max_entries, ttl=ttl, path=path)
+        self._session = session
+        self.digest_ttl = digest_ttl
+
+    @staticmethod
+    def _key(partner_id, image_url, fingerprint):
+        return f"{partner_id}|{image_url}|{fingerprint}"
+
+    def lookup(self, partner_id, image_url):
+        """
+        Returns (image_id, fingerprint). image_id is None on a miss; fingerprint is None
+        if the image could not be fingerprinted, in which case nothing should be stored.
+        """
+        fingerprint = self._fingerprint(image_url)
+        if fingerprint is None:
+            return None, None
+        return self._cache.get(self._key(partner_id, image_url, fingerprint)), fingerprint
+
+    def _fingerprint(self, image_url):
+        digest_key = f"digest|{image_url}"
+        fingerprint = self._cache.get(digest_key)
+        if fingerprint is None:
+            fingerprint = image_fingerprint(image_url, self._session)
+            if fingerprint is not None and fingerprint.startswith("sha256:"):
+                self._cache.set(digest_key, fingerprint, ttl=self.digest_ttl)
+        return fingerprint
+
+    def store(self, partner_id, image_url, fingerprint, image_id):
+        if fingerprint is not None:
+            self._cache.set(self._key(partner_id, image_url, fingerprint), image_id)
+
+    def save(self):
+        self._cache.save()
+
+    def clear(self):
+        self._cache.clear()
+
+def cached_upload_response(image_id):
+    """Builds an upload_image-shaped response for an image ID served from the cache."""
+    return {"response": {"image_info": {"image_id": image_id}}, "cached": True}
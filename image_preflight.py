@@ -0,0 +1,115 @@
+# image_preflight.py: Checks that cover images exist on the image host before any Shopee call is spent on them.
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+from config import (
+    IMAGE_PREFLIGHT_TTL, IMAGE_PREFLIGHT_MISSING_TTL, IMAGE_PREFLIGHT_MAX_AGE, IMAGE_PREFLIGHT_MAX_ENTRIES,
+    IMAGE_PREFLIGHT_MAX_WORKERS, HTTP_CONNECT_TIMEOUT, HTTP_READ_TIMEOUT,
+)
+from image_cache import get_image_host_session
+from ttl_cache import TTLCache
+
+def _is_missing_status(status_code):
+    # Hosts answer a missing file with 404/410, or 403 when listing is denied (e.g. S3); 408/429 are transient.
+    return 400 <= status_code < 500 and status_code not in (408, 429)
+
+class ImagePreflight:
+    """
+    Answers "does this image URL exist?" for many URLs at once, probing them concurrently with HEAD
+    requests over the pooled image host session. Answers are cached: an image seen recently is
+    trusted for `ttl` seconds, and after that revalidated with a conditional request (If-None-Match /
+    If-Modified-Since), which the host answers with an empty 304. A missing image is re-checked after
+    `missing_ttl` seconds, as it may have been uploaded since. Safe to share between threads.
+    """
+
+    def __init__(self, session=None, max_workers=IMAGE_PREFLIGHT_MAX_WORKERS, ttl=IMAGE_PREFLIGHT_TTL,
+                 missing_ttl=IMAGE_PREFLIGHT_MISSING_TTL, max_entries=IMAGE_PREFLIGHT_MAX_ENTRIES,
+                 timeout=(HTTP_CONNECT_TIMEOUT, HTTP_READ_TIMEOUT)):
+        self._session = session
+        self.max_workers = max_workers
+        self.ttl = ttl
+        self.missing_ttl = missing_ttl
+        self.timeout = timeout
+        # Entries outlive their freshness so their validators can still be used for revalidation.
+        self._cache = TTLCache(max_entries=max_entries, ttl=IMAGE_PREFLIGHT_MAX_AGE)
+        self._lock = threading.Lock()
+        self.stats = {"cached": 0, "probed": 0, "revalidated": 0}
+
+    def _count(self, key, n=1):
+        with self._lock:
+            self.stats[key] += n
+
+    def _probe(self, image_url, entry):
+        """
+        Returns the new cache entry ({"exists", "etag", "last_modified", "checked_at"}), or None if the
+        host could not be reached or gave no clear answer.
+        """
+        session = self._session or get_image_host_session()
+        headers = {}
+        if entry and entry["exists"]:
+            if entry.get("etag"):
+                headers["If-None-Match"] = entry["etag"]
+            if entry.get("last_modified"):
+                headers["If-Modified-Since"] = entry["last_modified"]
+        try:
+            response = session.head(image_url, headers=headers, timeout=self.timeout, allow_redirects=True)
+            if response.status_code in (405, 501): # HEAD not supported -> GET, without reading the body
+                with session.get(image_url, headers=headers, timeout=self.timeout, stream=True) as response:
+                    pass
+        except requests.exceptions.RequestException:
+            return None
+
+        now = time.time()
+        if response.status_code == 304 and entry:
+            self._count("revalidated")
+            return dict(entry, checked_at=now)
+        if response.status_code == 200:
+            return {"exists": True, "etag": response.headers.get("ETag"),
+                    "last_modified": response.headers.get("Last-Modified"), "checked_at": now}
+        if _is_missing_status(response.status_code):
+            return {"exists": False, "checked_at": now}
+        return None
+
+    def check(self, image_urls):
+        """
+        Checks every distinct URL, probing the ones without a fresh cached answer concurrently.
+        Returns {url: True (exists), False (missing) or None (unknown, e.g. the host is down)}.
+        """
+        answers, to_probe = {}, []
+        now = time.time()
+        for image_url in dict.fromkeys(image_urls):
+            entry = self._cache.get(image_url)
+            if entry is not None and now - entry["checked_at"] < (self.ttl if entry["exists"] else self.missing_ttl):
+                answers[image_url] = entry["exists"]
+            else:
+                to_probe.append((image_url, entry))
+        self._count("cached", len(answers))
+        if not to_probe:
+            return answers
+
+        self._count("probed", len(to_probe))
+        with ThreadPoolExecutor(max_workers=max(1, min(self.max_workers, len(to_probe)))) as executor:
+            entries = list(executor.map(lambda probe: self._probe(*probe), to_probe))
+        for (image_url, _), entry in zip(to_probe, entries):
+            if entry is not None:
+                self._cache.set(image_url, entry)
+            answers[image_url] = entry["exists"] if entry is not None else None
+        return answers
+
+    def clear(self):
+        self._cache.clear()
+
+_default_preflight = None
+_default_preflight_lock = threading.Lock()
+
+def get_default_image_preflight():
+    """Returns the process-wide ImagePreflight, so every batch shares its cached answers."""
+    global _default_preflight
+    with _default_preflight_lock:
+        if _default_preflight is None:
+            _default_preflight = ImagePreflight()
+        return _default_preflight
@@ -0,0 +1,83 @@
+# job_journal.py: Persistent record of finished clone steps, so interrupted runs can resume.
+
+import json
+import sqlite3
+import threading
+import time
+
+from config import JOURNAL_DB_PATH
+
+class JobJournal:
+    """
+    Records each pipeline step's outcome per (source_item_id, shop_code, shop_id) in a local SQLite file.
+    Retries and re-runs read the finished steps back and skip them, so an image is not uploaded
+    twice and an item that was already created is not created again. Safe to share between threads.
+    """
+
+    def __init__(self, path=JOURNAL_DB_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS clone_steps (
+                source_item_id INTEGER NOT NULL,
+                shop_code TEXT NOT NULL,
+                shop_id INTEGER NOT NULL,
+                step TEXT NOT NULL,
+                status TEXT NOT NULL,
+                output TEXT,
+                error TEXT,
+                attempts INTEGER NOT NULL DEFAULT 1,
+                updated_at REAL NOT NULL,
+                PRIMARY KEY (source_item_id, shop_code, shop_id, step)
+            )
+            """
+        )
+
+    @staticmethod
+    def _key(source_item_id, shop_code, shop_id):
+        # shop_id is NOT NULL so it can be part of the primary key; 0 stands for "unknown shop".
+        return int(source_item_id), str(shop_code), int(shop_id or 0)
+
+    def completed_steps(self, source_item_id, shop_code, shop_id):
+        """Returns {step: output} for every step that already succeeded for this job."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT step, output FROM clone_steps WHERE source_item_id=? AND shop_code=? AND shop_id=? AND status='done'",
+                self._key(source_item_id, shop_code, shop_id),
+            ).fetchall()
+        return {step: json.loads(output) for step, output in rows}
+
+    def _upsert(self, key, step, status, output, error):
+        with self._lock:
+            self._conn.execute(
+                """
+                INSERT INTO clone_steps (source_item_id, shop_code, shop_id, step, status, output, error, attempts, updated_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, 1, ?)
+                ON CONFLICT (source_item_id, shop_code, shop_id, step) DO UPDATE SET
+                    status=excluded.status, output=excluded.output, error=excluded.error,
+                    attempts=clone_steps.attempts + 1, updated_at=excluded.updated_at
+                """,
+                (*key, step, status, output, error, time.time()),
+            )
+
+    def record_success(self, source_item_id, shop_code, shop_id, step, output):
+        self._upsert(self._key(source_item_id, shop_code, shop_id), step, "done", json.dumps(output), None)
+
+    def record_failure(self, source_item_id, shop_code, shop_id, step, error):
+        self._upsert(self._key(source_item_id, shop_code, shop_id), step, "failed", None, error)
+
+    def forget(self, source_item_id, shop_code, shop_id):
+        """Drops every recorded step of a job, so the next run starts from scratch."""
+        with self._lock:
+            self._conn.execute(
+                "DELETE FROM clone_steps WHERE source_item_id=? AND shop_code=? AND shop_id=?",
+                self._key(source_item_id, shop_code, shop_id),
+            )
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
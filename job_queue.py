@@ -0,0 +1,250 @@
+# job_queue.py: Persistent job queue and background runner, so long clones don't block the UI.
+
+import json
+import sqlite3
+import threading
+import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+
+from rich.errors import MarkupError
+from rich.text import Text
+
+from config import JOB_QUEUE_DB_PATH, JOB_RUNNER_WORKERS, JOB_POLL_INTERVAL
+
+FINISHED_STATUSES = ("done", "failed", "cancelled")
+
+class JobQueue:
+    """
+    Jobs and their progress events in a local SQLite file, shared by every UI session and worker thread.
+    A job is {"id", "kind", "params", "owner", "status", "step", "result", "error", ...}; status goes
+    queued -> running -> done / failed (or queued -> cancelled). Events are the job's log lines, step
+    changes and partial results, numbered per job so pollers can fetch only what they haven't seen.
+    """
+
+    def __init__(self, path=JOB_QUEUE_DB_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS jobs (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                kind TEXT NOT NULL,
+                params TEXT NOT NULL,
+                owner TEXT,
+                status TEXT NOT NULL DEFAULT 'queued',
+                step TEXT,
+                result TEXT,
+                error TEXT,
+                created_at REAL NOT NULL,
+                started_at REAL,
+                finished_at REAL
+            );
+            CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, id);
+            CREATE TABLE IF NOT EXISTS job_events (
+                job_id INTEGER NOT NULL,
+                seq INTEGER NOT NULL,
+                kind TEXT NOT NULL,
+                step TEXT,
+                message TEXT,
+                data TEXT,
+                created_at REAL NOT NULL,
+                PRIMARY KEY (job_id, seq)
+            );
+            """
+        )
+
+    @staticmethod
+    def _job(row):
+        if row is None:
+            return None
+        job = dict(row)
+        job["params"] = json.loads(job["params"])
+        job["result"] = json.loads(job["result"]) if job["result"] else None
+        return job
+
+    def submit(self, kind, params, owner=None):
+        """Queues a job and returns its ID."""
+        with self._lock:
+            cursor = self._conn.execute(
+                "INSERT INTO jobs (kind, params, owner, created_at) VALUES (?, ?, ?, ?)",
+                (kind, json.dumps(params), owner, time.time()),
+            )
+            return cursor.lastrowid
+
+    def claim(self):
+        """Marks the oldest queued job as running and returns it, or None if the queue is empty."""
+        with self._lock:
+            row = self._conn.execute(
+                "UPDATE jobs SET status='running', started_at=? "
+                "WHERE id=(SELECT id FROM jobs WHERE status='queued' ORDER BY id LIMIT 1) RETURNING *",
+                (time.time(),),
+            ).fetchone()
+        return self._job(row)
+
+    def requeue_interrupted(self):
+        """Puts jobs left running by a stopped process back in the queue. Returns how many were requeued."""
+        with self._lock:
+            job_ids = [row["id"] for row in self._conn.execute(
+                "UPDATE jobs SET status='queued', step=NULL WHERE status='running' RETURNING id").fetchall()]
+        # Kept, not cleared, so pollers' event numbering stays valid; the rerun's results supersede earlier ones.
+        for job_id in job_ids:
+            self.add_event(job_id, "log", message="Requeued after a restart; finished steps will be resumed.")
+        return len(job_ids)
+
+    def cancel(self, job_id):
+        """Cancels a job that hasn't started yet. Returns True if it was cancelled."""
+        with self._lock:
+            return self._conn.execute(
+                "UPDATE jobs SET status='cancelled', finished_at=? WHERE id=? AND status='queued'",
+                (time.time(), job_id),
+            ).rowcount == 1
+
+    def add_event(self, job_id, kind, message=None, step=None, data=None):
+        with self._lock:
+            self._conn.execute(
+                """
+                INSERT INTO job_events (job_id, seq, kind, step, message, data, created_at)
+                VALUES (?, (SELECT COALESCE(MAX(seq), 0) + 1 FROM job_events WHERE job_id=?), ?, ?, ?, ?, ?)
+                """,
+                (job_id, job_id, kind, step, message, json.dumps(data) if data is not None else None, time.time()),
+            )
+            if kind == "step":
+                self._conn.execute("UPDATE jobs SET step=? WHERE id=?", (step, job_id))
+
+    def finish(self, job_id, result=None, error=None):
+        """Records a job's outcome: done with a `result`, or failed with an `error`."""
+        with self._lock:
+            self._conn.execute(
+                "UPDATE jobs SET status=?, result=?, error=?, finished_at=? WHERE id=?",
+                ("failed" if error else "done", json.dumps(result, default=str) if result is not None else None,
+                 error, time.time(), job_id),
+            )
+
+    def get(self, job_id):
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM jobs WHERE id=?", (job_id,)).fetchone()
+        return self._job(row)
+
+    def events(self, job_id, after_seq=0):
+        """Returns the job's events numbered after `after_seq`, oldest first."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT * FROM job_events WHERE job_id=? AND seq>? ORDER BY seq", (job_id, after_seq)
+            ).fetchall()
+        events = [dict(row) for row in rows]
+        for event in events:
+            event["data"] = json.loads(event["data"]) if event["data"] else None
+        return events
+
+    def list_jobs(self, owner=None, limit=50):
+        """Most recent jobs first, optionally only those submitted by `owner`."""
+        query, args = "SELECT * FROM jobs", ()
+        if owner is not None:
+            query, args = query + " WHERE owner=?", (owner,)
+        with self._lock:
+            rows = self._conn.execute(query + " ORDER BY id DESC LIMIT ?", (*args, limit)).fetchall()
+        return [self._job(row) for row in rows]
+
+    def position(self, job_id):
+        """How many queued jobs are ahead of this one."""
+        with self._lock:
+            return self._conn.execute(
+                "SELECT COUNT(*) FROM jobs WHERE status='queued' AND id<?", (job_id,)
+            ).fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+class JobReporter:
+    """Handed to a job handler to report progress; every call becomes an event on the job."""
+
+    def __init__(self, queue, job_id):
+        self._queue = queue
+        self.job_id = job_id
+
+    def log(self, message):
+        """Records a log line. Accepts rich markup, like the pipeline's console messages."""
+        try:
+            message = Text.from_markup(str(message)).plain
+        except MarkupError:
+            message = str(message)
+        self._queue.add_event(self.job_id, "log", message=message.strip("\n"))
+
+    def step(self, step):
+        self._queue.add_event(self.job_id, "step", step=step)
+
+    def partial(self, data):
+        """Records a partial result, e.g. one shop of a fan-out job."""
+        self._queue.add_event(self.job_id, "result", data=data)
+
+class JobRunner:
+    """
+    Runs queued jobs on a pool of `max_workers` threads. `handlers` maps a job kind to
+    handler(params, reporter), whose return value becomes the job's result.
+    Jobs left running by a previous process are requeued on start.
+    """
+
+    def __init__(self, queue, handlers, max_workers=JOB_RUNNER_WORKERS, poll_interval=JOB_POLL_INTERVAL):
+        self.queue = queue
+        self.handlers = handlers
+        self.max_workers = max_workers
+        self.poll_interval = poll_interval
+        self._slots = threading.Semaphore(max_workers)
+        self._wake = threading.Event()
+        self._stopping = threading.Event()
+        self._executor = None
+        self._dispatcher = None
+
+    def start(self):
+        requeued = self.queue.requeue_interrupted()
+        if requeued:
+            print(f"Requeued {requeued} job(s) interrupted by a restart.")
+        self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="job")
+        self._dispatcher = threading.Thread(target=self._dispatch, name="job-dispatcher", daemon=True)
+        self._dispatcher.start()
+        return self
+
+    def submit(self, kind, params, owner=None):
+        """Queues a job and wakes the dispatcher. Returns the job ID."""
+        if kind not in self.handlers:
+            raise ValueError(f"Unknown job kind: {kind}")
+        job_id = self.queue.submit(kind, params, owner)
+        self._wake.set()
+        return job_id
+
+    def _dispatch(self):
+        while not self._stopping.is_set():
+            self._slots.acquire()
+            if self._stopping.is_set():
+                break
+            job = self.queue.claim()
+            if job is None:
+                self._slots.release()
+                self._wake.wait(self.poll_interval)
+                self._wake.clear()
+                continue
+            self._executor.submit(self._run, job)
+
+    def _run(self, job):
+        reporter = JobReporter(self.queue, job["id"])
+        try:
+            result = self.handlers[job["kind"]](job["params"], reporter)
+            self.queue.finish(job["id"], result=result)
+        except Exception as e:
+            reporter.log(traceback.format_exc())
+            self.queue.finish(job["id"], error=f"{type(e).__name__}: {e}")
+        finally:
+            self._slots.release()
+
+    def stop(self, wait=True):
+        """Stops taking new jobs; with `wait`, blocks until running jobs finish."""
+        self._stopping.set()
+        self._wake.set()
+        if self._executor is not None:
+            self._executor.shutdown(wait=wait)
@@ -0,0 +1,194 @@
+# job_sheet.py: Bulk clone jobs read from uploaded CSV/XLSX sheets, with a streamed results file.
+
+import csv
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from config import JOB_SHEET_CHUNK_ROWS, JOB_SHEET_MAX_PROFILES
+from batch_processor import RESULT_COLUMNS, run_batch
+from product_processor import PIPELINE_STEPS
+
+# Column names accepted in a sheet's header row (case and spacing are ignored).
+SHEET_COLUMNS = ("source_item_id", "shop_code", "profile")
+COLUMN_ALIASES = {"item_id": "source_item_id", "source_id": "source_item_id", "target_profile": "profile"}
+REQUIRED_COLUMNS = ("source_item_id", "shop_code")
+
+SHEET_RESULT_COLUMNS = ["row", "profile", *RESULT_COLUMNS, *(f"{step}_ms" for step in PIPELINE_STEPS)]
+
+def _column_name(name):
+    name = str(name or "").strip().lower().replace(" ", "_")
+    return COLUMN_ALIASES.get(name, name)
+
+def _read_csv_chunks(path, chunk_rows):
+    yield from pd.read_csv(path, chunksize=chunk_rows, dtype=str, keep_default_na=False, encoding="utf-8-sig")
+
+def _read_xlsx_chunks(path, chunk_rows):
+    import openpyxl # Only needed for Excel sheets
+
+    workbook = openpyxl.load_workbook(path, read_only=True, data_only=True)
+    try:
+        rows = workbook.active.iter_rows(values_only=True)
+        header = next(rows, None)
+        if header is None:
+            return
+        chunk = []
+        for row in rows:
+            chunk.append(row)
+            if len(chunk) == chunk_rows:
+                yield pd.DataFrame(chunk, columns=header, dtype=object).fillna("").astype(str)
+                chunk = []
+        if chunk:
+            yield pd.DataFrame(chunk, columns=header, dtype=object).fillna("").astype(str)
+    finally:
+        workbook.close()
+
+def read_job_sheet(path, chunk_rows=JOB_SHEET_CHUNK_ROWS):
+    """
+    Reads a .csv or .xlsx job sheet `chunk_rows` rows at a time (as string DataFrames with
+    normalized column names), so a large sheet is never held in memory at once.
+    Yields (chunk, sheet row number of the chunk's first row).
+    """
+    reader = _read_xlsx_chunks if Path(path).suffix.lower() == ".xlsx" else _read_csv_chunks
+    first_row = 2 # Row 1 is the header
+    for chunk in reader(path, chunk_rows):
+        chunk = chunk.rename(columns=_column_name)
+        yield chunk, first_row
+        first_row += len(chunk)
+
+def missing_sheet_columns(path):
+    """The required columns the sheet's header lacks (reads the header only)."""
+    for chunk, _ in read_job_sheet(path, chunk_rows=1):
+        return [column for column in REQUIRED_COLUMNS if column not in chunk.columns]
+    return list(REQUIRED_COLUMNS)
+
+def validate_jobs(chunk, profile_names, default_profile, first_row, seen):
+    """
+    Validates a chunk of sheet rows in one vectorized pass. Rows without a profile use `default_profile`.
+    `seen` holds the keys of rows accepted from earlier chunks, so repeated rows are rejected across the sheet.
+    Returns a DataFrame of (row, source_item_id, shop_code, profile, error) with error == "" for valid rows;
+    blank rows are dropped.
+    """
+    chunk = chunk.reindex(columns=SHEET_COLUMNS, fill_value="")
+    rows = pd.RangeIndex(first_row, first_row + len(chunk))
+    chunk.index = rows
+    # Excel stores IDs as numbers, which come back as "123.0"
+    item_ids = chunk["source_item_id"].str.strip().str.replace(r"\.0+$", "", regex=True)
+    shop_codes = chunk["shop_code"].str.strip()
+    profiles = chunk["profile"].str.strip()
+    blank = (item_ids == "") & (shop_codes == "") & (profiles == "")
+    profiles = profiles.mask(profiles == "", default_profile or "")
+
+    keys = item_ids + "\x1f" + shop_codes + "\x1f" + profiles
+    error = np.select(
+        [
+            item_ids == "",
+            ~item_ids.str.fullmatch(r"\d+"),
+            shop_codes == "",
+            profiles == "",
+            ~profiles.isin(list(profile_names)),
+            keys.duplicated() | keys.isin(seen),
+        ],
+        [
+            "missing source_item_id",
+            "source_item_id must be a number",
+            "missing shop_code",
+            "missing profile",
+            "unknown profile",
+            "duplicate row",
+        ],
+        default="",
+    )
+    jobs = pd.DataFrame({
+        "row": rows,
+        "source_item_id": item_ids,
+        "shop_code": shop_codes,
+        "profile": profiles,
+        "error": error,
+    }, index=rows)[~blank]
+    seen.update(keys[~blank & (error == "")])
+    return jobs
+
+def _result_row(row, profile, result):
+    """One line of the results file."""
+    line = dict(result, row=row, profile=profile)
+    for step in PIPELINE_STEPS:
+        seconds = result.get("timings", {}).get(step)
+        line[f"{step}_ms"] = round(seconds * 1000) if seconds is not None else ""
+    if result.get("elapsed") is not None:
+        line["elapsed"] = round(result["elapsed"], 3)
+    return line
+
+def clone_job_sheet(path, profiles, default_profile, client_factory, results_path, journal=None, max_attempts=1,
+                    on_progress=None, chunk_rows=JOB_SHEET_CHUNK_ROWS, preflight=None, max_profiles=JOB_SHEET_MAX_PROFILES):
+    """
+    Clones every valid row of a job sheet into its row's shop profile, a chunk at a time; within a
+    chunk, up to `max_profiles` profiles' rows are cloned concurrently.
+    Each row's outcome (new item ID, error, per-step timings) is appended to the CSV at `results_path`
+    as soon as it finishes, so the file can be downloaded while the sheet is still running; invalid
+    rows are written there too, with status "invalid". `on_progress(counts)` is called after each batch of rows.
+    With a `preflight` (ImagePreflight), rows whose cover image is missing fail before any Shopee call.
+    Returns the counts: {"rows", "succeeded", "failed", "invalid", "elapsed"}.
+    """
+    started = time.perf_counter()
+    counts = {"rows": 0, "succeeded": 0, "failed": 0, "invalid": 0, "elapsed": 0.0}
+    clients = {}
+    seen = set()
+    lock = threading.Lock() # Profiles finish rows concurrently; guards the results file and counts
+
+    with open(results_path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=SHEET_RESULT_COLUMNS, extrasaction="ignore")
+        writer.writeheader()
+
+        def write(line):
+            with lock:
+                writer.writerow(line)
+                f.flush()
+
+        def progress():
+            with lock:
+                counts["elapsed"] = time.perf_counter() - started
+                snapshot = dict(counts)
+            if on_progress:
+                on_progress(snapshot)
+
+        def clone_group(profile_name, group):
+            profile = profiles[profile_name]
+            group = group.astype({"source_item_id": "int64"})
+            row_of = dict(zip(zip(group["source_item_id"], group["shop_code"]), group["row"]))
+
+            def on_result(result):
+                write(_result_row(row_of[(result["source_item_id"], result["shop_code"])], profile_name, result))
+                with lock:
+                    counts["succeeded" if result["status"] == "success" else "failed"] += 1
+
+            run_batch(clients[profile_name], group[["source_item_id", "shop_code"]].to_dict("records"),
+                      profile["hosting_url"], on_result=on_result, journal=journal, max_attempts=max_attempts,
+                      preflight=preflight)
+            progress()
+
+        for chunk, first_row in read_job_sheet(path, chunk_rows):
+            jobs = validate_jobs(chunk, profiles.keys(), default_profile, first_row, seen)
+            counts["rows"] += len(jobs)
+            invalid = jobs[jobs["error"] != ""]
+            for row in invalid.itertuples(index=False):
+                write({"row": row.row, "profile": row.profile, "source_item_id": row.source_item_id,
+                       "shop_code": row.shop_code, "status": "invalid", "error": row.error})
+            counts["invalid"] += len(invalid)
+
+            groups = list(jobs[jobs["error"] == ""].groupby("profile", sort=False))
+            for profile_name, _ in groups:
+                if profile_name not in clients:
+                    clients[profile_name] = client_factory(profiles[profile_name])
+            if groups:
+                with ThreadPoolExecutor(max_workers=max(1, min(max_profiles, len(groups)))) as executor:
+                    for future in [executor.submit(clone_group, profile_name, group) for profile_name, group in groups]:
+                        future.result()
+            progress()
+
+    counts["elapsed"] = time.perf_counter() - started
+    return counts
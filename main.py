@@ -1,8 +1,21 @@
 # main.py: CLI Interface & Workflow Controller
-import rich
+#
+# Run without arguments for the interactive menu, or with a command for scripted runs (e.g. from cron):
+#   python main.py batch --profile my_shop --csv jobs.csv --results results.csv
+# See `python main.py --help`. The Shopee client, requests, pandas and the processors are imported
+# by the flows that use them, so the menu and --help start without loading them.
+import argparse
+import sys
+import time
+import rich # Cheap: rich.print loads the console on first use
 from user_manager import load_users
-from platforms.shopee_client import ShopeeClient
-import product_processor
+from config import BATCH_MAX_WORKERS, CLONE_MAX_ATTEMPTS, METRICS_JSON_PATH, METRICS_PROMETHEUS_PATH, SHARD_MAX_PROCESSES
+
+# Exit codes of the scripted commands.
+EXIT_OK = 0
+EXIT_FAILED = 1 # Some jobs failed (or were not run)
+EXIT_USAGE = 2 # Bad arguments, unknown profile, unreadable file
+EXIT_INTERRUPTED = 130
 
 def select_user_profile():
     """Displays available user profiles and prompts the user to select one."""
@@ -29,6 +42,242 @@ def select_user_profile():
         except ValueError:
             rich.print("[red]Invalid input. Please enter a number.[/red]")
 
+def select_target_profiles():
+    """Prompts the user to pick several profiles. Returns {username: profile}."""
+    users = load_users()
+    if not users:
+        rich.print("[bold red]No user profiles found![/bold red]")
+        return {}
+
+    rich.print("\n[bold]Available User Profiles:[/bold]")
+    profile_list = list(users.items())
+    for i, (username, data) in enumerate(profile_list):
+        rich.print(f"  {i + 1}. [cyan]{username}[/cyan] (Shop: [yellow]{data['shop_name']}[/yellow])")
+
+    while True:
+        choice = input("\nSelect the target profiles (e.g. 1,3,4 or 'all'): ").strip().lower()
+        if choice == "all":
+            return dict(profile_list)
+        try:
+            indexes = {int(part) for part in choice.split(",") if part.strip()}
+        except ValueError:
+            rich.print("[red]Invalid input. Please enter numbers separated by commas.[/red]")
+            continue
+        if indexes and all(1 <= i <= len(profile_list) for i in indexes):
+            return dict(profile_list[i - 1] for i in sorted(indexes))
+        rich.print("[yellow]Invalid selection. Please try again.[/yellow]")
+
+_image_cache = None
+_details_cache = None
+
+def _get_image_cache():
+    """Returns the on-disk image upload cache, loading it on first use."""
+    global _image_cache
+    if _image_cache is None:
+        from image_cache import ImageUploadCache
+        _image_cache = ImageUploadCache()
+    return _image_cache
+
+def _get_details_cache():
+    """Returns the source product details cache shared by every client in this run."""
+    global _details_cache
+    if _details_cache is None:
+        from product_cache import ProductDetailsCache
+        _details_cache = ProductDetailsCache()
+    return _details_cache
+
+def _export_metrics():
+    """Writes the metrics collected during this run to disk."""
+    from metrics import get_default_metrics
+    metrics = get_default_metrics()
+    metrics.write_json(METRICS_JSON_PATH)
+    metrics.write_prometheus(METRICS_PROMETHEUS_PATH)
+    rich.print(f"[dim]Metrics written to {METRICS_JSON_PATH} and {METRICS_PROMETHEUS_PATH}.[/dim]")
+
+def _client_for_profile(profile):
+    """Initializes the platform client with a profile's credentials."""
+    from platforms.shopee_client import ShopeeClient
+    return ShopeeClient.from_profile(profile, image_cache=_get_image_cache(), details_cache=_get_details_cache())
+
+def _save_results(results, results_path):
+    import batch_processor
+    batch_processor.write_results_csv(results, results_path)
+    rich.print(f"Results saved to [bold]{results_path}[/bold].")
+
+def _prompt_save_results(results):
+    results_path = input("\nSave results to CSV (leave empty to skip): ").strip()
+    if results_path:
+        _save_results(results, results_path)
+
+def _read_number(prompt, default):
+    value = input(f"{prompt} [{default}]: ").strip()
+    return int(value) if value.isdigit() and int(value) > 0 else default
+
+def _all_succeeded(results):
+    return all(result["status"] == "success" for result in results)
+
+# --- Workflows (shared by the menu and the scripted commands) ---
+
+def run_clone(profile, source_item_id, shop_code):
+    """Clones one product into a profile's shop. Returns the result dict."""
+    import product_processor
+    result = product_processor.clone_single_product(
+        platform_client=_client_for_profile(profile),
+        source_item_id=source_item_id,
+        image_hosting_url=profile['hosting_url'],
+        shop_code_for_image=shop_code
+    )
+    _export_metrics()
+    return result
+
+def run_batch_clone(profile, jobs, max_workers):
+    """Clones a list of jobs into a profile's shop and prints the report. Returns the results."""
+    import batch_processor
+    from job_journal import JobJournal
+    from image_preflight import get_default_image_preflight
+
+    rich.print(f"\nCloning [bold]{len(jobs)}[/bold] products into [bold yellow]{profile['shop_name']}[/bold yellow] with {max_workers} workers...")
+    # Steps finished by an earlier (interrupted) run of the same jobs are skipped.
+    journal = JobJournal()
+    try:
+        results, stats = batch_processor.run_batch(
+            platform_client=_client_for_profile(profile),
+            jobs=jobs,
+            image_hosting_url=profile['hosting_url'],
+            max_workers=max_workers,
+            journal=journal,
+            max_attempts=CLONE_MAX_ATTEMPTS,
+            preflight=get_default_image_preflight()
+        )
+    finally:
+        journal.close()
+    batch_processor.print_batch_report(results, stats)
+    _export_metrics()
+    return results
+
+def run_fanout(source_profile, source_item_id, shop_code, targets, global_product=False):
+    """
+    Clones one source product into every target profile's shop. Returns the results.
+    With `global_product`, each CNSC merchant's shops share one global product.
+    """
+    import batch_processor
+    import fanout_processor
+    from job_journal import JobJournal
+    from image_preflight import get_default_image_preflight
+
+    rich.print(f"\nCloning product [bold cyan]{source_item_id}[/bold cyan] into [bold]{len(targets)}[/bold] shops...")
+    if global_product:
+        unauthorized = [username for username, profile in targets.items() if not profile.get("merchant_access_token")]
+        if unauthorized:
+            rich.print(f"[yellow]No merchant main-account token for {', '.join(unauthorized)}; cloning into those shops one by one.[/yellow]")
+    journal = JobJournal()
+    results = []
+    started = time.perf_counter()
+    try:
+        for result in fanout_processor.clone_to_shops(
+            source_client=_client_for_profile(source_profile),
+            source_item_id=source_item_id,
+            target_profiles=targets,
+            shop_code_for_image=shop_code,
+            client_factory=_client_for_profile,
+            journal=journal,
+            max_attempts=CLONE_MAX_ATTEMPTS,
+            preflight=get_default_image_preflight(),
+            global_product=global_product
+        ):
+            results.append(result)
+            if result["status"] == "success":
+                rich.print(f"  [green]✓[/green] [cyan]{result['profile']}[/cyan]: new item [bold cyan]{result['new_item_id']}[/bold cyan]")
+            else:
+                rich.print(f"  [red]✗[/red] [cyan]{result['profile']}[/cyan]: failed at {result['failed_step'] or 'error'} - {result['error']}")
+    finally:
+        journal.close()
+    batch_processor.print_stats(batch_processor.summarize_results(results, time.perf_counter() - started))
+    _export_metrics()
+    return results
+
+def load_sheet_jobs(sheet_path, users):
+    """
+    Reads and validates a job sheet with source_item_id,shop_code,profile columns, printing the rows it skips.
+    Returns (jobs, invalid row count), or None if the sheet cannot be used.
+    """
+    import job_sheet
+    try:
+        missing_columns = job_sheet.missing_sheet_columns(sheet_path)
+        if missing_columns:
+            rich.print(f"[bold red]The sheet is missing the columns:[/bold red] {', '.join(missing_columns)}")
+            return None
+        jobs, invalid, seen = [], 0, set()
+        for chunk, first_row in job_sheet.read_job_sheet(sheet_path):
+            rows = job_sheet.validate_jobs(chunk, users.keys(), None, first_row, seen)
+            for row in rows[rows["error"] != ""].itertuples(index=False):
+                rich.print(f"[yellow]Skipping row {row.row}: {row.error}[/yellow]")
+            invalid += int((rows["error"] != "").sum())
+            jobs.extend(rows[rows["error"] == ""].to_dict("records"))
+    except (OSError, ValueError) as e:
+        rich.print(f"[bold red]Could not read {sheet_path}:[/bold red] {e}")
+        return None
+    return jobs, invalid
+
+def run_sharded_clone(shards, processes, max_workers, invalid=0):
+    """Clones the shards from shard_processor.shard_jobs across worker processes. Returns (results, stats)."""
+    import batch_processor
+    import shard_processor
+
+    job_count = sum(len(jobs) for _, _, jobs in shards)
+    rich.print(f"\nCloning [bold]{job_count}[/bold] products into [bold]{len(shards)}[/bold] shops "
+               f"with {processes} processes x {max_workers} workers (Ctrl-C to stop)...")
+
+    def on_result(result):
+        if result["status"] != "success":
+            rich.print(f"  [red]✗[/red] [cyan]{result['profile']}[/cyan] {result['source_item_id']}: "
+                       f"failed at {result['failed_step'] or 'error'} - {result['error']}")
+
+    results, stats = shard_processor.run_sharded(
+        shards,
+        max_processes=processes,
+        max_workers=max_workers,
+        on_result=on_result,
+        max_attempts=CLONE_MAX_ATTEMPTS
+    )
+    batch_processor.print_stats(stats)
+    shard_processor.print_shard_report(stats)
+    batch_processor.print_missing_images(stats["missing_images"])
+    if invalid:
+        rich.print(f"[yellow]{invalid} invalid row(s) were skipped.[/yellow]")
+    _export_metrics()
+    return results, stats
+
+def run_sync(source_profile, target_profile, shop_code, full):
+    """Syncs the source shop into the target shop. Returns the results, or None if the source could not be listed."""
+    import sync_processor
+    from job_journal import JobJournal
+    from sync_index import SyncIndex
+
+    rich.print(f"\nSyncing [bold yellow]{source_profile['shop_name']}[/bold yellow] into [bold yellow]{target_profile['shop_name']}[/bold yellow]...")
+    index = SyncIndex()
+    journal = JobJournal()
+    try:
+        results, stats = sync_processor.sync_shop(
+            source_client=_client_for_profile(source_profile),
+            target_client=_client_for_profile(target_profile),
+            image_hosting_url=target_profile['hosting_url'],
+            shop_code_for_image=shop_code,
+            index=index,
+            full=full,
+            journal=journal,
+            max_attempts=CLONE_MAX_ATTEMPTS
+        )
+    finally:
+        journal.close()
+        index.close()
+    if results is not None:
+        sync_processor.print_sync_report(results, stats)
+    _export_metrics()
+    return results
+
+# --- Interactive flows ---
+
 def clone_product_flow():
     """Guides the user through the product cloning process based on new requirements."""
     selected_profile = select_user_profile()
@@ -44,28 +293,103 @@ def clone_product_flow():
         return
 
     shop_code = input("Enter the ShopCode for the new cover image (e.g., ONE): ")
+    run_clone(selected_profile, source_item_id, shop_code)
 
-    # Initialize the platform client with the selected profile's credentials
-    client = ShopeeClient(
-        partner_id=selected_profile['partner_id'],
-        partner_key=selected_profile['partner_key'],
-        access_token=selected_profile['access_token'],
-        shop_id=selected_profile['shop_id']
-    )
+def batch_clone_flow():
+    """Clones every (source_item_id, shop_code) pair listed in a CSV file."""
+    import batch_processor
 
-    # Start the cloning process with the new arguments
-    product_processor.clone_single_product(
-        platform_client=client,
-        source_item_id=source_item_id,
-        image_hosting_url=selected_profile['hosting_url'],
-        shop_code_for_image=shop_code
-    )
+    selected_profile = select_user_profile()
+    if not selected_profile:
+        return
+
+    csv_path = input("Enter the path of the CSV file (source_item_id,shop_code): ").strip()
+    try:
+        jobs = batch_processor.load_jobs_from_csv(csv_path)
+    except OSError as e:
+        rich.print(f"[bold red]Could not read {csv_path}:[/bold red] {e}")
+        return
+    if not jobs:
+        rich.print("[yellow]No valid jobs found in the file.[/yellow]")
+        return
+
+    max_workers = _read_number("Number of workers", BATCH_MAX_WORKERS)
+    results = run_batch_clone(selected_profile, jobs, max_workers)
+    _prompt_save_results(results)
+
+def fanout_clone_flow():
+    """Clones one source product into many shops at once, printing each shop's result as it finishes."""
+    rich.print("\n[bold]Source shop[/bold] (the shop that owns the product to clone)")
+    source_profile = select_user_profile()
+    if not source_profile:
+        return
+
+    try:
+        source_item_id = int(input("Enter the source product ID to clone: "))
+    except ValueError:
+        rich.print("[bold red]Invalid Product ID. It must be a number.[/bold red]")
+        return
+    shop_code = input("Enter the ShopCode for the new cover image (e.g., ONE): ")
+
+    targets = select_target_profiles()
+    if not targets:
+        return
+    global_product = False
+    if any(profile.get("merchant_access_token") for profile in targets.values()):
+        answer = input("Create one global product per merchant and publish it to its shops? (y/N): ")
+        global_product = answer.strip().lower() == "y"
+    run_fanout(source_profile, source_item_id, shop_code, targets, global_product)
+
+def sharded_clone_flow():
+    """
+    Clones a large job sheet (source_item_id,shop_code,profile) into many shops, one worker
+    process per shop at a time. Ctrl-C stops after each shop's current chunk; re-running resumes.
+    """
+    import shard_processor
+
+    users = load_users()
+    if not users:
+        rich.print("[bold red]No user profiles found![/bold red]")
+        return
+
+    sheet_path = input("Enter the path of the job sheet (.csv or .xlsx with source_item_id,shop_code,profile): ").strip()
+    loaded = load_sheet_jobs(sheet_path, users)
+    if loaded is None:
+        return
+    jobs, invalid = loaded
+    if not jobs:
+        rich.print("[yellow]No valid jobs found in the sheet.[/yellow]")
+        return
+
+    shards = shard_processor.shard_jobs(jobs, users)
+    processes = _read_number("Number of worker processes", min(SHARD_MAX_PROCESSES, len(shards)))
+    max_workers = _read_number("Workers per process", BATCH_MAX_WORKERS)
+    results, _ = run_sharded_clone(shards, processes, max_workers, invalid)
+    _prompt_save_results(results)
+
+def sync_shop_flow():
+    """Clones the source shop's new items into a target shop and updates the clones of changed ones."""
+    rich.print("\n[bold]Source shop[/bold] (the shop whose catalog is copied)")
+    source_profile = select_user_profile()
+    if not source_profile:
+        return
+    rich.print("\n[bold]Target shop[/bold] (the shop that receives the clones)")
+    target_profile = select_user_profile()
+    if not target_profile:
+        return
+    shop_code = input("Enter the ShopCode for the new cover images (e.g., ONE): ")
+    full = input("Re-check every item instead of only those updated since the last sync? [y/N]: ").strip().lower() == "y"
+    run_sync(source_profile, target_profile, shop_code, full)
 
 def main_menu():
     rich.print("\n[bold green]Shopee Product Cloner v2.0[/bold green]")
     rich.print("1. [bold]Clone a single product[/bold]")
-    rich.print("2. [bold]Register a new shop[/bold]")
-    rich.print("3. [bold]Exit[/bold]")
+    rich.print("2. [bold]Clone products in batch (CSV)[/bold]")
+    rich.print("3. [bold]Clone one product into many shops[/bold]")
+    rich.print("4. [bold]Clone a large job sheet across shops (multi-process)[/bold]")
+    rich.print("5. [bold]Sync a shop (new and changed items only)[/bold]")
+    rich.print("6. [bold]Register a new shop[/bold]")
+    rich.print("7. [bold]Exit[/bold]")
 
     while True:
         try:
@@ -74,9 +398,21 @@ def main_menu():
                 clone_product_flow()
                 break
             elif choice == '2':
-                rich.print("\nPlease run [bold cyan]python auth_util.py[/bold cyan] from your terminal.")
+                batch_clone_flow()
                 break
             elif choice == '3':
+                fanout_clone_flow()
+                break
+            elif choice == '4':
+                sharded_clone_flow()
+                break
+            elif choice == '5':
+                sync_shop_flow()
+                break
+            elif choice == '6':
+                rich.print("\nPlease run [bold cyan]python auth_util.py[/bold cyan] from your terminal.")
+                break
+            elif choice == '7':
                 rich.print("[yellow]Exiting...[/yellow]")
                 break
             else:
@@ -85,5 +421,158 @@ def main_menu():
             rich.print("\n[yellow]Exiting...[/yellow]")
             break
 
+# --- Scripted commands ---
+
+def _profile_arg(users, username):
+    """Looks up a --profile argument, printing the known names if it does not exist."""
+    if username not in users:
+        rich.print(f"[bold red]Unknown profile '{username}'.[/bold red] Known profiles: {', '.join(users) or 'none'}")
+        return None
+    return users[username]
+
+def command_profiles(args):
+    users = load_users()
+    for username, profile in users.items():
+        print(f"{username}\t{profile['shop_id']}\t{profile['shop_name']}")
+    return EXIT_OK
+
+def command_clone(args):
+    profile = _profile_arg(load_users(), args.profile)
+    if profile is None:
+        return EXIT_USAGE
+    result = run_clone(profile, args.item_id, args.shop_code)
+    return EXIT_OK if result["status"] == "success" else EXIT_FAILED
+
+def command_batch(args):
+    import batch_processor
+
+    profile = _profile_arg(load_users(), args.profile)
+    if profile is None:
+        return EXIT_USAGE
+    try:
+        jobs = batch_processor.load_jobs_from_csv(args.csv)
+    except OSError as e:
+        rich.print(f"[bold red]Could not read {args.csv}:[/bold red] {e}")
+        return EXIT_USAGE
+    if not jobs:
+        rich.print("[yellow]No valid jobs found in the file.[/yellow]")
+        return EXIT_USAGE
+    results = run_batch_clone(profile, jobs, args.workers)
+    if args.results:
+        _save_results(results, args.results)
+    return EXIT_OK if _all_succeeded(results) else EXIT_FAILED
+
+def command_fanout(args):
+    users = load_users()
+    source_profile = _profile_arg(users, args.source_profile)
+    if source_profile is None:
+        return EXIT_USAGE
+    names = list(users) if args.targets.strip().lower() == "all" else [name.strip() for name in args.targets.split(",") if name.strip()]
+    targets = {}
+    for name in names:
+        targets[name] = _profile_arg(users, name)
+        if targets[name] is None:
+            return EXIT_USAGE
+    if not targets:
+        rich.print("[bold red]No target profiles given.[/bold red]")
+        return EXIT_USAGE
+    results = run_fanout(source_profile, args.item_id, args.shop_code, targets, args.global_product)
+    return EXIT_OK if _all_succeeded(results) else EXIT_FAILED
+
+def command_sheet(args):
+    import shard_processor
+
+    users = load_users()
+    loaded = load_sheet_jobs(args.sheet, users)
+    if loaded is None:
+        return EXIT_USAGE
+    jobs, invalid = loaded
+    if not jobs:
+        rich.print("[yellow]No valid jobs found in the sheet.[/yellow]")
+        return EXIT_USAGE
+    shards = shard_processor.shard_jobs(jobs, users)
+    results, stats = run_sharded_clone(shards, args.processes, args.workers, invalid)
+    if args.results:
+        _save_results(results, args.results)
+    if stats["interrupted"]:
+        return EXIT_INTERRUPTED
+    return EXIT_OK if _all_succeeded(results) and not stats["not_started"] and not invalid else EXIT_FAILED
+
+def command_sync(args):
+    users = load_users()
+    source_profile = _profile_arg(users, args.source_profile)
+    target_profile = _profile_arg(users, args.target_profile) if source_profile else None
+    if target_profile is None:
+        return EXIT_USAGE
+    results = run_sync(source_profile, target_profile, args.shop_code, args.full)
+    return EXIT_OK if results is not None and _all_succeeded(results) else EXIT_FAILED
+
+def _positive_int(value):
+    number = int(value)
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"must be at least 1, got {value}")
+    return number
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        prog="main.py",
+        description="Shopee Product Cloner. Run without a command for the interactive menu.",
+        epilog=f"Exit codes: {EXIT_OK} all jobs succeeded, {EXIT_FAILED} some failed or were not run, "
+               f"{EXIT_USAGE} bad arguments or input, {EXIT_INTERRUPTED} interrupted.",
+    )
+    commands = parser.add_subparsers(dest="command", metavar="command")
+
+    command = commands.add_parser("profiles", help="list the saved shop profiles (name, shop ID, shop name)")
+    command.set_defaults(handler=command_profiles)
+
+    command = commands.add_parser("clone", help="clone a single product")
+    command.add_argument("--profile", required=True, help="target shop profile")
+    command.add_argument("--item-id", type=int, required=True, help="source product ID")
+    command.add_argument("--shop-code", required=True, help="ShopCode for the new cover image, e.g. ONE")
+    command.set_defaults(handler=command_clone)
+
+    command = commands.add_parser("batch", help="clone the source_item_id,shop_code pairs of a CSV file")
+    command.add_argument("--profile", required=True, help="target shop profile")
+    command.add_argument("--csv", required=True, help="CSV file of source_item_id,shop_code rows")
+    command.add_argument("--workers", type=_positive_int, default=BATCH_MAX_WORKERS, help=f"concurrent products (default {BATCH_MAX_WORKERS})")
+    command.add_argument("--results", help="write the per-item results to this CSV file")
+    command.set_defaults(handler=command_batch)
+
+    command = commands.add_parser("fanout", help="clone one product into many shops")
+    command.add_argument("--source-profile", required=True, help="shop profile that owns the product")
+    command.add_argument("--item-id", type=int, required=True, help="source product ID")
+    command.add_argument("--shop-code", required=True, help="ShopCode for the new cover image, e.g. ONE")
+    command.add_argument("--targets", required=True, help="comma-separated target profiles, or 'all'")
+    command.add_argument("--global", dest="global_product", action="store_true",
+                         help="publish one global product to each CNSC merchant's shops")
+    command.set_defaults(handler=command_fanout)
+
+    command = commands.add_parser("sheet", help="clone a job sheet (source_item_id,shop_code,profile) across shops in worker processes")
+    command.add_argument("--sheet", required=True, help=".csv or .xlsx job sheet")
+    command.add_argument("--processes", type=_positive_int, default=SHARD_MAX_PROCESSES, help=f"worker processes (default {SHARD_MAX_PROCESSES})")
+    command.add_argument("--workers", type=_positive_int, default=BATCH_MAX_WORKERS, help=f"concurrent products per process (default {BATCH_MAX_WORKERS})")
+    command.add_argument("--results", help="write the per-item results to this CSV file")
+    command.set_defaults(handler=command_sheet)
+
+    command = commands.add_parser("sync", help="clone a shop's new items into another shop and update changed clones")
+    command.add_argument("--source-profile", required=True, help="shop whose catalog is copied")
+    command.add_argument("--target-profile", required=True, help="shop that receives the clones")
+    command.add_argument("--shop-code", required=True, help="ShopCode for the new cover images, e.g. ONE")
+    command.add_argument("--full", action="store_true", help="re-check every item, not only those updated since the last sync")
+    command.set_defaults(handler=command_sync)
+    return parser
+
+def main(argv=None):
+    """Runs a command from the command line, or the interactive menu if none is given. Returns the exit code."""
+    args = build_parser().parse_args(argv)
+    if args.command is None:
+        main_menu()
+        return EXIT_OK
+    try:
+        return args.handler(args)
+    except KeyboardInterrupt:
+        rich.print("\n[yellow]Interrupted.[/yellow]")
+        return EXIT_INTERRUPTED
+
 if __name__ == "__main__":
-    main_menu()
+    sys.exit(main())
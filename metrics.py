@@ -0,0 +1,187 @@
+# metrics.py: In-process metrics for API calls and pipeline steps, exportable as Prometheus text or JSON.
+
+import json
+import os
+import tempfile
+import threading
+import time
+
+# Histogram bucket upper bounds, in seconds.
+LATENCY_BUCKETS = (0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+def _labels_key(labels):
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+def _escape(value):
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def _format_labels(labels_key, extra=()):
+    pairs = list(labels_key) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in pairs) + "}"
+
+class MetricsRegistry:
+    """
+    Thread-safe counters and latency histograms keyed by metric name and labels.
+    Instruments ShopeeClient requests (latency per API path, errors by Shopee error code,
+    throttle retries, bytes sent/received) and clone pipeline steps.
+    """
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = tuple(buckets)
+        self._lock = threading.Lock()
+        self._counters = {} # (name, labels_key) -> value
+        self._histograms = {} # (name, labels_key) -> {"counts": [...], "sum": float, "count": int}
+
+    # --- Primitives ---
+
+    def inc(self, name, value=1, **labels):
+        key = (name, _labels_key(labels))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def observe(self, name, seconds, **labels):
+        key = (name, _labels_key(labels))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = {"counts": [0] * len(self.buckets), "sum": 0.0, "count": 0}
+            for i, bound in enumerate(self.buckets):
+                if seconds <= bound:
+                    histogram["counts"][i] += 1
+                    break
+            histogram["sum"] += seconds
+            histogram["count"] += 1
+
+    # --- Instrumentation helpers ---
+
+    def observe_request(self, api_path, seconds, error_code=None, bytes_sent=0, bytes_received=0):
+        """Records one HTTP attempt against the Shopee API. `error_code` is None on success."""
+        self.observe("shopee_request_duration_seconds", seconds, path=api_path)
+        self.inc("shopee_requests_total", path=api_path, outcome="error" if error_code else "ok")
+        if error_code:
+            self.inc("shopee_errors_total", path=api_path, code=error_code)
+        if bytes_sent:
+            self.inc("shopee_bytes_sent_total", bytes_sent, path=api_path)
+        if bytes_received:
+            self.inc("shopee_bytes_received_total", bytes_received, path=api_path)
+
+    def record_retry(self, api_path, reason):
+        self.inc("shopee_retries_total", path=api_path, reason=reason)
+
+    def observe_step(self, step, seconds):
+        self.observe("clone_step_duration_seconds", seconds, step=step)
+
+    def record_clone(self, result):
+        """Counts one finished clone run (attempt) by outcome and failed step."""
+        self.inc("clone_runs_total", status=result["status"], failed_step=result.get("failed_step") or "")
+
+    def record_clone_retry(self, failed_step):
+        self.inc("clone_retries_total", failed_step=failed_step or "")
+
+    # --- Export ---
+
+    def _percentile(self, histogram, pct):
+        """Estimates a percentile as the upper bound of the bucket that contains it."""
+        if not histogram["count"]:
+            return None
+        target = pct / 100 * histogram["count"]
+        seen = 0
+        for bound, count in zip(self.buckets, histogram["counts"]):
+            seen += count
+            if seen >= target:
+                return bound
+        return float("inf")
+
+    def snapshot(self):
+        """Returns all metrics as a JSON-serializable dict."""
+        with self._lock:
+            counters = [
+                {"name": name, "labels": dict(labels), "value": value}
+                for (name, labels), value in sorted(self._counters.items())
+            ]
+            histograms = []
+            for (name, labels), histogram in sorted(self._histograms.items()):
+                histograms.append({
+                    "name": name,
+                    "labels": dict(labels),
+                    "buckets": list(self.buckets),
+                    "counts": list(histogram["counts"]),
+                    "sum": histogram["sum"],
+                    "count": histogram["count"],
+                    "p50": self._percentile(histogram, 50),
+                    "p95": self._percentile(histogram, 95),
+                })
+        return {"generated_at": time.time(), "counters": counters, "histograms": histograms}
+
+    def merge(self, snapshot):
+        """
+        Adds the counters and histograms of another registry's snapshot() into this one, e.g. the
+        metrics a worker process collected. Histograms must use the same bucket bounds.
+        """
+        with self._lock:
+            for counter in snapshot["counters"]:
+                key = (counter["name"], _labels_key(counter["labels"]))
+                self._counters[key] = self._counters.get(key, 0) + counter["value"]
+            for other in snapshot["histograms"]:
+                if tuple(other["buckets"]) != self.buckets:
+                    raise ValueError(f"Cannot merge histogram {other['name']}: bucket bounds differ.")
+                key = (other["name"], _labels_key(other["labels"]))
+                histogram = self._histograms.get(key)
+                if histogram is None:
+                    histogram = self._histograms[key] = {"counts": [0] * len(self.buckets), "sum": 0.0, "count": 0}
+                histogram["counts"] = [a + b for a, b in zip(histogram["counts"], other["counts"])]
+                histogram["sum"] += other["sum"]
+                histogram["count"] += other["count"]
+
+    def to_prometheus(self):
+        """Renders all metrics in the Prometheus text exposition format."""
+        lines = []
+        with self._lock:
+            typed = set()
+            for (name, labels), value in sorted(self._counters.items()):
+                if name not in typed:
+                    lines.append(f"# TYPE {name} counter")
+                    typed.add(name)
+                lines.append(f"{name}{_format_labels(labels)} {value}")
+            for (name, labels), histogram in sorted(self._histograms.items()):
+                if name not in typed:
+                    lines.append(f"# TYPE {name} histogram")
+                    typed.add(name)
+                cumulative = 0
+                for bound, count in zip(self.buckets, histogram["counts"]):
+                    cumulative += count
+                    lines.append(f"{name}_bucket{_format_labels(labels, [('le', str(bound))])} {cumulative}")
+                lines.append(f"{name}_bucket{_format_labels(labels, [('le', '+Inf')])} {histogram['count']}")
+                lines.append(f"{name}_sum{_format_labels(labels)} {histogram['sum']}")
+                lines.append(f"{name}_count{_format_labels(labels)} {histogram['count']}")
+        return "\n".join(lines) + "\n"
+
+    def write_json(self, path):
+        _atomic_write(path, json.dumps(self.snapshot(), indent=2))
+
+    def write_prometheus(self, path):
+        _atomic_write(path, self.to_prometheus())
+
+    def reset(self):
+        with self._lock:
+            self._counters.clear()
+            self._histograms.clear()
+
+def _atomic_write(path, text):
+    # A temp file of our own, so concurrent exports never write into each other's
+    with tempfile.NamedTemporaryFile("w", dir=os.path.dirname(os.path.abspath(path)),
+                                     prefix=f"{os.path.basename(path)}.", suffix=".tmp", delete=False) as f:
+        f.write(text)
+    try:
+        os.replace(f.name, path)
+    except OSError:
+        os.unlink(f.name)
+        raise
+
+_default_metrics = MetricsRegistry()
+
+def get_default_metrics():
+    """Returns the process-wide registry used by clients and the pipeline unless given another."""
+    return _default_metrics
@@ -0,0 +1,617 @@
+# mock_shopee_server.py: Local stand-in for the Shopee partner API, for benchmarks and offline testing.
+
+import argparse
+import hashlib
+import itertools
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+API_PREFIX = "/api/v2"
+IMAGE_PREFIX = "/images/"
+
+class MockShopeeServer:
+    """
+    Serves the Shopee API v2 endpoints used by ShopeeClient from memory, plus cover images under /images/.
+
+    Behaviour is tunable to mimic the live API under load:
+      latency / jitter   seconds added to every API call (uniformly +/- jitter); `path_latency` overrides per path
+      error_rate         fraction of API calls answered with a Shopee "error_server" error
+      rate_limit_qps     per-shop call quota; calls over it get HTTP 429 + "error_too_many_request"
+      missing_images     image file names (e.g. "SKU1_C_ONE.jpg") that return 404
+      token_ttl          seconds an access token stays valid (unlimited if None); refresh tokens rotate on use.
+                         Global product calls need a merchant main-account token (see make_profile)
+      catalog_size       number of source items (IDs 1..catalog_size) listed by get_item_list; see touch()
+      models_per_item    give every source item this many models (color x size variations); 0 for none
+
+    Use as a context manager, or start()/stop(); point clients at `api_url` and profiles at `image_url`.
+    """
+
+    def __init__(self, host="127.0.0.1", port=0, latency=0.02, jitter=0.01, path_latency=None,
+                 error_rate=0.0, rate_limit_qps=None, missing_images=(), seed=None, token_ttl=None, catalog_size=0,
+                 models_per_item=0):
+        self.latency = latency
+        self.jitter = jitter
+        self.path_latency = path_latency or {}
+        self.error_rate = error_rate
+        self.rate_limit_qps = rate_limit_qps
+        self.missing_images = set(missing_images)
+        self.token_ttl = token_ttl
+        self._tokens = {} # access_token -> expiry; make_profile's tokens expire token_ttl after start-up
+        self._refresh_tokens = {} # shop_id or ("merchant", merchant_id) -> the only refresh token currently accepted
+        self._started = time.time()
+        self.refreshes = 0
+        self.catalog_size = catalog_size
+        self.models_per_item = models_per_item
+        self._source_changes = {} # item_id -> fields changed by touch(), including update_time
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._ids = itertools.count(900000001)
+        self._buckets = {} # shop_id -> [tokens, updated]
+        self.items = {} # item_id -> item data created through add_item
+        self.global_items = {} # global_item_id -> item data created through add_global_item
+        self._publish_tasks = {} # publish_task_id -> {"global_item_id", "shop_id", "item_id"}
+        self.calls = {} # path -> count
+        self.routes = {
+            "/auth/get_access_token": self._get_access_token,
+            "/auth/access_token/get": self._refresh_access_token,
+            "/shop/get_shop_info": self._get_shop_info,
+            "/product/get_item_base_info": self._get_item_base_info,
+            "/media_space/upload_image": self._upload_image,
+            "/product/add_item": self._add_item,
+            "/product/unlist_item": self._unlist_item,
+            "/product/get_item_list": self._get_item_list,
+            "/product/update_item": self._update_item,
+            "/product/update_price": self._update_price,
+            "/product/update_stock": self._update_stock,
+            "/product/get_model_list": self._get_model_list,
+            "/product/search_item": self._search_item,
+            "/product/init_tier_variation": self._init_tier_variation,
+            "/product/add_model": self._add_model,
+            "/global_product/add_global_item": self._add_global_item,
+            "/global_product/init_tier_variation": self._init_global_tier_variation,
+            "/global_product/add_global_model": self._add_global_model,
+            "/global_product/get_global_model_list": self._get_global_model_list,
+            "/global_product/get_global_item_list": self._get_global_item_list,
+            "/global_product/get_global_item_info": self._get_global_item_info,
+            "/global_product/create_publish_task": self._create_publish_task,
+            "/global_product/get_publish_task_result": self._get_publish_task_result,
+        }
+        self._httpd = ThreadingHTTPServer((host, port), self._handler_class())
+        self._httpd.daemon_threads = True
+        self._thread = None
+
+    # --- Lifecycle ---
+
+    @property
+    def base_url(self):
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def api_url(self):
+        """Use as ShopeeClient(base_url=...)."""
+        return f"{self.base_url}{API_PREFIX}/"
+
+    @property
+    def image_url(self):
+        """Use as a profile's hosting_url."""
+        return f"{self.base_url}{IMAGE_PREFIX.rstrip('/')}"
+
+    def start(self):
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def serve_forever(self):
+        """Serves in the calling thread until interrupted."""
+        try:
+            self._httpd.serve_forever()
+        finally:
+            self._httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+
+    def make_profile(self, shop_id, partner_id=1, partner_key="mock-key", merchant_id=None):
+        """
+        Returns a users.json-style profile for a mock shop; with a `merchant_id`, a CNSC merchant's shop
+        holding the merchant's main-account tokens.
+        """
+        profile = {
+            "partner_id": partner_id,
+            "partner_key": partner_key,
+            "shop_id": shop_id,
+            "shop_name": f"Mock Shop {shop_id}",
+            "access_token": f"mock-token-{shop_id}",
+            "refresh_token": f"mock-refresh-{shop_id}",
+            "hosting_url": self.image_url,
+        }
+        if merchant_id is not None:
+            profile.update(merchant_id=merchant_id, region="SG", merchant_access_token=f"mock-merchant-token-{merchant_id}",
+                           merchant_refresh_token=f"mock-merchant-refresh-{merchant_id}")
+        return profile
+
+    # --- Simulation ---
+
+    def _next_id(self):
+        with self._lock:
+            return next(self._ids)
+
+    def _sleep(self, api_path):
+        latency = self.path_latency.get(api_path, self.latency)
+        with self._lock:
+            delay = latency + self._random.uniform(-self.jitter, self.jitter)
+        if delay > 0:
+            time.sleep(delay)
+
+    def _throttled(self, shop_id):
+        """Token bucket per shop, mirroring the live per-shop quota."""
+        if not self.rate_limit_qps:
+            return False
+        with self._lock:
+            now = time.monotonic()
+            tokens, updated = self._buckets.get(shop_id, (self.rate_limit_qps, now))
+            tokens = min(self.rate_limit_qps, tokens + (now - updated) * self.rate_limit_qps)
+            if tokens < 1:
+                self._buckets[shop_id] = (tokens, now)
+                return True
+            self._buckets[shop_id] = (tokens - 1, now)
+            return False
+
+    def _token_valid(self, access_token):
+        if not self.token_ttl:
+            return True
+        with self._lock:
+            expire_at = self._tokens.get(access_token, self._started + self.token_ttl)
+        return time.time() < expire_at
+
+    def _injected_error(self):
+        with self._lock:
+            return self.error_rate and self._random.random() < self.error_rate
+
+    def handle_api(self, api_path, query, body):
+        """Returns (http_status, json_body) for one API call."""
+        with self._lock:
+            self.calls[api_path] = self.calls.get(api_path, 0) + 1
+        route = self.routes.get(api_path)
+        if route is None:
+            return 404, {"error": "error_not_found", "message": f"Unknown path {api_path}"}
+        if "sign" not in query or "partner_id" not in query:
+            return 403, {"error": "error_sign", "message": "Missing sign or partner_id."}
+
+        self._sleep(api_path)
+        shop_id = int(query.get("shop_id", 0) or 0)
+        if "access_token" in query and not self._token_valid(query["access_token"]):
+            return 403, {"error": "invalid_access_token", "message": "Invalid access_token.", "request_id": "mock"}
+        if api_path.startswith("/global_product/") and (
+                "merchant_id" not in query or not str(query.get("access_token", "")).startswith("mock-merchant-token-")):
+            return 403, {"error": "error_permission", "message": "Global products need the merchant's main-account token.",
+                         "request_id": "mock"}
+        if self._throttled(shop_id):
+            return 429, {"error": "error_too_many_request", "message": "Too many requests."}
+        if self._injected_error():
+            return 200, {"error": "error_server", "message": "Injected server error.", "request_id": "mock"}
+        response = route(shop_id, body or query)
+        response.setdefault("error", "")
+        response.setdefault("message", "")
+        response.setdefault("request_id", "mock")
+        return 200, response
+
+    # --- Endpoints ---
+
+    def _get_access_token(self, shop_id, body):
+        if "main_account_id" in body: # A main account; in the mock it owns the merchant with the same ID
+            merchant_id = int(body["main_account_id"])
+            return {"access_token": f"mock-merchant-token-{merchant_id}", "refresh_token": f"mock-merchant-refresh-{merchant_id}",
+                    "expire_in": 14400, "merchant_id_list": [merchant_id], "shop_id_list": []}
+        shop_id = body.get("shop_id", shop_id)
+        return {"access_token": f"mock-token-{shop_id}", "refresh_token": f"mock-refresh-{shop_id}", "expire_in": 14400}
+
+    def _refresh_access_token(self, shop_id, body):
+        if "merchant_id" in body: # A main account's token, refreshed per merchant
+            merchant_id = int(body["merchant_id"])
+            key, owner, name = ("merchant", merchant_id), {"merchant_id": merchant_id}, f"merchant-%s-{merchant_id}"
+        else:
+            shop_id = int(body.get("shop_id", shop_id))
+            key, owner, name = shop_id, {"shop_id": shop_id}, f"%s-{shop_id}"
+        with self._lock:
+            expected = self._refresh_tokens.get(key, "mock-" + name % "refresh")
+            if body.get("refresh_token") != expected:
+                return {"error": "error_param", "message": "Invalid refresh_token."}
+            self.refreshes += 1
+            access_token = f"mock-{name % 'token'}-{self.refreshes}"
+            self._refresh_tokens[key] = f"mock-{name % 'refresh'}-{self.refreshes}"
+            expire_in = self.token_ttl or 14400
+            self._tokens[access_token] = time.time() + expire_in
+        return dict(owner, access_token=access_token, refresh_token=self._refresh_tokens[key], expire_in=expire_in,
+                    partner_id=body.get("partner_id"))
+
+    def _get_shop_info(self, shop_id, body):
+        return {"shop_name": f"Mock Shop {shop_id}", "region": "SG", "status": "NORMAL"}
+
+    def source_item(self, item_id):
+        """The deterministic source item returned for any item ID."""
+        item = {
+            "item_id": item_id,
+            "item_name": f"Mock Product {item_id}",
+            "item_sku": f"SKU{item_id}",
+            "description": "A product served by the mock Shopee server.",
+            "category_id": 100001,
+            "price_info": [{"original_price": 19.9, "current_price": 19.9, "currency": "SGD"}],
+            "image": {"image_id_list": [f"src-{item_id}-{i}" for i in range(3)]},
+            "stock_info_v2": {"seller_stock": [{"stock": 50}]},
+            "logistic_info": [{"logistic_id": 1, "enabled": True}],
+            "attribute_list": [],
+            "weight": 0.5,
+            "dimension": {"package_length": 10, "package_width": 10, "package_height": 5},
+            "update_time": 1700000000,
+        }
+        if self.models_per_item:
+            # Priced and stocked per model, like the live API
+            del item["price_info"], item["stock_info_v2"]
+            item["has_model"] = True
+        return item
+
+    def source_models(self, item_id):
+        """The source item's get_model_list response: colors (with images shared by every item) x sizes."""
+        sizes = ["S", "M", "L", "XL"]
+        colors = [f"Color{i}" for i in range(-(-self.models_per_item // len(sizes)))]
+        tier_variation = [
+            {"name": "Color", "option_list": [{"option": color, "image": {"image_id": f"src-{color}",
+                                                                            "image_url": f"{self.image_url}/VAR_{color}.jpg"}}
+                                              for color in colors]},
+            {"name": "Size", "option_list": [{"option": size} for size in sizes]},
+        ]
+        model = [
+            {"model_id": item_id * 1000 + i, "tier_index": [i // len(sizes), i % len(sizes)],
+             "model_sku": f"SKU{item_id}-{colors[i // len(sizes)]}-{sizes[i % len(sizes)]}",
+             "price_info": [{"original_price": 19.9 + i % len(sizes), "current_price": 19.9 + i % len(sizes)}],
+             "stock_info_v2": {"seller_stock": [{"stock": 10}]}}
+            for i in range(self.models_per_item)
+        ]
+        return {"tier_variation": tier_variation, "model": model}
+
+    def touch(self, item_id, **fields):
+        """Changes a source item (e.g. touch(3, item_name="New name")) and bumps its update_time."""
+        with self._lock:
+            changes = self._source_changes.setdefault(item_id, {})
+            changes.update(fields)
+            changes["update_time"] = max(int(time.time()), changes.get("update_time", 0) + 1)
+
+    def _source(self, item_id):
+        item = self.source_item(item_id)
+        with self._lock:
+            item.update(self._source_changes.get(item_id, {}))
+        return item
+
+    def _get_item_base_info(self, shop_id, body):
+        item_list = [self.items.get(item_id) or self._source(item_id) for item_id in body.get("item_id_list", [])]
+        return {"response": {"item_list": item_list}}
+
+    def _get_item_list(self, shop_id, query):
+        offset, page_size = int(query.get("offset", 0)), int(query.get("page_size", 100))
+        update_time_from = int(query.get("update_time_from", 0))
+        update_time_to = int(query.get("update_time_to", 2 ** 62))
+        items = [
+            {"item_id": item["item_id"], "item_status": "NORMAL", "update_time": item["update_time"]}
+            for item in map(self._source, range(1, self.catalog_size + 1))
+            if update_time_from <= item["update_time"] <= update_time_to
+        ]
+        page = items[offset:offset + page_size]
+        has_next_page = offset + page_size < len(items)
+        return {"response": {"item": page, "total_count": len(items), "has_next_page": has_next_page,
+                             "next_offset": offset + page_size if has_next_page else 0}}
+
+    def _created_item(self, item_id):
+        with self._lock:
+            return self.items.get(int(item_id))
+
+    def _update_item(self, shop_id, body):
+        item = self._created_item(body.get("item_id", 0))
+        if item is None:
+            return {"error": "error_item_not_found", "message": "Item not found."}
+        with self._lock:
+            item.update(body)
+        return {"response": {"item_id": item["item_id"]}}
+
+    def _update_price(self, shop_id, body):
+        item = self._created_item(body.get("item_id", 0))
+        if item is None:
+            return {"error": "error_item_not_found", "message": "Item not found."}
+        success, failure = [], []
+        with self._lock:
+            models = {model["model_id"]: model for model in item.get("model", [])}
+            for entry in body.get("price_list", []):
+                target = item if entry["model_id"] == 0 else models.get(entry["model_id"])
+                if target is None:
+                    failure.append({"model_id": entry["model_id"], "failed_reason": "model not found"})
+                    continue
+                target["original_price"] = entry["original_price"]
+                success.append({"model_id": entry["model_id"], "original_price": entry["original_price"]})
+        return {"response": {"success_list": success, "failure_list": failure}}
+
+    def _update_stock(self, shop_id, body):
+        item = self._created_item(body.get("item_id", 0))
+        if item is None:
+            return {"error": "error_item_not_found", "message": "Item not found."}
+        success, failure = [], []
+        with self._lock:
+            models = {model["model_id"]: model for model in item.get("model", [])}
+            for entry in body.get("stock_list", []):
+                if entry["model_id"] == 0:
+                    item["stock_info_v2"] = {"seller_stock": entry["seller_stock"]}
+                elif entry["model_id"] in models:
+                    models[entry["model_id"]]["seller_stock"] = entry["seller_stock"]
+                else:
+                    failure.append({"model_id": entry["model_id"], "failed_reason": "model not found"})
+                    continue
+                success.append({"model_id": entry["model_id"]})
+        return {"response": {"success_list": success, "failure_list": failure}}
+
+    def _get_model_list(self, shop_id, query):
+        item_id = int(query.get("item_id", 0))
+        item = self._created_item(item_id)
+        if item is not None:
+            with self._lock:
+                return {"response": {"tier_variation": item.get("tier_variation", []), "model": list(item.get("model", []))}}
+        if not self.models_per_item:
+            return {"response": {"tier_variation": [], "model": []}}
+        return {"response": self.source_models(item_id)}
+
+    def _search_item(self, shop_id, query):
+        with self._lock:
+            item_ids = [item_id for item_id, item in self.items.items()
+                        if item["shop_id"] == shop_id and item.get("item_sku") == query.get("item_sku")]
+        return {"response": {"item_id_list": item_ids, "total_count": len(item_ids), "next_offset": ""}}
+
+    def _store_models(self, item, models):
+        """Adds models to a created item; returns an error message, or None."""
+        if len(models) > 50:
+            return "Too many models in one call."
+        taken = {tuple(model["tier_index"]) for model in item.setdefault("model", [])}
+        if any(tuple(model["tier_index"]) in taken for model in models):
+            return "Model with the same tier_index already exists."
+        for model in models:
+            item["model"].append(dict(model, model_id=next(self._ids)))
+        return None
+
+    def _init_tier_variation(self, shop_id, body):
+        item = self._created_item(body.get("item_id", 0))
+        if item is None:
+            return {"error": "error_item_not_found", "message": "Item not found."}
+        with self._lock:
+            if item.get("tier_variation"):
+                return {"error": "error_param", "message": "Tier variation is already initialized."}
+            item["tier_variation"] = body.get("tier_variation", [])
+            error = self._store_models(item, body.get("model", []))
+            if error:
+                return {"error": "error_param", "message": error}
+            return {"response": {"item_id": item["item_id"], "tier_variation": item["tier_variation"],
+                                 "model": list(item["model"])}}
+
+    def _add_model(self, shop_id, body):
+        item = self._created_item(body.get("item_id", 0))
+        if item is None:
+            return {"error": "error_item_not_found", "message": "Item not found."}
+        with self._lock:
+            if not item.get("tier_variation"):
+                return {"error": "error_param", "message": "Call init_tier_variation first."}
+            error = self._store_models(item, body.get("model_list", []))
+            if error:
+                return {"error": "error_param", "message": error}
+            return {"response": {"model": item["model"][-len(body.get("model_list", [])):]}}
+
+    def _upload_image(self, shop_id, body):
+        image_url = body.get("image_url", "")
+        if image_url.rsplit("/", 1)[-1] in self.missing_images:
+            return {"error": "error_param", "message": f"Failed to download image {image_url}."}
+        image_id = hashlib.sha1(image_url.encode()).hexdigest()[:24]
+        return {"response": {"image_info": {"image_id": image_id, "image_url_list": []}}}
+
+    def _add_item(self, shop_id, body):
+        item_id = self._next_id()
+        with self._lock:
+            self.items[item_id] = dict(body, item_id=item_id, shop_id=shop_id, create_time=int(time.time()))
+        return {"response": {"item_id": item_id, "item_status": body.get("item_status", "NORMAL")}}
+
+    def _unlist_item(self, shop_id, body):
+        success, failure = [], []
+        for entry in body.get("item_list", []):
+            item = self.items.get(entry["item_id"])
+            if item is None:
+                failure.append({"item_id": entry["item_id"], "failed_reason": "item not found"})
+                continue
+            item["item_status"] = "UNLIST" if entry.get("unlist") else "NORMAL"
+            success.append({"item_id": entry["item_id"], "unlist": entry.get("unlist", False)})
+        return {"response": {"success_list": success, "failure_list": failure}}
+
+    def _global_item(self, global_item_id):
+        with self._lock:
+            return self.global_items.get(int(global_item_id))
+
+    def _add_global_item(self, shop_id, body):
+        global_item_id = self._next_id()
+        with self._lock:
+            self.global_items[global_item_id] = dict(body, global_item_id=global_item_id, published={},
+                                                     create_time=int(time.time()))
+        return {"response": {"global_item_id": global_item_id}}
+
+    def _init_global_tier_variation(self, shop_id, body):
+        item = self._global_item(body.get("global_item_id", 0))
+        if item is None:
+            return {"error": "error_item_not_found", "message": "Global item not found."}
+        with self._lock:
+            if item.get("tier_variation"):
+                return {"error": "error_param", "message": "Tier variation is already initialized."}
+            item["tier_variation"] = body.get("tier_variation", [])
+            error = self._store_models(item, body.get("global_model", []))
+            if error:
+                return {"error": "error_param", "message": error}
+            return {"response": {"global_item_id": item["global_item_id"], "global_model": list(item["model"])}}
+
+    def _add_global_model(self, shop_id, body):
+        item = self._global_item(body.get("global_item_id", 0))
+        if item is None:
+            return {"error": "error_item_not_found", "message": "Global item not found."}
+        with self._lock:
+            if not item.get("tier_variation"):
+                return {"error": "error_param", "message": "Call init_tier_variation first."}
+            error = self._store_models(item, body.get("global_model", []))
+            if error:
+                return {"error": "error_param", "message": error}
+            return {"response": {"global_model": item["model"][-len(body.get("global_model", [])):]}}
+
+    def _get_global_model_list(self, shop_id, query):
+        item = self._global_item(query.get("global_item_id", 0))
+        if item is None:
+            return {"error": "error_item_not_found", "message": "Global item not found."}
+        with self._lock:
+            return {"response": {"tier_variation": item.get("tier_variation", []), "global_model": list(item.get("model", []))}}
+
+    def _get_global_item_list(self, shop_id, query):
+        offset, page_size = int(query.get("offset", 0)), int(query.get("page_size", 100))
+        update_time_from = int(query.get("update_time_from", 0) or 0)
+        with self._lock:
+            items = [{"global_item_id": item_id, "update_time": item["create_time"]}
+                     for item_id, item in self.global_items.items() if item["create_time"] >= update_time_from]
+        page = items[offset:offset + page_size]
+        has_next_page = offset + page_size < len(items)
+        return {"response": {"global_item_list": page, "total_count": len(items), "has_next_page": has_next_page,
+                             "offset": offset + page_size if has_next_page else 0}}
+
+    def _get_global_item_info(self, shop_id, query):
+        global_item_ids = query.get("global_item_id_list", [])
+        if isinstance(global_item_ids, str):
+            global_item_ids = [global_item_ids]
+        with self._lock:
+            items = [{key: value for key, value in self.global_items[int(item_id)].items() if key != "published"}
+                     for item_id in global_item_ids if int(item_id) in self.global_items]
+        return {"response": {"global_item_list": items}}
+
+    def _create_publish_task(self, shop_id, body):
+        item = self._global_item(body.get("global_item_id", 0))
+        if item is None:
+            return {"error": "error_item_not_found", "message": "Global item not found."}
+        target_shop_id = int(body.get("shop_id", 0))
+        with self._lock:
+            if target_shop_id in item["published"]:
+                return {"error": "error_duplicate", "message": "Global item is already published to this shop."}
+            task_id = next(self._ids)
+            self._publish_tasks[task_id] = {"global_item_id": item["global_item_id"], "shop_id": target_shop_id, "item_id": None,
+                                            "item": body.get("item") or {}}
+        return {"response": {"publish_task_id": task_id}}
+
+    def _get_publish_task_result(self, shop_id, query):
+        """Publish tasks finish when first polled: the shop gets a listed copy of the global item."""
+        with self._lock:
+            task = self._publish_tasks.get(int(query.get("publish_task_id", 0)))
+            if task is None:
+                return {"error": "error_not_found", "message": "Publish task not found."}
+            if task["item_id"] is None:
+                item = self.global_items[task["global_item_id"]]
+                task["item_id"] = next(self._ids)
+                item["published"][task["shop_id"]] = task["item_id"]
+                self.items[task["item_id"]] = dict(
+                    {key: value for key, value in item.items() if key not in ("published", "global_item_id")},
+                    item_id=task["item_id"], shop_id=task["shop_id"], global_item_id=task["global_item_id"],
+                    item_name=item.get("global_item_name"), item_status="NORMAL")
+                self.items[task["item_id"]].update(task["item"]) # The shop's own name, price and logistics
+            return {"response": {"publish_status": "success",
+                                 "success": {"shop_id": task["shop_id"], "item_id": task["item_id"], "region": "SG"}}}
+
+    # --- HTTP plumbing ---
+
+    def _handler_class(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1" # keep-alive, like the live API
+            # Headers and body go out in separate writes; without this, delayed ACKs add ~40 ms per call.
+            disable_nagle_algorithm = True
+
+            def _send(self, status, payload, headers=None, include_body=True):
+                data = payload if isinstance(payload, bytes) else json.dumps(payload).encode()
+                self.send_response(status)
+                self.send_header("Content-Length", str(len(data)))
+                for key, value in (headers or {}).items():
+                    self.send_header(key, value)
+                self.end_headers()
+                if include_body:
+                    self.wfile.write(data)
+
+            def _image(self, include_body):
+                name = urlparse(self.path).path[len(IMAGE_PREFIX):]
+                if name in server.missing_images:
+                    self._send(404, b"", include_body=include_body)
+                    return
+                body = hashlib.sha256(name.encode()).digest() * 64 # stable fake JPEG bytes
+                etag = f'"{hashlib.md5(body).hexdigest()}"'
+                if self.headers.get("If-None-Match") == etag:
+                    self._send(304, b"", {"ETag": etag}, include_body=False)
+                    return
+                self._send(200, body, {"Content-Type": "image/jpeg", "ETag": etag}, include_body=include_body)
+
+            def _api(self):
+                parsed = urlparse(self.path)
+                length = int(self.headers.get("Content-Length") or 0)
+                raw = self.rfile.read(length) if length else b""
+                try:
+                    body = json.loads(raw) if raw else {}
+                except ValueError:
+                    self._send(400, {"error": "error_param", "message": "Invalid JSON body."})
+                    return
+                # Repeated keys (list params, see query_pairs) become lists
+                query = {key: values[0] if len(values) == 1 else values for key, values in parse_qs(parsed.query).items()}
+                status, payload = server.handle_api(parsed.path[len(API_PREFIX):], query, body)
+                headers = {"Content-Type": "application/json"}
+                if status == 429:
+                    headers["Retry-After"] = "1"
+                self._send(status, payload, headers)
+
+            def do_GET(self):
+                if self.path.startswith(IMAGE_PREFIX):
+                    self._image(include_body=True)
+                else:
+                    self._api()
+
+            def do_HEAD(self):
+                if self.path.startswith(IMAGE_PREFIX):
+                    self._image(include_body=False)
+                else:
+                    self._send(405, b"", include_body=False)
+
+            def do_POST(self):
+                self._api()
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run a local mock of the Shopee partner API.")
+    parser.add_argument("--port", type=int, default=8899)
+    parser.add_argument("--latency", type=float, default=0.05, help="Seconds added to every API call.")
+    parser.add_argument("--jitter", type=float, default=0.02)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--rate-limit-qps", type=float, default=None, help="Per-shop call quota.")
+    args = parser.parse_args()
+
+    mock = MockShopeeServer(port=args.port, latency=args.latency, jitter=args.jitter,
+                            error_rate=args.error_rate, rate_limit_qps=args.rate_limit_qps)
+    print(f"Mock Shopee API on {mock.api_url} (images under {mock.image_url}/). Press Ctrl-C to stop.")
+    try:
+        mock.serve_forever()
+    except KeyboardInterrupt:
+        pass
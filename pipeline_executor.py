@@ -0,0 +1,207 @@
+# pipeline_executor.py: Runs a DAG of platform-agnostic pipeline steps, overlapping the steps that don't depend on each other.
+
+import asyncio
+import inspect
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+class StepFailed(Exception):
+    """Raised by a step to fail the pipeline. `retryable` is False when another attempt cannot succeed."""
+
+    def __init__(self, message, retryable=True):
+        super().__init__(message)
+        self.retryable = retryable
+
+def pipeline_step(name, run, after=(), journaled=False, timing=None):
+    """
+    Declares one step. `run(context, outputs)` is a generator that yields (method_name, args) for each
+    platform call and is sent the call's response; its return value is the step's output, available to
+    later steps as outputs[name]. It may also be a plain function when the step makes no calls.
+    `after` names the steps it needs. A `journaled` step's output is recorded when it succeeds and,
+    when already recorded by an earlier attempt, is reused instead of running it.
+    Call time is added to timings[`timing` or name].
+    """
+    return {"name": name, "run": run, "after": tuple(after), "journaled": journaled, "timing": timing or name}
+
+def _check(steps):
+    seen = set()
+    for step in steps:
+        unknown = [name for name in step["after"] if name not in seen]
+        if unknown:
+            raise ValueError(f"Step {step['name']!r} runs after {unknown}, which must be declared before it.")
+        seen.add(step["name"])
+
+class _PipelineRun:
+    """The bookkeeping of one run: which steps are done, running, needed and failed."""
+
+    def __init__(self, steps, completed, record):
+        _check(steps)
+        self.steps = steps
+        self.record = record
+        self.outputs = {}
+        self.timings = {}
+        self.started = set()
+        self.failed = None # (step name, StepFailed) of the first step that failed
+        completed = completed or {}
+        for step in steps:
+            if step["journaled"] and step["name"] in completed:
+                self.outputs[step["name"]] = completed[step["name"]]
+        self.needed = self._needed()
+
+    def _needed(self):
+        """
+        Every step without a recorded output that is either a final step or needed by a step that
+        runs; e.g. the source fetch is skipped when everything built from it was recorded.
+        """
+        dependents = {}
+        for step in self.steps:
+            for name in step["after"]:
+                dependents.setdefault(name, []).append(step["name"])
+        needed = set()
+        for step in reversed(self.steps):
+            name = step["name"]
+            if name not in self.outputs and (name not in dependents or any(d in needed for d in dependents[name])):
+                needed.add(name)
+        return needed
+
+    def ready(self):
+        if self.failed is not None:
+            return []
+        return [step for step in self.steps
+                if step["name"] in self.needed and step["name"] not in self.started
+                and all(name in self.outputs for name in step["after"])]
+
+    def finish(self, step, output, error, elapsed):
+        if elapsed is not None: # None when the step made no calls
+            self.timings[step["timing"]] = self.timings.get(step["timing"], 0.0) + elapsed
+        if error is not None:
+            if self.failed is None:
+                self.failed = (step["name"], error)
+            return
+        self.outputs[step["name"]] = output
+        if step["journaled"] and self.record is not None:
+            self.record(step["name"], output)
+
+    def outcome(self):
+        return {"outputs": self.outputs, "failed": self.failed, "timings": self.timings}
+
+def _begin(step, context, outputs):
+    """
+    Starts a step up to its first platform call, in the calling thread, so steps that turn out to
+    need no calls finish without a thread or task. Returns (steps, first request) for a step that
+    makes calls, or (None, (output, StepFailed or None, None)) for one that already finished.
+    """
+    try:
+        steps = step["run"](context, outputs)
+        if not inspect.isgenerator(steps):
+            return None, (steps, None, None)
+        return steps, next(steps)
+    except StopIteration as stop:
+        return None, (stop.value, None, None)
+    except StepFailed as e:
+        return None, (None, e, None)
+
+def _drive(step, steps, request, call, on_call):
+    """Makes a started step's calls. Returns (output, StepFailed or None, seconds spent in calls)."""
+    elapsed = 0.0
+    try:
+        while True:
+            method_name, args = request
+            if on_call is not None:
+                on_call(step["timing"])
+            started = time.perf_counter()
+            response = call(method_name, args)
+            elapsed += time.perf_counter() - started
+            try:
+                request = steps.send(response)
+            except StopIteration as stop:
+                return stop.value, None, elapsed
+    except StepFailed as e:
+        return None, e, elapsed
+
+async def _drive_async(step, steps, request, call, on_call):
+    """Async variant of _drive for coroutine platform calls."""
+    elapsed = 0.0
+    try:
+        while True:
+            method_name, args = request
+            if on_call is not None:
+                on_call(step["timing"])
+            started = time.perf_counter()
+            response = await call(method_name, args)
+            elapsed += time.perf_counter() - started
+            try:
+                request = steps.send(response)
+            except StopIteration as stop:
+                return stop.value, None, elapsed
+    except StepFailed as e:
+        return None, e, elapsed
+
+def _start_ready(run, context):
+    """
+    Starts every step that is ready, finishing those that need no calls (which may make more steps
+    ready). Returns [(step, steps, first request)] for the steps waiting on calls.
+    """
+    started = []
+    ready = run.ready()
+    while ready:
+        for step in ready:
+            run.started.add(step["name"])
+            steps, begun = _begin(step, context, run.outputs)
+            if steps is None:
+                run.finish(step, *begun)
+            else:
+                started.append((step, steps, begun))
+        ready = run.ready()
+    return started
+
+def run_pipeline(steps, call, context, completed=None, record=None, on_call=None):
+    """
+    Runs `steps` (declared in dependency order), each as soon as the steps it needs are done.
+    `call(method_name, args)` makes one platform call and returns its response. Steps that wait on
+    calls at the same time run on their own threads; a lone one runs in the calling thread, so a
+    linear stretch of the DAG costs no thread hand-offs. `completed` maps journaled steps to outputs
+    recorded by an earlier attempt, and `record(name, output)` is called as journaled steps succeed.
+    `on_call(timing)` is called as each platform call starts.
+    After a step fails no new steps start, but running ones finish (and are recorded).
+    Returns {"outputs", "failed": (step name, StepFailed) or None, "timings"}.
+    """
+    run = _PipelineRun(steps, completed, record)
+    pool = None
+    running = {}
+    try:
+        while True:
+            started = _start_ready(run, context)
+            if not running and len(started) == 1:
+                step, step_steps, request = started[0]
+                run.finish(step, *_drive(step, step_steps, request, call, on_call))
+                continue
+            for step, step_steps, request in started:
+                if pool is None:
+                    pool = ThreadPoolExecutor(max_workers=len(steps), thread_name_prefix="pipeline-step")
+                running[pool.submit(_drive, step, step_steps, request, call, on_call)] = step
+            if not running:
+                return run.outcome()
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                run.finish(running.pop(future), *future.result())
+    finally:
+        if pool is not None:
+            pool.shutdown(wait=True)
+
+async def run_pipeline_async(steps, call, context, completed=None, record=None, on_call=None):
+    """Async variant of run_pipeline: `call` returns an awaitable, and steps waiting on calls run as concurrent tasks."""
+    run = _PipelineRun(steps, completed, record)
+    running = {}
+    try:
+        while True:
+            for step, step_steps, request in _start_ready(run, context):
+                running[asyncio.ensure_future(_drive_async(step, step_steps, request, call, on_call))] = step
+            if not running:
+                return run.outcome()
+            done, _ = await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                run.finish(running.pop(task), *task.result())
+    finally:
+        for task in running: # Only left over when a step raised something other than StepFailed
+            task.cancel()
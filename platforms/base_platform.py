@@ -5,25 +5,102 @@ from abc import ABC, abstractmethod
 class BasePlatform(ABC):
     """
     Defines the standard methods that every platform client must implement.
-    This ensures that the product_processor can work with any platform.
+    These are the primitives the clone pipeline (product_processor) calls, so it can work with any
+    platform. Responses follow the Shopee API v2 shape ({"response": {...}}), which the pipeline reads.
+    Clients driven by clone_single_product_async return awaitables from them.
+
+    The batched methods default to one call per item; platforms with batch endpoints (and async
+    clients) override them. Variations and global products are optional.
     """
-    
+
     @abstractmethod
     def get_product_details(self, item_id):
         pass
-        
+
+    def get_product_details_batch(self, item_ids):
+        """Returns (details, missing): item data keyed by item_id, and a reason keyed by each item_id not fetched."""
+        details, missing = {}, {}
+        for item_id in dict.fromkeys(int(item_id) for item_id in item_ids):
+            response = self.get_product_details(item_id)
+            item_list = ((response or {}).get("response") or {}).get("item_list")
+            if item_list:
+                details[item_id] = item_list[0]
+            else:
+                missing[item_id] = "not found"
+        return details, missing
+
     @abstractmethod
     def upload_image(self, image_url):
         pass
-        
+
+    def upload_images(self, image_urls):
+        """Returns (image_ids, failed): image_id keyed by URL, and a reason keyed by each URL that failed."""
+        image_ids, failed = {}, {}
+        for image_url in dict.fromkeys(image_urls):
+            response = self.upload_image(image_url)
+            image_info = ((response or {}).get("response") or {}).get("image_info")
+            if image_info:
+                image_ids[image_url] = image_info["image_id"]
+            else:
+                failed[image_url] = "upload failed"
+        return image_ids, failed
+
     @abstractmethod
-    def create_global_item(self, product_data, image_ids):
+    def create_item(self, item_data):
+        """Creates an unlisted item from a prepare_product_template payload; publish_item makes it live."""
         pass
-        
+
     @abstractmethod
-    def publish_item(self, global_item_id, shop_id):
+    def publish_item(self, item_id):
         pass
 
+    def find_items_by_sku(self, item_sku, created_after=None):
+        """
+        IDs of the shop's items with this SKU created at or after `created_after` (epoch seconds), oldest
+        first, or None if the lookup failed. Resumed clones use it to find the item of a create call
+        whose response was lost, instead of creating a duplicate.
+        """
+        raise NotImplementedError(f"{type(self).__name__} cannot look up items by SKU.")
+
+    def init_tier_variation(self, item_id, tier_variation, models):
+        raise NotImplementedError(f"{type(self).__name__} does not support variations.")
+
+    def add_model(self, item_id, models):
+        raise NotImplementedError(f"{type(self).__name__} does not support variations.")
+
+    def get_model_list(self, item_id):
+        """An item's {"response": {"tier_variation", "model"}}, so interrupted variation calls can be checked."""
+        raise NotImplementedError(f"{type(self).__name__} does not support variations.")
+
+    # --- Global products ---
+    # A global product is created once for a merchant and published to several of its shops.
+
+    def supports_global_items(self):
+        return False
+
+    def create_global_item(self, item_data):
+        raise NotImplementedError(f"{type(self).__name__} does not support global products.")
+
+    def init_global_tier_variation(self, global_item_id, tier_variation, models):
+        raise NotImplementedError(f"{type(self).__name__} does not support global products.")
+
+    def add_global_model(self, global_item_id, models):
+        raise NotImplementedError(f"{type(self).__name__} does not support global products.")
+
+    def get_global_model_list(self, global_item_id):
+        raise NotImplementedError(f"{type(self).__name__} does not support global products.")
+
+    def find_global_items_by_sku(self, item_sku, created_after=None):
+        raise NotImplementedError(f"{type(self).__name__} does not support global products.")
+
+    def publish_global_item(self, global_item_id, shops):
+        """
+        Publishes a global item to several shops ([{"shop_id", "shop_region", "item"}], "item" holding each
+        shop's own listing fields; see product_processor.shop_listing) in one batched operation.
+        Returns (item_ids, failed): the new item_id keyed by shop_id, and a reason keyed by each shop_id that failed.
+        """
+        raise NotImplementedError(f"{type(self).__name__} does not support global products.")
+
     @abstractmethod
     def get_access_token(self, auth_code, shop_id):
         pass
@@ -0,0 +1,137 @@
+# platforms/rate_limiter.py: Token-bucket request scheduler for partner/shop/path call quotas
+
+import random
+import threading
+import time
+
+from config import (
+    RATE_LIMIT_PARTNER_QPS, RATE_LIMIT_SHOP_QPS, RATE_LIMIT_PATH_QPS, RATE_LIMIT_SAFETY_FACTOR,
+    THROTTLE_BACKOFF_BASE, THROTTLE_BACKOFF_MAX,
+)
+
+# Adaptive rate control: a throttle response halves a bucket's rate, every successful call
+# wins back a small step, until the configured rate is reached again (AIMD).
+MIN_RATE_FACTOR = 0.05
+RECOVERY_STEP = 0.02
+
+class TokenBucket:
+    """
+    A token bucket that hands out reservations instead of rejecting calls.
+    Tokens may go negative: each caller is told how long to wait for its own token,
+    which queues callers in arrival order and paces them at `rate` per second.
+    Not thread-safe on its own; RequestScheduler serializes access.
+    """
+
+    def __init__(self, rate, capacity=None):
+        self.base_rate = rate
+        self.rate_factor = 1.0
+        self.capacity = capacity if capacity is not None else max(1.0, rate)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+
+    @property
+    def rate(self):
+        return self.base_rate * self.rate_factor
+
+    def _refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def reserve(self, now):
+        """Takes one token and returns how many seconds the caller must wait before using it."""
+        self._refill(now)
+        self.tokens -= 1
+        wait = 0.0 if self.tokens >= 0 else -self.tokens / self.rate
+        return max(wait, self.blocked_until - now)
+
+    def throttle(self, now, backoff):
+        """Slows the bucket down after a throttle response and pauses it for `backoff` seconds."""
+        self._refill(now)
+        self.rate_factor = max(MIN_RATE_FACTOR, self.rate_factor / 2)
+        self.tokens = min(self.tokens, 0.0)
+        self.blocked_until = max(self.blocked_until, now + backoff)
+
+    def recover(self):
+        self.rate_factor = min(1.0, self.rate_factor + RECOVERY_STEP)
+
+class RequestScheduler:
+    """
+    Paces Shopee API calls against per-partner, per-shop and per-path token buckets.
+    A call must wait for a token from every bucket that applies to it. Share one scheduler
+    between all clients in a process (see get_default_scheduler) so the budgets are global.
+    """
+
+    def __init__(self, partner_qps=RATE_LIMIT_PARTNER_QPS, shop_qps=RATE_LIMIT_SHOP_QPS,
+                 path_qps=None, safety_factor=RATE_LIMIT_SAFETY_FACTOR):
+        self.partner_qps = partner_qps * safety_factor
+        self.shop_qps = shop_qps * safety_factor
+        self.path_qps = {path: qps * safety_factor for path, qps in (RATE_LIMIT_PATH_QPS if path_qps is None else path_qps).items()}
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    def _bucket(self, key, rate):
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = self._buckets[key] = TokenBucket(rate)
+        return bucket
+
+    def _buckets_for(self, partner_id, shop_id, api_path):
+        buckets = [self._bucket(("partner", partner_id), self.partner_qps)]
+        if shop_id is not None:
+            buckets.append(self._bucket(("shop", partner_id, shop_id), self.shop_qps))
+        if api_path in self.path_qps:
+            buckets.append(self._bucket(("path", partner_id, api_path), self.path_qps[api_path]))
+        return buckets
+
+    def reserve(self, partner_id, shop_id, api_path):
+        """Reserves a call slot and returns the delay (seconds) before the call may be sent."""
+        with self._lock:
+            now = time.monotonic()
+            return max(bucket.reserve(now) for bucket in self._buckets_for(partner_id, shop_id, api_path))
+
+    def acquire(self, partner_id, shop_id, api_path):
+        """Blocks until a call slot is available."""
+        delay = self.reserve(partner_id, shop_id, api_path)
+        if delay > 0:
+            time.sleep(delay)
+
+    def on_throttle(self, partner_id, shop_id, api_path, attempt, retry_after=None):
+        """
+        Records a throttle response and returns the backoff (seconds) before retrying.
+        Uses the server's Retry-After when given, otherwise exponential backoff with jitter.
+        """
+        if retry_after is not None:
+            backoff = min(THROTTLE_BACKOFF_MAX, retry_after)
+        else:
+            backoff = min(THROTTLE_BACKOFF_MAX, THROTTLE_BACKOFF_BASE * 2 ** attempt) * random.uniform(0.5, 1.0)
+        with self._lock:
+            now = time.monotonic()
+            for bucket in self._buckets_for(partner_id, shop_id, api_path):
+                bucket.throttle(now, backoff)
+        return backoff
+
+    def on_success(self, partner_id, shop_id, api_path):
+        """Lets throttled buckets gradually return to their configured rate."""
+        with self._lock:
+            for bucket in self._buckets_for(partner_id, shop_id, api_path):
+                if bucket.rate_factor < 1.0:
+                    bucket.recover()
+
+_default_scheduler = None
+_default_scheduler_lock = threading.Lock()
+
+def get_default_scheduler():
+    """Returns the process-wide scheduler shared by clients that are not given one."""
+    global _default_scheduler
+    with _default_scheduler_lock:
+        if _default_scheduler is None:
+            _default_scheduler = RequestScheduler()
+        return _default_scheduler
+
+def parse_retry_after(value):
+    """Parses a Retry-After header given in seconds; returns None if absent or not numeric."""
+    try:
+        return float(value) if value is not None else None
+    except ValueError:
+        return None
@@ -0,0 +1,173 @@
+# platforms/shopee_async_client.py: Asyncio-native Shopee API v2 implementation
+
+import asyncio
+import json
+import time
+
+import aiohttp
+import rich
+
+from platforms.shopee_client import ShopeeClient, ShopeeEndpoints, query_pairs, is_throttled, is_auth_error, response_error_code
+from platforms.rate_limiter import get_default_scheduler
+from platforms.shopee_signer import get_signer
+from image_cache import cached_upload_response
+from metrics import get_default_metrics
+from config import SHOPEE_API_V2_URL, HTTP_POOL_SIZE, HTTP_CONNECT_TIMEOUT, HTTP_READ_TIMEOUT, ASYNC_MAX_CONCURRENCY, THROTTLE_MAX_RETRIES
+
+def create_async_session(pool_size=HTTP_POOL_SIZE, connect_timeout=HTTP_CONNECT_TIMEOUT, read_timeout=HTTP_READ_TIMEOUT):
+    """
+    Creates an aiohttp session with a bounded keep-alive connection pool.
+    Share one session between the clients of many shops to drive them all from a single event loop.
+    Must be called while an event loop is running.
+    """
+    connector = aiohttp.TCPConnector(limit=pool_size, keepalive_timeout=60)
+    timeout = aiohttp.ClientTimeout(sock_connect=connect_timeout, sock_read=read_timeout)
+    return aiohttp.ClientSession(connector=connector, timeout=timeout, headers={"Content-Type": "application/json"})
+
+def _loads_or_none(text):
+    try:
+        return json.loads(text)
+    except ValueError:
+        return None
+
+class AsyncShopeeClient(ShopeeEndpoints):
+    """
+    Async counterpart of ShopeeClient: the same endpoints (see ShopeeEndpoints), awaited.
+    `max_concurrency` bounds the calls in flight for this client; pass a shared `semaphore`
+    instead to bound several clients (e.g. one per shop) together.
+    """
+
+    def __init__(self, partner_id, partner_key, access_token=None, shop_id=None,
+                 session=None, max_concurrency=ASYNC_MAX_CONCURRENCY, semaphore=None,
+                 scheduler=None, image_cache=None, details_cache=None, metrics=None, base_url=None, token_manager=None,
+                 merchant_id=None, merchant_access_token=None, merchant_token_manager=None):
+        self.partner_id = partner_id
+        self.partner_key = partner_key
+        self.access_token = access_token
+        self.shop_id = shop_id
+        self.merchant_id = merchant_id
+        self.merchant_access_token = merchant_access_token
+        self.session = session
+        self._owns_session = session is None
+        self._semaphore = semaphore or asyncio.Semaphore(max_concurrency)
+        self.scheduler = scheduler or get_default_scheduler()
+        self.image_cache = image_cache
+        self.details_cache = details_cache
+        self.metrics = metrics or get_default_metrics()
+        self.base_url = base_url or SHOPEE_API_V2_URL
+        self.signer = get_signer(partner_id, partner_key, self.base_url)
+        self.token_manager = token_manager
+        self.merchant_token_manager = merchant_token_manager
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+
+    async def close(self):
+        """Closes the session if this client created it."""
+        if self._owns_session and self.session is not None:
+            await self.session.close()
+            self.session = None
+
+    def _get_session(self):
+        # Created lazily so the session is bound to the running event loop.
+        if self.session is None:
+            self.session = create_async_session()
+        return self.session
+
+    async def _make_request(self, api_path, method, body=None, needs_access_token=True, params=None, merchant_level=False):
+        """
+        A helper coroutine to make signed requests to the Shopee API.
+        Calls are paced by the rate-limit scheduler; throttled calls are retried with backoff.
+        `merchant_level` calls (global products) are signed for the merchant and paced by the partner budget only.
+        """
+        shop_id, merchant_id = self._request_scope(needs_access_token, merchant_level)
+        auth_retried = False
+
+        for attempt in range(THROTTLE_MAX_RETRIES + 1):
+            delay = self.scheduler.reserve(self.partner_id, shop_id, api_path)
+            if delay > 0:
+                await asyncio.sleep(delay)
+            access_token = await self._current_access_token(merchant_level=merchant_level) if needs_access_token else None
+            url = self.signer.signed_url(api_path, access_token, self.shop_id, needs_access_token, merchant_id=merchant_id)
+
+            started = time.perf_counter()
+            try:
+                async with self._semaphore:
+                    async with self._get_session().request(method.upper(), url, json=body, params=query_pairs(params)) as response:
+                        text = await response.text()
+                        status, headers = response.status, response.headers
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                self.metrics.observe_request(api_path, time.perf_counter() - started, error_code=type(e).__name__)
+                rich.print(f"[bold red]API Request Error:[/bold red] {type(e).__name__} {e}")
+                return None
+
+            json_response = _loads_or_none(text)
+            self.metrics.observe_request(
+                api_path, time.perf_counter() - started,
+                error_code=response_error_code(status, json_response),
+                bytes_sent=len(json.dumps(body)) if body is not None else 0,
+                bytes_received=len(text.encode())
+            )
+
+            if is_throttled(status, json_response):
+                delay = self._throttle_delay(api_path, shop_id, attempt, headers.get("Retry-After"))
+                if delay is None:
+                    return None
+                await asyncio.sleep(delay)
+                continue
+
+            if needs_access_token and is_auth_error(json_response) and self._token_owner(merchant_level)[0] is not None and not auth_retried:
+                auth_retried = True
+                self.metrics.record_retry(api_path, "auth")
+                await self._current_access_token(stale_token=access_token, merchant_level=merchant_level)
+                continue
+
+            return self._api_result(api_path, shop_id, url, status, text, json_response)
+
+    async def _run_plan(self, plan, max_workers=None):
+        """Runs a request plan (see ShopeeClient._run_plan), gathering the calls of each step; the semaphore bounds them."""
+        responses = None
+        try:
+            while True:
+                calls = plan.send(responses)
+                responses = await asyncio.gather(*(getattr(self, name)(*args) for name, args in calls))
+        except StopIteration as done:
+            return done.value
+
+    async def _sleep(self, seconds):
+        await asyncio.sleep(seconds)
+
+    def _blocking_refresh(self, merchant_level):
+        # The token managers are shared with threaded clients, so they refresh through blocking calls.
+        client = ShopeeClient(self.partner_id, self.partner_key, shop_id=self.shop_id, merchant_id=self.merchant_id,
+                              scheduler=self.scheduler, metrics=self.metrics, base_url=self.base_url)
+        return client.refresh_merchant_access_token if merchant_level else client.refresh_access_token
+
+    async def _current_access_token(self, stale_token=None, merchant_level=False):
+        """See ShopeeClient._current_access_token."""
+        token_manager, owner_id, attribute = self._token_owner(merchant_level)
+        if token_manager is None:
+            return getattr(self, attribute)
+        token = None if stale_token else token_manager.fresh_token(self.partner_id, owner_id)
+        if token is None:
+            # May wait on another worker's refresh, so it runs off the event loop.
+            token = await asyncio.to_thread(token_manager.access_token, self.partner_id, owner_id,
+                                            self._blocking_refresh(merchant_level), stale_token)
+        if token:
+            setattr(self, attribute, token)
+        return getattr(self, attribute)
+
+    async def upload_image(self, image_url):
+        """Implements v2.media_space.upload_image, served from the image cache when the image is unchanged."""
+        fingerprint = None
+        if self.image_cache is not None:
+            # The fingerprint probe is blocking I/O, so it runs off the event loop.
+            image_id, fingerprint = await asyncio.to_thread(self.image_cache.lookup, self.partner_id, image_url)
+            if image_id:
+                return cached_upload_response(image_id)
+        response = await self._upload_image_request(image_url)
+        self._cache_uploaded_image(image_url, fingerprint, response)
+        return response
@@ -1,87 +1,758 @@
 # platforms/shopee_client.py: Shopee API v2 implementation
 
 from platforms.base_platform import BasePlatform
-from config import SHOPEE_API_V2_URL
+from config import (
+    SHOPEE_API_V2_URL, HTTP_POOL_SIZE, HTTP_CONNECT_TIMEOUT, HTTP_READ_TIMEOUT,
+    ITEM_BASE_INFO_BATCH_SIZE, ITEM_BASE_INFO_MAX_WORKERS, ITEM_LIST_PAGE_SIZE, SHOPEE_THROTTLE_ERRORS, THROTTLE_MAX_RETRIES,
+    SHOPEE_AUTH_ERRORS, VARIATION_MAX_WORKERS, CLONE_LOOKUP_CLOCK_SKEW, GLOBAL_PUBLISH_MAX_WORKERS, GLOBAL_PUBLISH_POLL_INTERVAL, GLOBAL_PUBLISH_TIMEOUT,
+)
+from platforms.rate_limiter import get_default_scheduler, parse_retry_after
+from platforms.token_manager import get_default_token_manager, get_default_merchant_token_manager
+from platforms.shopee_signer import get_signer
+from image_cache import cached_upload_response
+from product_cache import cached_details_response
+from metrics import get_default_metrics
+from concurrent.futures import ThreadPoolExecutor
 import requests
+from requests.adapters import HTTPAdapter
+import threading
 import time
-import hmac
-import hashlib
 import rich
 
-class ShopeeClient(BasePlatform):
-    def __init__(self, partner_id, partner_key, access_token=None, shop_id=None):
-        self.partner_id = partner_id
-        self.partner_key = partner_key
-        self.access_token = access_token
-        self.shop_id = shop_id
+# Keep-alive sessions shared by every client of the same partner, so TCP/TLS
+# connections to the API host are reused across clients, shops and threads.
+_shared_sessions = {}
+_shared_sessions_lock = threading.Lock()
 
-    def _make_request(self, api_path, method, body=None, needs_access_token=True):
-        """A helper method to make signed requests to the Shopee API."""
-        timestamp = int(time.time())
-        full_path = f"/api/v2{api_path}" # Standardize path generation
-        
-        common_params = f"?partner_id={self.partner_id}&timestamp={timestamp}"
-        
-        if needs_access_token:
-            if self.access_token is None or self.shop_id is None:
-                raise ValueError("Access token and shop_id are required for this API call.")
-            base_string = f"{self.partner_id}{full_path}{timestamp}{self.access_token}{self.shop_id}"
-            sign = hmac.new(self.partner_key.encode('utf-8'), base_string.encode('utf-8'), hashlib.sha256).hexdigest()
-            url = f"{SHOPEE_API_V2_URL.rstrip('/')}{full_path}{common_params}&access_token={self.access_token}&shop_id={self.shop_id}&sign={sign}"
-        else: # For auth-related calls
-            base_string = f"{self.partner_id}{full_path}{timestamp}"
-            sign = hmac.new(self.partner_key.encode('utf-8'), base_string.encode('utf-8'), hashlib.sha256).hexdigest()
-            url = f"{SHOPEE_API_V2_URL.rstrip('/')}{full_path}{common_params}&sign={sign}"
-
-        headers = {"Content-Type": "application/json"}
-        
-        try:
-            if method.upper() == "POST":
-                response = requests.post(url, json=body, headers=headers)
-            else: # GET
-                response = requests.get(url, headers=headers)
-            
-            response.raise_for_status() # Raise HTTPError for bad responses (4xx or 5xx)
-            
-            json_response = response.json()
-            if json_response.get('error') and json_response.get('message'):
-                rich.print(f"[bold red]Shopee API Error:[/bold red] {json_response['error']} - {json_response['message']}")
-                return None
-            return json_response
+def create_session(pool_size=HTTP_POOL_SIZE):
+    """Creates a requests.Session backed by a bounded keep-alive connection pool."""
+    session = requests.Session()
+    # pool_block makes extra threads wait for a free connection instead of
+    # opening throwaway ones that are discarded after a single request.
+    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_size, pool_block=True)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    session.headers.update({"Content-Type": "application/json", "Connection": "keep-alive"})
+    return session
+
+def get_shared_session(partner_id, pool_size=HTTP_POOL_SIZE):
+    """Returns the pooled session shared by all clients of a partner, creating it on first use."""
+    with _shared_sessions_lock:
+        session = _shared_sessions.get(partner_id)
+        if session is None:
+            session = create_session(pool_size)
+            _shared_sessions[partner_id] = session
+        return session
+
+def close_shared_sessions():
+    """Closes every shared session and its pooled connections."""
+    with _shared_sessions_lock:
+        for session in _shared_sessions.values():
+            session.close()
+        _shared_sessions.clear()
+
+def is_throttled(status_code, json_response):
+    """True if a response means the partner/shop exceeded its call quota."""
+    if status_code == 429:
+        return True
+    return bool(json_response) and json_response.get("error") in SHOPEE_THROTTLE_ERRORS
+
+def is_auth_error(json_response):
+    """True if a response means the access token was rejected (expired or revoked)."""
+    return bool(json_response) and json_response.get("error") in SHOPEE_AUTH_ERRORS
+
+def response_error_code(status_code, json_response):
+    """The error label used in metrics: Shopee's error code, else "http_<status>", or None on success."""
+    if json_response and json_response.get("error"):
+        return json_response["error"]
+    if status_code >= 400:
+        return f"http_{status_code}"
+    return None
+
+def query_pairs(params):
+    """Flattens query params into (key, value) pairs, repeating the key for list values and dropping None."""
+    pairs = []
+    for key, value in (params or {}).items():
+        for item in value if isinstance(value, (list, tuple)) else [value]:
+            if item is not None:
+                pairs.append((key, item))
+    return pairs
+
+def _json_or_none(response):
+    try:
+        return response.json()
+    except ValueError:
+        return None
+
+def split_item_ids(item_ids, batch_size=ITEM_BASE_INFO_BATCH_SIZE):
+    """De-duplicates item IDs and splits them into chunks of at most `batch_size`."""
+    unique_ids = list(dict.fromkeys(int(item_id) for item_id in item_ids))
+    return [unique_ids[i:i + batch_size] for i in range(0, len(unique_ids), batch_size)]
+
+def merge_item_base_info(chunks, responses):
+    """Merges get_item_base_info responses into (details keyed by item_id, missing item_id -> reason)."""
+    details, missing = {}, {}
+    for chunk, response in zip(chunks, responses):
+        if not response or not response.get("response"):
+            missing.update({item_id: "request failed" for item_id in chunk})
+            continue
+        for item in response["response"].get("item_list") or []:
+            details[int(item["item_id"])] = item
+        missing.update({item_id: "not found" for item_id in chunk if item_id not in details})
+    return details, missing
+
+def split_cached_item_ids(details_cache, partner_id, shop_id, item_ids):
+    """Returns (items found in the details cache keyed by item_id, IDs that still need fetching)."""
+    item_ids = [int(item_id) for item_id in item_ids]
+    if details_cache is None:
+        return {}, item_ids
+    cached = {}
+    for item_id in item_ids:
+        if item_id not in cached:
+            item = details_cache.get(partner_id, shop_id, item_id)
+            if item is not None:
+                cached[item_id] = item
+    return cached, [item_id for item_id in item_ids if item_id not in cached]
+
+def items_missing_models(details):
+    """IDs of fetched items that have variations but no model list yet (get_item_base_info doesn't include it)."""
+    return [item_id for item_id, item in details.items() if item.get("has_model") and "model" not in item]
+
+def attach_model_lists(details, missing, item_ids, responses):
+    """
+    Copies each get_model_list response's tier_variation and model into its item in `details`.
+    Items whose model list could not be fetched are moved from `details` to `missing`.
+    """
+    for item_id, response in zip(item_ids, responses):
+        if not response or not response.get("response"):
+            del details[item_id]
+            missing[item_id] = "model list request failed"
+            continue
+        details[item_id]["tier_variation"] = response["response"].get("tier_variation") or []
+        details[item_id]["model"] = response["response"].get("model") or []
+
+def base_info_details(response):
+    """The items of a get_item_base_info response keyed by item_id (empty if the call failed)."""
+    if not response or not response.get("response"):
+        return {}
+    return {int(item["item_id"]): item for item in response["response"].get("item_list") or []}
+
+def merge_uploaded_images(image_urls, responses):
+    """Merges upload_image responses into (image_id by URL, failure reason by URL)."""
+    image_ids, failed = {}, {}
+    for image_url, response in zip(image_urls, responses):
+        if response and response.get("response") and response["response"].get("image_info"):
+            image_ids[image_url] = response["response"]["image_info"]["image_id"]
+        else:
+            failed[image_url] = "upload failed"
+    return image_ids, failed
+
+def items_created_since(items, item_sku, created_after, id_key="item_id", sku_key="item_sku"):
+    """
+    IDs of the items (base info records) with the given SKU created at or after `created_after`
+    (epoch seconds, less CLONE_LOOKUP_CLOCK_SKEW), oldest first.
+    """
+    since = (created_after or 0) - CLONE_LOOKUP_CLOCK_SKEW
+    matches = [item for item in items if item.get(sku_key) == item_sku and item.get("create_time", 0) >= since]
+    return [item[id_key] for item in sorted(matches, key=lambda item: item.get("create_time", 0))]
+
+def seller_stock_list(stock_info):
+    """The seller_stock entries of a stock_info_v2 record, in the shape the write endpoints accept."""
+    return [{key: entry[key] for key in ("location_id", "stock") if key in entry}
+            for entry in (stock_info or {}).get("seller_stock") or []]
+
+def model_payload(model):
+    """A model entry for init_tier_variation / add_model, from {"tier_index", "original_price", "model_sku", "stock_info_v2"}."""
+    payload = {
+        "tier_index": list(model["tier_index"]),
+        "original_price": model["original_price"],
+        "seller_stock": seller_stock_list(model.get("stock_info_v2")),
+    }
+    if model.get("model_sku"):
+        payload["model_sku"] = model["model_sku"]
+    return payload
+
+def global_item_payload(item_data):
+    """An add_global_item body from an add_item payload (see product_processor.prepare_product_template)."""
+    payload = {key: value for key, value in item_data.items()
+               if key not in ("item_name", "item_sku", "stock_info_v2", "logistic_info")}
+    # Logistics are chosen per shop when the global item is published.
+    payload["global_item_name"] = item_data.get("item_name")
+    if item_data.get("item_sku"):
+        payload["global_item_sku"] = item_data["item_sku"]
+    payload["seller_stock"] = seller_stock_list(item_data.get("stock_info_v2"))
+    return payload
+
+def global_model_payload(model):
+    """A global model entry for the global_product variation endpoints; see model_payload."""
+    payload = model_payload(model)
+    if "model_sku" in payload:
+        payload["global_model_sku"] = payload.pop("model_sku")
+    return payload
+
+def publish_task_body(global_item_id, shop):
+    """The create_publish_task body publishing a global item to one shop ({"shop_id", "shop_region", "item"})."""
+    body = {"global_item_id": int(global_item_id), "shop_id": int(shop["shop_id"]), "item": shop.get("item") or {}}
+    if shop.get("shop_region"):
+        body["shop_region"] = shop["shop_region"]
+    return body
+
+def start_publish_tasks(shops, responses):
+    """Splits create_publish_task responses into (publish_task_id by shop_id, failure reason by shop_id)."""
+    tasks, failed = {}, {}
+    for shop, response in zip(shops, responses):
+        task_id = ((response or {}).get("response") or {}).get("publish_task_id")
+        if task_id:
+            tasks[int(shop["shop_id"])] = task_id
+        else:
+            failed[int(shop["shop_id"])] = "publish task not created"
+    return tasks, failed
+
+def settle_publish_tasks(tasks, responses, item_ids, failed):
+    """
+    Moves the shops of finished publish tasks ({shop_id: publish_task_id}) into `item_ids` or `failed`,
+    from get_publish_task_result responses in the same order. Returns the tasks still processing.
+    """
+    pending = {}
+    for (shop_id, task_id), response in zip(tasks.items(), responses):
+        result = (response or {}).get("response") or {}
+        status = result.get("publish_status")
+        if status == "success" and (result.get("success") or {}).get("item_id"):
+            item_ids[shop_id] = result["success"]["item_id"]
+        elif status == "failed":
+            failed[shop_id] = (result.get("failed") or {}).get("failed_reason") or "publish failed"
+        else: # Still processing, or the poll itself failed; asked again on the next poll
+            pending[shop_id] = task_id
+    return pending
+
+def cache_item_base_info(details_cache, partner_id, shop_id, response):
+    """Stores every item of a get_item_base_info response in the details cache, if there is one."""
+    if details_cache is not None and response and response.get("response"):
+        for item in response["response"].get("item_list") or []:
+            details_cache.put(partner_id, shop_id, item)
 
-        except requests.exceptions.HTTPError as e:
-            rich.print(f"[bold red]HTTP Error:[/bold red] {e.response.status_code} for URL: {e.response.url}")
-            rich.print(f"Response Body: {e.response.text}")
+class ShopeeEndpoints(BasePlatform):
+    """
+    The Shopee API v2 endpoints, shared by ShopeeClient and AsyncShopeeClient.
+    Each endpoint builds its request and hands it to the transport's _make_request, so it returns the
+    response on ShopeeClient and an awaitable on AsyncShopeeClient. Calls that take several requests
+    are written as request plans (see _run_plan) that both transports run.
+    """
+
+    @classmethod
+    def from_profile(cls, profile, **kwargs):
+        """
+        Creates a client for a saved shop profile (an entry of users.json).
+        If the profile has a refresh token, its access token is kept fresh by the shared TokenManager;
+        so is its merchant's main-account token (used for global products), if the profile holds one.
+        """
+        if profile.get("refresh_token") and "token_manager" not in kwargs:
+            kwargs["token_manager"] = get_default_token_manager()
+        if kwargs.get("token_manager") is not None:
+            kwargs["token_manager"].register_profile(profile)
+        if profile.get("merchant_id") is not None:
+            kwargs.setdefault("merchant_id", int(profile["merchant_id"]))
+        if profile.get("merchant_access_token"):
+            kwargs.setdefault("merchant_access_token", profile["merchant_access_token"])
+            if profile.get("merchant_refresh_token") and "merchant_token_manager" not in kwargs:
+                kwargs["merchant_token_manager"] = get_default_merchant_token_manager()
+            if kwargs.get("merchant_token_manager") is not None:
+                kwargs["merchant_token_manager"].register_merchant_profile(profile)
+        return cls(
+            partner_id=int(profile["partner_id"]),
+            partner_key=profile["partner_key"],
+            access_token=profile["access_token"],
+            shop_id=int(profile["shop_id"]),
+            **kwargs
+        )
+
+    def _request_scope(self, needs_access_token, merchant_level):
+        """Checks a call's credentials. Returns (shop_id, merchant_id): the shop the call is paced for, and the merchant it is signed for."""
+        if needs_access_token and (self.access_token is None or self.shop_id is None):
+            raise ValueError("Access token and shop_id are required for this API call.")
+        if merchant_level and (self.merchant_id is None or self.merchant_access_token is None):
+            raise ValueError("merchant_id and the merchant's main-account access token are required for global product calls.")
+        shop_id = self.shop_id if needs_access_token and not merchant_level else None
+        return shop_id, self.merchant_id if merchant_level else None
+
+    def _token_owner(self, merchant_level):
+        """(token manager, owner ID, token attribute) of the token a call is signed with: its merchant's or its shop's."""
+        if merchant_level:
+            return self.merchant_token_manager, self.merchant_id, "merchant_access_token"
+        return self.token_manager, self.shop_id, "access_token"
+
+    def _throttle_delay(self, api_path, shop_id, attempt, retry_after):
+        """Backs off the quota of a throttled call. Returns the delay before retrying it, or None when no retries are left."""
+        delay = self.scheduler.on_throttle(self.partner_id, shop_id, api_path, attempt, parse_retry_after(retry_after))
+        if attempt == THROTTLE_MAX_RETRIES:
+            rich.print(f"[bold red]Rate limit:[/bold red] giving up on {api_path} after {THROTTLE_MAX_RETRIES} retries.")
+            return None
+        self.metrics.record_retry(api_path, "throttle")
+        rich.print(f"[yellow]Rate limited on {api_path}; retrying in {delay:.1f}s (attempt {attempt + 1}/{THROTTLE_MAX_RETRIES})[/yellow]")
+        return delay
+
+    def _api_result(self, api_path, shop_id, url, status_code, text, json_response):
+        """The parsed response of a call that was neither throttled nor retried, or None if it failed."""
+        if status_code >= 400:
+            rich.print(f"[bold red]HTTP Error:[/bold red] {status_code} for URL: {url}")
+            rich.print(f"Response Body: {text}")
+            return None
+        if json_response is None:
+            rich.print(f"[bold red]API Request Error:[/bold red] invalid JSON response from {api_path}")
             return None
-        except requests.exceptions.RequestException as e:
-            rich.print(f"[bold red]API Request Error:[/bold red] {e}")
+        self.scheduler.on_success(self.partner_id, shop_id, api_path)
+        if json_response.get('error') and json_response.get('message'):
+            rich.print(f"[bold red]Shopee API Error:[/bold red] {json_response['error']} - {json_response['message']}")
             return None
+        return json_response
 
     def get_access_token(self, auth_code, shop_id):
         path = "/auth/get_access_token"
         body = {"code": auth_code, "shop_id": int(shop_id), "partner_id": self.partner_id}
         return self._make_request(path, method="POST", body=body, needs_access_token=False)
 
+    def refresh_access_token(self, refresh_token):
+        """Implements v2.public.refresh_access_token (/auth/access_token/get) for this client's shop."""
+        path = "/auth/access_token/get"
+        body = {"refresh_token": refresh_token, "shop_id": int(self.shop_id), "partner_id": int(self.partner_id)}
+        return self._make_request(path, method="POST", body=body, needs_access_token=False)
+
+    def get_main_account_token(self, auth_code, main_account_id):
+        """
+        Exchanges the code of a main-account (CNSC merchant) authorization for its tokens.
+        The response also lists the merchant_id_list and shop_id_list the token covers.
+        """
+        path = "/auth/get_access_token"
+        body = {"code": auth_code, "main_account_id": int(main_account_id), "partner_id": self.partner_id}
+        return self._make_request(path, method="POST", body=body, needs_access_token=False)
+
+    def refresh_merchant_access_token(self, refresh_token):
+        """Implements v2.public.refresh_access_token (/auth/access_token/get) for this client's merchant."""
+        path = "/auth/access_token/get"
+        body = {"refresh_token": refresh_token, "merchant_id": int(self.merchant_id), "partner_id": int(self.partner_id)}
+        return self._make_request(path, method="POST", body=body, needs_access_token=False)
+
     def get_shop_info(self):
         path = "/shop/get_shop_info"
         return self._make_request(path, method="GET", body=None, needs_access_token=True)
 
     def get_product_details(self, item_id):
+        return self._run_plan(self._product_details_plan(item_id))
+
+    def _product_details_plan(self, item_id):
+        if self.details_cache is not None:
+            item = self.details_cache.get(self.partner_id, self.shop_id, item_id)
+            if item is not None:
+                return cached_details_response([item])
+        [response] = yield [("_get_item_base_info", ([item_id],))]
+        details = base_info_details(response)
+        if details:
+            missing = {}
+            yield from self._model_lists_plan(details, missing)
+            if missing:
+                return None
+        cache_item_base_info(self.details_cache, self.partner_id, self.shop_id, response)
+        return response
+
+    def get_product_details_batch(self, item_ids, batch_size=ITEM_BASE_INFO_BATCH_SIZE, max_workers=ITEM_BASE_INFO_MAX_WORKERS):
+        """
+        Fetches base info for many items, `batch_size` IDs per call, with chunks sent concurrently.
+        Items with variations also get their tier_variation and model list.
+        Returns (details, missing): item data keyed by item_id, and a reason keyed by each item_id that could not be fetched.
+        """
+        return self._run_plan(self._product_details_batch_plan(item_ids, batch_size), max_workers)
+
+    def _product_details_batch_plan(self, item_ids, batch_size):
+        cached, uncached_ids = split_cached_item_ids(self.details_cache, self.partner_id, self.shop_id, item_ids)
+        chunks = split_item_ids(uncached_ids, batch_size)
+        if not chunks:
+            return cached, {}
+        responses = yield [("_get_item_base_info", (chunk,)) for chunk in chunks]
+        details, missing = merge_item_base_info(chunks, responses)
+        yield from self._model_lists_plan(details, missing)
+        if self.details_cache is not None:
+            for item in details.values():
+                self.details_cache.put(self.partner_id, self.shop_id, item)
+        details.update(cached)
+        return details, missing
+
+    def _model_lists_plan(self, details, missing):
+        """Fetches the model lists of the items in `details` that have variations, concurrently."""
+        item_ids = items_missing_models(details)
+        if item_ids:
+            responses = yield [("get_model_list", (item_id,)) for item_id in item_ids]
+            attach_model_lists(details, missing, item_ids, responses)
+
+    def get_model_list(self, item_id):
+        """Implements v2.product.get_model_list: an item's tier variations and models."""
+        path = "/product/get_model_list"
+        return self._make_request(path, method="GET", needs_access_token=True, params={"item_id": int(item_id)})
+
+    def _get_item_base_info(self, item_ids):
+        """Implements v2.product.get_item_base_info for up to ITEM_BASE_INFO_BATCH_SIZE items."""
         path = "/product/get_item_base_info"
-        body = {"item_id_list": [item_id]}
+        body = {"item_id_list": list(item_ids)}
         return self._make_request(path, method="POST", body=body, needs_access_token=True)
 
-    def upload_image(self, image_url):
-        """Implements v2.media_space.upload_image"""
+    def search_item(self, item_sku, offset=0, page_size=ITEM_LIST_PAGE_SIZE, item_status=("NORMAL", "UNLIST")):
+        """Implements v2.product.search_item by SKU: one page of matching item IDs."""
+        path = "/product/search_item"
+        params = {"item_sku": item_sku, "offset": offset, "page_size": page_size, "item_status": list(item_status)}
+        return self._make_request(path, method="GET", needs_access_token=True, params=params)
+
+    def find_items_by_sku(self, item_sku, created_after=None):
+        """
+        IDs of this shop's items with the given SKU created at or after `created_after` (epoch seconds),
+        oldest first, or None if the lookup failed. Finds the item of a create call whose response was lost.
+        """
+        return self._run_plan(self._find_items_plan(item_sku, created_after))
+
+    def _find_items_plan(self, item_sku, created_after):
+        item_ids, offset = [], 0
+        while True:
+            [response] = yield [("search_item", (item_sku, offset))]
+            if not response or "response" not in response:
+                return None
+            page = response["response"]
+            item_ids.extend(page.get("item_id_list") or [])
+            if not page.get("next_offset") or len(item_ids) >= page.get("total_count", 0):
+                break
+            offset = page["next_offset"]
+        chunks = split_item_ids(item_ids)
+        responses = yield [("_get_item_base_info", (chunk,)) for chunk in chunks]
+        items = []
+        for chunk, response in zip(chunks, responses):
+            details = base_info_details(response)
+            if len(details) < len(chunk):
+                return None
+            items.extend(details.values())
+        return items_created_since(items, item_sku, created_after)
+
+    def upload_images(self, image_urls, max_workers=VARIATION_MAX_WORKERS):
+        """
+        Uploads several images concurrently, each distinct URL once.
+        Returns (image_ids, failed): image_id keyed by URL, and a reason keyed by each URL that failed.
+        """
+        return self._run_plan(self._upload_images_plan(image_urls), max_workers)
+
+    def _upload_images_plan(self, image_urls):
+        unique_urls = list(dict.fromkeys(image_urls))
+        responses = yield [("upload_image", (image_url,)) for image_url in unique_urls]
+        return merge_uploaded_images(unique_urls, responses)
+
+    def _upload_image_request(self, image_url):
+        """Implements v2.media_space.upload_image, bypassing the image cache."""
         path = "/media_space/upload_image"
         body = {"image_url": image_url}
         return self._make_request(path, method="POST", body=body, needs_access_token=True)
 
-    # Placeholders for next steps
-    def create_global_item(self, product_data, image_ids):
-        print("\n[ShopeeClient] Creating global item...")
-        return None
+    def _cache_uploaded_image(self, image_url, fingerprint, response):
+        if self.image_cache is not None and response and response.get("response", {}).get("image_info"):
+            self.image_cache.store(self.partner_id, image_url, fingerprint, response["response"]["image_info"]["image_id"])
 
-    def publish_item(self, global_item_id, shop_id):
-        print(f"\n[ShopeeClient] Publishing item {global_item_id} for shop {shop_id}...")
-        return None
+    def create_item(self, item_data):
+        """Implements v2.product.add_item. The item is created unlisted; publish_item makes it live."""
+        path = "/product/add_item"
+        body = dict(item_data, item_status="UNLIST")
+        return self._make_request(path, method="POST", body=body, needs_access_token=True)
+
+    def publish_item(self, item_id):
+        """Lists an item created by create_item (v2.product.unlist_item with unlist=false) in this client's shop."""
+        path = "/product/unlist_item"
+        body = {"item_list": [{"item_id": int(item_id), "unlist": False}]}
+        return self._make_request(path, method="POST", body=body, needs_access_token=True)
+
+    def init_tier_variation(self, item_id, tier_variation, models):
+        """
+        Implements v2.product.init_tier_variation: sets an item's variation tiers and creates its first
+        models (at most MODEL_BATCH_SIZE; add the rest with add_model).
+        """
+        path = "/product/init_tier_variation"
+        body = {"item_id": int(item_id), "tier_variation": tier_variation, "model": [model_payload(m) for m in models]}
+        return self._make_request(path, method="POST", body=body, needs_access_token=True)
+
+    def add_model(self, item_id, models):
+        """Implements v2.product.add_model for up to MODEL_BATCH_SIZE models of an item whose tiers are set."""
+        path = "/product/add_model"
+        body = {"item_id": int(item_id), "model_list": [model_payload(m) for m in models]}
+        return self._make_request(path, method="POST", body=body, needs_access_token=True)
+
+    def get_item_list(self, offset=0, page_size=ITEM_LIST_PAGE_SIZE, update_time_from=None, update_time_to=None,
+                      item_status=("NORMAL",)):
+        """Implements v2.product.get_item_list: one page of the shop's items with their update_time."""
+        path = "/product/get_item_list"
+        params = {
+            "offset": offset,
+            "page_size": page_size,
+            "item_status": list(item_status),
+            "update_time_from": update_time_from,
+            "update_time_to": update_time_to,
+        }
+        return self._make_request(path, method="GET", needs_access_token=True, params=params)
+
+    def list_items(self, update_time_from=None, update_time_to=None, item_status=("NORMAL",)):
+        """
+        Pages through get_item_list. Returns [{"item_id", "item_status", "update_time"}, ...],
+        or None if a page could not be fetched.
+        """
+        return self._run_plan(self._list_items_plan(update_time_from, update_time_to, item_status))
+
+    def _list_items_plan(self, update_time_from, update_time_to, item_status):
+        items, offset = [], 0
+        while True:
+            [response] = yield [("get_item_list", (offset, ITEM_LIST_PAGE_SIZE, update_time_from, update_time_to, item_status))]
+            if not response or "response" not in response:
+                return None
+            page = response["response"]
+            items.extend(page.get("item") or [])
+            if not page.get("has_next_page"):
+                return items
+            offset = page["next_offset"]
+
+    def update_item(self, item_id, item_data):
+        """Implements v2.product.update_item. Price and stock are updated with update_price / update_stock."""
+        path = "/product/update_item"
+        body = dict(item_data, item_id=int(item_id))
+        return self._make_request(path, method="POST", body=body, needs_access_token=True)
+
+    def update_price(self, item_id, original_price):
+        """Implements v2.product.update_price for an item without variations."""
+        return self.update_model_prices(item_id, {0: original_price})
+
+    def update_stock(self, item_id, stock_info):
+        """Implements v2.product.update_stock for an item without variations, from a stock_info_v2 record."""
+        return self.update_model_stocks(item_id, {0: stock_info})
+
+    def update_model_prices(self, item_id, prices):
+        """Implements v2.product.update_price for up to MODEL_BATCH_SIZE models of an item, from {model_id: original_price}."""
+        path = "/product/update_price"
+        body = {"item_id": int(item_id),
+                "price_list": [{"model_id": int(model_id), "original_price": price} for model_id, price in prices.items()]}
+        return self._make_request(path, method="POST", body=body, needs_access_token=True)
+
+    def update_model_stocks(self, item_id, stocks):
+        """Implements v2.product.update_stock for up to MODEL_BATCH_SIZE models of an item, from {model_id: stock_info_v2 record}."""
+        path = "/product/update_stock"
+        body = {"item_id": int(item_id), "stock_list": [{"model_id": int(model_id), "seller_stock": seller_stock_list(stock_info)}
+                                                        for model_id, stock_info in stocks.items()]}
+        return self._make_request(path, method="POST", body=body, needs_access_token=True)
+
+    # --- Global products (CNSC) ---
+
+    def supports_global_items(self):
+        return self.merchant_id is not None and self.merchant_access_token is not None
+
+    def create_global_item(self, item_data):
+        """Implements v2.global_product.add_global_item for this client's merchant, from an add_item payload."""
+        path = "/global_product/add_global_item"
+        return self._make_request(path, method="POST", body=global_item_payload(item_data), merchant_level=True)
+
+    def init_global_tier_variation(self, global_item_id, tier_variation, models):
+        """Implements v2.global_product.init_tier_variation; see init_tier_variation."""
+        path = "/global_product/init_tier_variation"
+        body = {"global_item_id": int(global_item_id), "tier_variation": tier_variation,
+                "global_model": [global_model_payload(m) for m in models]}
+        return self._make_request(path, method="POST", body=body, merchant_level=True)
+
+    def add_global_model(self, global_item_id, models):
+        """Implements v2.global_product.add_global_model for up to MODEL_BATCH_SIZE models."""
+        path = "/global_product/add_global_model"
+        body = {"global_item_id": int(global_item_id), "global_model": [global_model_payload(m) for m in models]}
+        return self._make_request(path, method="POST", body=body, merchant_level=True)
+
+    def get_global_model_list(self, global_item_id):
+        """Implements v2.global_product.get_global_model_list: a global item's tier variations and models."""
+        path = "/global_product/get_global_model_list"
+        return self._make_request(path, method="GET", params={"global_item_id": int(global_item_id)}, merchant_level=True)
+
+    def get_global_item_list(self, offset=0, page_size=ITEM_LIST_PAGE_SIZE, update_time_from=None, update_time_to=None):
+        """Implements v2.global_product.get_global_item_list: one page of the merchant's global items."""
+        path = "/global_product/get_global_item_list"
+        params = {"offset": offset, "page_size": page_size, "update_time_from": update_time_from, "update_time_to": update_time_to}
+        return self._make_request(path, method="GET", params=params, merchant_level=True)
+
+    def get_global_item_info(self, global_item_ids):
+        """Implements v2.global_product.get_global_item_info for up to ITEM_BASE_INFO_BATCH_SIZE global items."""
+        path = "/global_product/get_global_item_info"
+        return self._make_request(path, method="GET", params={"global_item_id_list": list(global_item_ids)},
+                                  merchant_level=True)
+
+    def find_global_items_by_sku(self, item_sku, created_after=None):
+        """
+        IDs of the merchant's global items with the given SKU created at or after `created_after`,
+        oldest first, or None if the lookup failed; see find_items_by_sku.
+        """
+        return self._run_plan(self._find_global_items_plan(item_sku, created_after))
+
+    def _find_global_items_plan(self, item_sku, created_after):
+        update_time_from = int(created_after - CLONE_LOOKUP_CLOCK_SKEW) if created_after else None
+        global_item_ids, offset = [], 0
+        while True:
+            [response] = yield [("get_global_item_list", (offset, ITEM_LIST_PAGE_SIZE, update_time_from))]
+            if not response or "response" not in response:
+                return None
+            page = response["response"]
+            global_item_ids.extend(item["global_item_id"] for item in page.get("global_item_list") or [])
+            if not page.get("has_next_page"):
+                break
+            offset = page["offset"]
+        responses = yield [("get_global_item_info", (chunk,)) for chunk in split_item_ids(global_item_ids)]
+        if any(not response or "response" not in response for response in responses):
+            return None
+        items = [item for response in responses for item in response["response"].get("global_item_list") or []]
+        return items_created_since(items, item_sku, created_after, id_key="global_item_id", sku_key="global_item_sku")
+
+    def create_publish_task(self, global_item_id, shop):
+        """Implements v2.global_product.create_publish_task for one shop ({"shop_id", "shop_region", "item"})."""
+        path = "/global_product/create_publish_task"
+        return self._make_request(path, method="POST", body=publish_task_body(global_item_id, shop), merchant_level=True)
+
+    def get_publish_task_result(self, publish_task_id):
+        """Implements v2.global_product.get_publish_task_result."""
+        path = "/global_product/get_publish_task_result"
+        return self._make_request(path, method="GET", params={"publish_task_id": publish_task_id}, merchant_level=True)
+
+    def publish_global_item(self, global_item_id, shops, poll_interval=GLOBAL_PUBLISH_POLL_INTERVAL,
+                            timeout=GLOBAL_PUBLISH_TIMEOUT):
+        """
+        Publishes a global item to several of the merchant's shops ([{"shop_id", "shop_region", "item"}]) as one
+        batched operation: a publish task is created for every shop concurrently, then all the tasks are
+        polled together until they finish or `timeout` seconds pass.
+        Returns (item_ids, failed): the new item_id keyed by shop_id, and a reason keyed by each shop_id that failed.
+        """
+        plan = self._publish_global_item_plan(global_item_id, list(shops), poll_interval, timeout)
+        return self._run_plan(plan, GLOBAL_PUBLISH_MAX_WORKERS)
+
+    def _publish_global_item_plan(self, global_item_id, shops, poll_interval, timeout):
+        responses = yield [("create_publish_task", (global_item_id, shop)) for shop in shops]
+        tasks, failed = start_publish_tasks(shops, responses)
+        item_ids = {}
+        deadline = time.monotonic() + timeout
+        while tasks:
+            if time.monotonic() >= deadline:
+                failed.update({shop_id: "publish task timed out" for shop_id in tasks})
+                break
+            yield [("_sleep", (poll_interval,))]
+            responses = yield [("get_publish_task_result", (task_id,)) for task_id in tasks.values()]
+            tasks = settle_publish_tasks(tasks, responses, item_ids, failed)
+        return item_ids, failed
+
+class ShopeeClient(ShopeeEndpoints):
+    def __init__(self, partner_id, partner_key, access_token=None, shop_id=None,
+                 session=None, pool_size=HTTP_POOL_SIZE, timeout=None,
+                 scheduler=None, image_cache=None, details_cache=None, metrics=None, base_url=None, token_manager=None,
+                 merchant_id=None, merchant_access_token=None, merchant_token_manager=None):
+        self.partner_id = partner_id
+        self.partner_key = partner_key
+        self.access_token = access_token
+        self.shop_id = shop_id
+        # The China Seller Center merchant owning the shop, if any, and its main-account token; needed for global products.
+        self.merchant_id = merchant_id
+        self.merchant_access_token = merchant_access_token
+        # Defaults to the partner-wide pooled session; pass `session` to isolate a client.
+        self.session = session or get_shared_session(partner_id, pool_size)
+        # (connect, read) timeouts in seconds so a hung socket can never stall a worker.
+        self.timeout = timeout or (HTTP_CONNECT_TIMEOUT, HTTP_READ_TIMEOUT)
+        # Shared by default so every client in the process draws from the same quotas.
+        self.scheduler = scheduler or get_default_scheduler()
+        # Optional ImageUploadCache; when set, unchanged images are not uploaded again.
+        self.image_cache = image_cache
+        # Optional ProductDetailsCache placed in front of get_product_details(_batch).
+        self.details_cache = details_cache
+        self.metrics = metrics or get_default_metrics()
+        self.base_url = base_url or SHOPEE_API_V2_URL
+        self.signer = get_signer(partner_id, partner_key, self.base_url)
+        # Optional TokenManagers that refresh this shop's and its merchant's access tokens before they expire.
+        self.token_manager = token_manager
+        self.merchant_token_manager = merchant_token_manager
+
+    def _make_request(self, api_path, method, body=None, needs_access_token=True, params=None, merchant_level=False):
+        """
+        A helper method to make signed requests to the Shopee API.
+        `params` are extra query parameters, e.g. for GET endpoints. Calls are paced by the rate-limit scheduler; throttled calls are retried with backoff.
+        `merchant_level` calls (global products) are signed for the merchant and paced by the partner budget only.
+        """
+        shop_id, merchant_id = self._request_scope(needs_access_token, merchant_level)
+        auth_retried = False
+
+        for attempt in range(THROTTLE_MAX_RETRIES + 1):
+            self.scheduler.acquire(self.partner_id, shop_id, api_path)
+            access_token = self._current_access_token(merchant_level=merchant_level) if needs_access_token else None
+            # Signed per attempt, since the signature embeds the timestamp.
+            url = self.signer.signed_url(api_path, access_token, self.shop_id, needs_access_token, merchant_id=merchant_id)
+
+            started = time.perf_counter()
+            try:
+                if method.upper() == "POST":
+                    response = self.session.post(url, json=body, params=query_pairs(params), timeout=self.timeout)
+                else: # GET
+                    response = self.session.get(url, params=query_pairs(params), timeout=self.timeout)
+            except requests.exceptions.RequestException as e:
+                self.metrics.observe_request(api_path, time.perf_counter() - started, error_code=type(e).__name__)
+                rich.print(f"[bold red]API Request Error:[/bold red] {e}")
+                return None
+
+            json_response = _json_or_none(response)
+            self.metrics.observe_request(
+                api_path, time.perf_counter() - started,
+                error_code=response_error_code(response.status_code, json_response),
+                bytes_sent=len(response.request.body or b""),
+                bytes_received=len(response.content)
+            )
+
+            if is_throttled(response.status_code, json_response):
+                delay = self._throttle_delay(api_path, shop_id, attempt, response.headers.get("Retry-After"))
+                if delay is None:
+                    return None
+                time.sleep(delay)
+                continue
+
+            if needs_access_token and is_auth_error(json_response) and self._token_owner(merchant_level)[0] is not None and not auth_retried:
+                # Expired or revoked early: refresh once (or pick up another worker's refresh) and retry.
+                auth_retried = True
+                self.metrics.record_retry(api_path, "auth")
+                self._current_access_token(stale_token=access_token, merchant_level=merchant_level)
+                continue
+
+            return self._api_result(api_path, shop_id, response.url, response.status_code, response.text, json_response)
+
+    def _run_plan(self, plan, max_workers=VARIATION_MAX_WORKERS):
+        """
+        Runs a request plan: a generator that yields lists of (method_name, args) calls and receives their
+        responses, in the same order. The calls of each list are sent concurrently on up to `max_workers` threads.
+        """
+        responses = None
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            try:
+                while True:
+                    calls = plan.send(responses)
+                    responses = list(executor.map(lambda call: getattr(self, call[0])(*call[1]), calls))
+            except StopIteration as done:
+                return done.value
+
+    def _sleep(self, seconds):
+        time.sleep(seconds)
+
+    def _current_access_token(self, stale_token=None, merchant_level=False):
+        """
+        This shop's access token (its merchant's for `merchant_level` calls), refreshed through the
+        token manager when it is about to expire.
+        """
+        token_manager, owner_id, attribute = self._token_owner(merchant_level)
+        if token_manager is not None:
+            refresh = self.refresh_merchant_access_token if merchant_level else self.refresh_access_token
+            token = token_manager.access_token(self.partner_id, owner_id, refresh, stale_token)
+            if token:
+                setattr(self, attribute, token)
+        return getattr(self, attribute)
+
+    def upload_image(self, image_url):
+        """Implements v2.media_space.upload_image, served from the image cache when the image is unchanged."""
+        fingerprint = None
+        if self.image_cache is not None:
+            image_id, fingerprint = self.image_cache.lookup(self.partner_id, image_url)
+            if image_id:
+                return cached_upload_response(image_id)
+        response = self._upload_image_request(image_url)
+        self._cache_uploaded_image(image_url, fingerprint, response)
+        return response
@@ -0,0 +1,150 @@
+# platforms/token_manager.py: Keeps shop access tokens fresh, refreshing them before they expire.
+
+import threading
+import time
+
+import rich
+
+from config import TOKEN_REFRESH_MARGIN, TOKEN_REFRESH_RETRY_DELAY
+from user_manager import update_profile_tokens, update_merchant_tokens
+
+class TokenManager:
+    """
+    Tracks the access token, refresh token and expiry of every shop whose clients use it.
+
+    A token is refreshed once it is within `refresh_margin` seconds of expiring. Refreshes are
+    single-flight per shop: one caller refreshes while the others keep using the still-valid token
+    (or, if it has already expired, wait for the refresh instead of starting their own). New tokens
+    are handed to `save_tokens(partner_id, shop_id, tokens)` so they survive the process.
+    Safe to share between threads; one manager per process is the norm (get_default_token_manager).
+
+    CNSC merchants' main-account tokens are tracked the same way by a separate manager
+    (get_default_merchant_token_manager), with the merchant_id in place of the shop_id.
+    """
+
+    def __init__(self, refresh_margin=TOKEN_REFRESH_MARGIN, retry_delay=TOKEN_REFRESH_RETRY_DELAY,
+                 save_tokens=update_profile_tokens, owner="shop"):
+        self.refresh_margin = refresh_margin
+        self.retry_delay = retry_delay
+        self.save_tokens = save_tokens
+        self.owner = owner # What the tracked IDs are, for messages
+        self._lock = threading.Lock()
+        self._shops = {} # (partner_id, shop_id) -> token state
+        self.refreshes = 0
+
+    @staticmethod
+    def _key(partner_id, shop_id):
+        return int(partner_id), int(shop_id)
+
+    def register(self, partner_id, shop_id, access_token, refresh_token, expire_at=None):
+        """
+        Starts tracking a shop's tokens, e.g. from a saved profile. A token with no known expiry
+        is refreshed on first use. Registering older tokens than the ones already held is a no-op.
+        """
+        key = self._key(partner_id, shop_id)
+        expire_at = float(expire_at or 0)
+        with self._lock:
+            state = self._shops.get(key)
+            if state is None:
+                self._shops[key] = {
+                    "access_token": access_token,
+                    "refresh_token": refresh_token,
+                    "expire_at": expire_at,
+                    "retry_at": 0.0,
+                    "lock": threading.Lock(),
+                }
+            elif expire_at > state["expire_at"]:
+                state.update(access_token=access_token, refresh_token=refresh_token, expire_at=expire_at)
+
+    def register_profile(self, profile, partner_id=None):
+        """Registers the tokens saved in a users.json profile."""
+        self.register(partner_id or profile["partner_id"], profile["shop_id"], profile["access_token"],
+                      profile["refresh_token"], profile.get("expire_at"))
+
+    def register_merchant_profile(self, profile, partner_id=None):
+        """Registers the merchant main-account tokens saved in a profile, keyed by its merchant_id."""
+        self.register(partner_id or profile["partner_id"], profile["merchant_id"], profile["merchant_access_token"],
+                      profile.get("merchant_refresh_token"), profile.get("merchant_expire_at"))
+
+    def _state(self, partner_id, shop_id):
+        with self._lock:
+            return self._shops.get(self._key(partner_id, shop_id))
+
+    def fresh_token(self, partner_id, shop_id):
+        """The shop's access token if it doesn't need refreshing yet, else None."""
+        state = self._state(partner_id, shop_id)
+        if state is None or self._needs_refresh(state, time.time()):
+            return None
+        return state["access_token"]
+
+    def _needs_refresh(self, state, now):
+        return state["expire_at"] - self.refresh_margin <= now and state["retry_at"] <= now
+
+    def access_token(self, partner_id, shop_id, refresh, stale_token=None):
+        """
+        Returns a usable access token for the shop, refreshing it first if it's about to expire.
+        `refresh(refresh_token)` performs the refresh call and returns the API response.
+        Pass the token a call was rejected with as `stale_token` to force a refresh, unless another
+        caller has already replaced it. Returns None for shops this manager doesn't track.
+        """
+        state = self._state(partner_id, shop_id)
+        if state is None:
+            return None
+        now = time.time()
+        if stale_token is None and not self._needs_refresh(state, now):
+            return state["access_token"]
+
+        # While the current token is still valid there is no reason to queue behind another refresh.
+        still_valid = stale_token is None and state["expire_at"] > now
+        if not state["lock"].acquire(blocking=not still_valid):
+            return state["access_token"]
+        try:
+            # Another caller may have refreshed while we waited for the lock.
+            if stale_token is not None and state["access_token"] != stale_token:
+                return state["access_token"]
+            if stale_token is None and not self._needs_refresh(state, time.time()):
+                return state["access_token"]
+            self._refresh(partner_id, shop_id, state, refresh)
+            return state["access_token"]
+        finally:
+            state["lock"].release()
+
+    def _refresh(self, partner_id, shop_id, state, refresh):
+        response = refresh(state["refresh_token"])
+        if not response or not response.get("access_token"):
+            # Keep using the current token and try again later rather than on every call.
+            state["retry_at"] = time.time() + self.retry_delay
+            rich.print(f"[bold red]Token refresh failed for {self.owner} {shop_id};[/bold red] retrying in {self.retry_delay:.0f}s.")
+            return
+        tokens = {
+            "access_token": response["access_token"],
+            "refresh_token": response.get("refresh_token") or state["refresh_token"],
+            "expire_at": time.time() + int(response.get("expire_in", 0)),
+        }
+        with self._lock:
+            state.update(tokens, retry_at=0.0)
+            self.refreshes += 1
+        rich.print(f"[dim]Refreshed the access token of {self.owner} {shop_id}.[/dim]")
+        if self.save_tokens is not None:
+            self.save_tokens(partner_id, shop_id, tokens)
+
+_default_manager = None
+_default_manager_lock = threading.Lock()
+
+def get_default_token_manager():
+    """The process-wide token manager shared by every client created from a profile."""
+    global _default_manager
+    with _default_manager_lock:
+        if _default_manager is None:
+            _default_manager = TokenManager()
+        return _default_manager
+
+_default_merchant_manager = None
+
+def get_default_merchant_token_manager():
+    """The process-wide manager of CNSC merchants' main-account tokens, keyed by merchant_id."""
+    global _default_merchant_manager
+    with _default_manager_lock:
+        if _default_merchant_manager is None:
+            _default_merchant_manager = TokenManager(save_tokens=update_merchant_tokens, owner="merchant")
+        return _default_merchant_manager
@@ -0,0 +1,43 @@
+# product_cache.py: Read-through cache for source product details.
+
+from config import PRODUCT_CACHE_TTL, PRODUCT_CACHE_MAX_ENTRIES, PRODUCT_CACHE_PATH
+from ttl_cache import TTLCache
+
+class ProductDetailsCache:
+    """
+    Holds get_item_base_info item data per (partner, shop, item_id), so a source item cloned into
+    many shops or with many shop codes is fetched once per TTL. Memory is bounded by `max_entries`
+    (least recently used items are dropped first); pass `path` to keep the cache between runs.
+    """
+
+    def __init__(self, ttl=PRODUCT_CACHE_TTL, max_entries=PRODUCT_CACHE_MAX_ENTRIES, path=PRODUCT_CACHE_PATH):
+        self._cache = TTLCache(max_entries=max_entries, ttl=ttl, path=path)
+
+    @staticmethod
+    def _key(partner_id, shop_id, item_id):
+        return f"{partner_id}|{shop_id}|{int(item_id)}"
+
+    def get(self, partner_id, shop_id, item_id):
+        """Returns the cached item data, or None on a miss."""
+        return self._cache.get(self._key(partner_id, shop_id, item_id))
+
+    def put(self, partner_id, shop_id, item):
+        self._cache.set(self._key(partner_id, shop_id, item["item_id"]), item)
+
+    def invalidate(self, partner_id, shop_id, item_id):
+        """Drops one item, e.g. after the source listing was edited."""
+        return self._cache.invalidate(self._key(partner_id, shop_id, item_id))
+
+    def clear(self):
+        self._cache.clear()
+
+    def save(self):
+        self._cache.save()
+
+    @property
+    def stats(self):
+        return {"entries": len(self._cache), "hits": self._cache.hits, "misses": self._cache.misses}
+
+def cached_details_response(items):
+    """Builds a get_item_base_info-shaped response for items served from the cache."""
+    return {"response": {"item_list": list(items)}, "cached": True}
@@ -1,85 +1,579 @@
 # product_processor.py: Core logic for processing products.
 
+import asyncio
+import hashlib
+import json
+import random
+import time
 import rich
 
-def _prepare_cloned_product_data(source_data, new_image_id):
-    """Prepares the payload for the new product, using data from the source and the new image."""
-    
-    # Replace the cover image and keep the rest
-    original_image_ids = source_data.get("image", {}).get("image_id_list", [])
-    new_image_ids = [new_image_id]
-    if len(original_image_ids) > 1:
-        new_image_ids.extend(original_image_ids[1:])
+from config import CLONE_MAX_ATTEMPTS, CLONE_RETRY_BASE_DELAY, CLONE_RETRY_MAX_DELAY, MODEL_BATCH_SIZE
+from job_journal import JobJournal
+from metrics import get_default_metrics
+from pipeline_executor import StepFailed, pipeline_step, run_pipeline, run_pipeline_async
+
+PIPELINE_STEPS = ("fetch", "upload", "create", "variations", "publish")
+
+def _model_price(model):
+    return (model.get("price_info") or [{}])[0].get("original_price")
 
+def _source_price(source_data):
+    """The item's price; items with variations carry prices per model only, so their lowest is used."""
+    if source_data.get("price_info"):
+        return source_data["price_info"][0].get("original_price")
+    prices = [price for price in map(_model_price, source_data.get("model") or []) if price is not None]
+    return min(prices) if prices else None
+
+def _source_stock(source_data):
+    """The item's stock_info_v2; for items with variations, the total stock of their models."""
+    if source_data.get("stock_info_v2") or not source_data.get("model"):
+        return source_data.get("stock_info_v2")
+    total = sum(entry.get("stock", 0) for model in source_data["model"]
+                for entry in (model.get("stock_info_v2") or {}).get("seller_stock") or [])
+    return {"seller_stock": [{"stock": total}]}
+
+def prepare_product_template(source_data):
+    """
+    Builds the add_item payload for a clone of the source product, still using the source's images.
+    Independent of the target shop, so it can be prepared once and reused for every shop.
+    """
     # Construct the payload for the add_item API call
     # Note: This copies only the necessary and safe fields.
     # Some fields like `complaint_policy` or complex objects might require more specific handling.
     new_item_data = {
-        "original_price": source_data.get("price_info")[0].get("original_price"),
+        "original_price": _source_price(source_data),
         "description": source_data.get("description"),
         "item_name": source_data.get("item_name"),
         "item_sku": source_data.get("item_sku"), # Retain the parent SKU
         "category_id": source_data.get("category_id"),
         "image": {
-            "image_id_list": new_image_ids
+            "image_id_list": list(source_data.get("image", {}).get("image_id_list", []))
         },
-        "stock_info_v2": source_data.get("stock_info_v2"),
+        "stock_info_v2": _source_stock(source_data),
         "logistic_info": source_data.get("logistic_info"),
         "attribute_list": source_data.get("attribute_list", []),
         "weight": source_data.get("weight", ""),
         "dimension": source_data.get("dimension", {})
     }
-    
+
     # Return only non-null values to avoid API errors
     return {k: v for k, v in new_item_data.items() if v is not None}
 
-def clone_single_product(platform_client, source_item_id, image_hosting_url, shop_code_for_image):
-    """Clones a single product by fetching, modifying, and re-uploading."""
-    
-    # --- Step 1: Get Source Product Details ---
-    rich.print(f"\n[bold yellow]Step 1: Fetching details for source product ID: {source_item_id}...[/bold yellow]")
-    product_details_response = platform_client.get_product_details(source_item_id)
-    if not product_details_response or not product_details_response.get("response") or not product_details_response["response"].get("item_list"):
-        rich.print("[bold red]Error:[/bold red] Failed to fetch product details or the product does not exist.")
-        return
-    source_product_data = product_details_response["response"]["item_list"][0]
-    rich.print("  ✓ Fetched product details successfully.")
-
-    # --- Step 2: Construct New Image URL ---
-    rich.print("\n[bold yellow]Step 2: Constructing new image URL...[/bold yellow]")
+def prepare_variation_template(source_data):
+    """
+    The source product's tier variations and models (fetched along with its details), or None if
+    it has no variations. Option images are kept as URLs until they are uploaded to the target shop.
+    """
+    models = source_data.get("model") or []
+    if not source_data.get("has_model") or not models:
+        return None
+    tier_variation = []
+    for tier in source_data.get("tier_variation") or []:
+        option_list = []
+        for option in tier.get("option_list") or []:
+            entry = {"option": option.get("option")}
+            image_url = (option.get("image") or {}).get("image_url")
+            if image_url:
+                entry["image_url"] = image_url
+            option_list.append(entry)
+        tier_variation.append({"name": tier.get("name"), "option_list": option_list})
+    return {
+        "tier_variation": tier_variation,
+        "model": [
+            {
+                "tier_index": model["tier_index"],
+                "original_price": _model_price(model),
+                "model_sku": model.get("model_sku"),
+                "stock_info_v2": model.get("stock_info_v2"),
+            }
+            for model in models
+        ],
+    }
+
+def variation_image_urls(variation_template):
+    """The distinct option image URLs of a variation template, in order."""
+    if not variation_template:
+        return []
+    return list(dict.fromkeys(option["image_url"] for tier in variation_template["tier_variation"]
+                              for option in tier["option_list"] if option.get("image_url")))
+
+def _with_variation_images(variation_template, image_ids):
+    """The init_tier_variation payload: the template's tiers with option image URLs replaced by uploaded image IDs."""
+    tier_variation = []
+    for tier in variation_template["tier_variation"]:
+        option_list = []
+        for option in tier["option_list"]:
+            entry = {"option": option["option"]}
+            if option.get("image_url"):
+                entry["image"] = {"image_id": image_ids[option["image_url"]]}
+            option_list.append(entry)
+        tier_variation.append({"name": tier["name"], "option_list": option_list})
+    return {"tier_variation": tier_variation, "model": variation_template["model"]}
+
+def cover_image_url(image_hosting_url, parent_sku, shop_code_for_image):
+    """The URL of a product's replacement cover image, following the {SKU}_C_{ShopCode}.jpg naming convention."""
+    return f"{image_hosting_url}/{parent_sku}_C_{shop_code_for_image}.jpg"
+
+def _with_cover_image(product_template, new_image_id):
+    """Returns a copy of the payload with its cover image replaced, keeping the other images."""
+    original_image_ids = product_template["image"]["image_id_list"]
+    new_item_data = dict(product_template)
+    new_item_data["image"] = {"image_id_list": [new_image_id] + original_image_ids[1:]}
+    return new_item_data
+
+def _prepare_cloned_product_data(source_data, new_image_id):
+    """Prepares the payload for the new product, using data from the source and the new image."""
+    return _with_cover_image(prepare_product_template(source_data), new_image_id)
+
+def _new_clone_result(source_item_id, shop_code_for_image):
+    """Returns an empty result record for one clone run."""
+    return {
+        "source_item_id": source_item_id,
+        "shop_code": shop_code_for_image,
+        "status": "failed",
+        "failed_step": None,
+        "error": None,
+        "image_id": None,
+        "new_item_id": None,
+        "retryable": True,
+        "attempts": 1,
+        "timings": {},
+    }
+
+def failed_clone_result(source_item_id, shop_code_for_image, step, error):
+    """Result record for a clone that could not run, e.g. because the source item is missing."""
+    result = _new_clone_result(source_item_id, shop_code_for_image)
+    result.update({"failed_step": step, "error": error, "retryable": False})
+    return result
+
+def _fail(result, step, message, log):
+    log(f"[bold red]Error:[/bold red] {message}")
+    result["failed_step"] = step
+    result["error"] = message
+    return result
+
+def _silent(*args, **kwargs):
+    pass
+
+def _published_item_id(publish_response, item_id):
+    """The published item's ID, from either an {"item_id"} response or an unlist_item success_list."""
+    if not publish_response or not publish_response.get("response"):
+        return None
+    response = publish_response["response"]
+    if response.get("item_id"):
+        return response["item_id"]
+    for entry in response.get("success_list") or []:
+        if int(entry.get("item_id", 0)) == int(item_id):
+            return entry["item_id"]
+    return None
+
+def _payload_hash(item_data):
+    return hashlib.sha256(json.dumps(item_data, sort_keys=True, default=str).encode()).hexdigest()
+
+def _created_models(models, model_list_response):
+    """
+    From a get_model_list (or get_global_model_list) response: whether the item's tiers are set,
+    and how many of `models` (created in order) already exist.
+    """
+    response = model_list_response["response"]
+    existing = {tuple(model["tier_index"]) for model in response.get("model") or response.get("global_model") or []}
+    created = 0
+    while created < len(models) and tuple(models[created]["tier_index"]) in existing:
+        created += 1
+    return bool(response.get("tier_variation")), created
+
+def _created_item_id(create_response):
+    """The new item's ID from an add_item ({"item_id"}) or add_global_item ({"global_item_id"}) response."""
+    if not create_response or not create_response.get("response"):
+        return None
+    return create_response["response"].get("item_id") or create_response["response"].get("global_item_id")
+
+# --- Pipeline steps ---
+# Each step is a generator of (method_name, args) platform calls, run by pipeline_executor; see CLONE_PIPELINE.
+# `context` holds the clone's settings and `outputs` the results of the steps it runs after.
+
+def _fetch_step(context, outputs):
+    """Steps 1-2: the source product (fetched unless prefetched) and the URL of its new cover image."""
+    log, source_item_id = context["log"], context["result"]["source_item_id"]
+    source_product_data = context["source_product_data"]
+    if source_product_data is None:
+        log(f"\n[bold yellow]Step 1: Fetching details for source product ID: {source_item_id}...[/bold yellow]")
+        product_details_response = yield ("get_product_details", (source_item_id,))
+        if not product_details_response or not product_details_response.get("response") or not product_details_response["response"].get("item_list"):
+            raise StepFailed("Failed to fetch product details or the product does not exist.")
+        source_product_data = product_details_response["response"]["item_list"][0]
+        log("  ✓ Fetched product details successfully.")
+    else:
+        log(f"\n[bold yellow]Step 1: Using prefetched details for source product ID: {source_item_id}.[/bold yellow]")
+
+    log("\n[bold yellow]Step 2: Constructing new image URL...[/bold yellow]")
     parent_sku = source_product_data.get("item_sku")
     if not parent_sku:
-        rich.print("[bold red]Error:[/bold red] Source product does not have an Item SKU (Parent SKU). Cannot generate image URL.")
-        return
-    new_cover_url = f"{image_hosting_url}/{parent_sku}_C_{shop_code_for_image}.jpg"
-    rich.print(f"  ✓ Constructed new cover image URL: [link={new_cover_url}]{new_cover_url}[/link]")
-
-    # --- Step 3: Upload New Cover Image ---
-    rich.print("\n[bold yellow]Step 3: Uploading new cover image...[/bold yellow]")
-    upload_response = platform_client.upload_image(new_cover_url)
+        raise StepFailed("Source product does not have an Item SKU (Parent SKU). Cannot generate image URL.", retryable=False)
+    new_cover_url = cover_image_url(context["image_hosting_url"], parent_sku, context["result"]["shop_code"])
+    log(f"  ✓ Constructed new cover image URL: [link={new_cover_url}]{new_cover_url}[/link]")
+    return {"source": source_product_data, "cover_url": new_cover_url,
+            "variations": prepare_variation_template(source_product_data)}
+
+def _upload_step(context, outputs):
+    """Step 3: uploads the new cover image."""
+    log = context["log"]
+    log("\n[bold yellow]Step 3: Uploading new cover image...[/bold yellow]")
+    upload_response = yield ("upload_image", (outputs["fetch"]["cover_url"],))
     if not upload_response or not upload_response.get("response") or not upload_response["response"].get("image_info"):
-        rich.print("[bold red]Error:[/bold red] Failed to upload the new image. Check if the image exists at the URL and is accessible.")
-        return
+        raise StepFailed("Failed to upload the new image. Check if the image exists at the URL and is accessible.")
     new_image_id = upload_response["response"]["image_info"]["image_id"]
-    rich.print(f"  ✓ Image uploaded successfully. New Image ID: [bold cyan]{new_image_id}[/bold cyan]")
-
-    # --- Step 4: Create New Product ---
-    rich.print("\n[bold yellow]Step 4: Creating new product...[/bold yellow]")
-    cloned_item_data = _prepare_cloned_product_data(source_product_data, new_image_id)
-    create_response = platform_client.create_item(cloned_item_data)
-    if not create_response or not create_response.get("response") or not create_response["response"].get("item_id"):
-        rich.print("[bold red]Error:[/bold red] Failed to create the new product.")
-        return
-    new_item_id = create_response["response"]["item_id"]
-    rich.print(f"  ✓ New product created successfully. New Item ID: [bold cyan]{new_item_id}[/bold cyan]")
-
-    # --- Step 5: Publish New Product ---
-    rich.print("\n[bold yellow]Step 5: Publishing new product...[/bold yellow]")
-    publish_response = platform_client.publish_item(new_item_id)
-    if not publish_response or not publish_response.get("response") or not publish_response["response"].get("item_id"):
-        rich.print("[bold red]Error:[/bold red] Failed to publish the new product.")
-        return
-    
-    published_item_id = publish_response["response"]["item_id"]
-    rich.print(f"  ✓ Product [bold cyan]{published_item_id}[/bold cyan] published successfully!")
-    rich.print("\n[bold green]🎉 Product cloning process completed! 🎉[/bold green]")
+    log(f"  ✓ Image uploaded successfully. New Image ID: [bold cyan]{new_image_id}[/bold cyan]")
+    return {"image_id": new_image_id}
+
+def _variation_images_step(context, outputs):
+    """
+    Step 3b: uploads every distinct option image, alongside the cover upload and item creation.
+    Returns the init_tier_variation payload, or None for a product without variations.
+    """
+    variations = outputs["fetch"]["variations"]
+    if not variations:
+        return {"variations": None}
+    option_image_urls = variation_image_urls(variations)
+    # Journals written before option images had their own step kept them with the cover upload.
+    image_ids = (context["completed"].get("upload") or {}).get("variation_image_ids") or {}
+    if any(url not in image_ids for url in option_image_urls):
+        image_ids, failed = yield ("upload_images", (option_image_urls,))
+        if failed:
+            raise StepFailed(f"Failed to upload {len(failed)} variation image(s): {', '.join(failed)}")
+        context["log"](f"  ✓ Uploaded {len(option_image_urls)} variation image(s).")
+    return {"variations": _with_variation_images(variations, image_ids)}
+
+def _create_step(context, outputs):
+    """Step 4: creates the new (unlisted) item with the new cover image."""
+    log = context["log"]
+    log("\n[bold yellow]Step 4: Creating new product...[/bold yellow]")
+    methods = context["methods"]
+    product_template = context["product_template"] or prepare_product_template(outputs["fetch"]["source"])
+    new_image_id = outputs["upload"]["image_id"]
+    item_data = _with_cover_image(product_template, new_image_id)
+
+    started = context["completed"].get("create_started")
+    if started:
+        # A previous attempt sent the create call but never saw it succeed; the item may exist anyway.
+        found = yield (methods["find"], (started["item_sku"], started["started_at"]))
+        if found is None:
+            raise StepFailed("Failed to check whether a previous attempt already created the product.")
+        if found:
+            new_item_id = found[0]
+            log(f"  ✓ Found product [bold cyan]{new_item_id}[/bold cyan] created by a previous attempt.")
+            if len(found) > 1:
+                log(f"  [yellow]{len(found)} products with SKU {started['item_sku']} were created since; "
+                    f"keeping the first. Check for duplicates: {', '.join(map(str, found[1:]))}[/yellow]")
+            return {"item_id": new_item_id, "image_id": new_image_id}
+
+    # Recorded before the call, so a lost response is looked up instead of creating a second listing.
+    context["record"]("create_started", {"item_sku": item_data.get("item_sku"), "payload_hash": _payload_hash(item_data),
+                                         "started_at": time.time()})
+    create_response = yield (methods["create"], (item_data,))
+    new_item_id = _created_item_id(create_response)
+    if not new_item_id:
+        raise StepFailed("Failed to create the new product.")
+    log(f"  ✓ New product created successfully. New Item ID: [bold cyan]{new_item_id}[/bold cyan]")
+    return {"item_id": new_item_id, "image_id": new_image_id}
+
+def _variations_step(context, outputs):
+    """
+    Step 5: sets the new item's tiers and creates its models, MODEL_BATCH_SIZE per call. Progress is
+    recorded around each call (as "models", since a failure of the step is recorded as "variations"),
+    so a retry continues with the next batch. A call whose outcome was never recorded is checked
+    against the item's model list before anything is sent again.
+    """
+    variation_data = outputs["variation_images"]["variations"]
+    if not variation_data:
+        return {"created": 0}
+    log, methods, record = context["log"], context["methods"], context["record"]
+    new_item_id = outputs["create"]["item_id"]
+    models = variation_data["model"]
+    progress = context["completed"].get("models", {})
+    created = progress.get("created", 0)
+    tiers_set = created > 0
+    if progress.get("pending"):
+        response = yield (methods["model_list"], (new_item_id,))
+        if not response or not response.get("response"):
+            raise StepFailed("Failed to check the variations sent by a previous attempt.")
+        tiers_set, created = _created_models(models, response)
+        record("models", {"created": created})
+    if created >= len(models):
+        log("  ✓ Variations were already created by a previous attempt.")
+        return {"created": created}
+    log(f"\n[bold yellow]Step 5: Creating {len(models)} variation(s)...[/bold yellow]")
+    while created < len(models):
+        batch = models[created:created + MODEL_BATCH_SIZE]
+        record("models", {"created": created, "pending": True})
+        if not tiers_set:
+            response = yield (methods["init_tiers"], (new_item_id, variation_data["tier_variation"], batch))
+        else:
+            response = yield (methods["add_models"], (new_item_id, batch))
+        if not response or not response.get("response"):
+            raise StepFailed(f"Failed to create variations {created + 1}-{created + len(batch)} of {len(models)}.")
+        created += len(batch)
+        tiers_set = True
+        record("models", {"created": created})
+    log(f"  ✓ Created {len(models)} variation(s).")
+    return {"created": created}
+
+def _publish_step(context, outputs):
+    """Step 6: lists the new item."""
+    context["log"]("\n[bold yellow]Step 6: Publishing new product...[/bold yellow]")
+    new_item_id = outputs["create"]["item_id"]
+    publish_response = yield ("publish_item", (new_item_id,))
+    published_item_id = _published_item_id(publish_response, new_item_id)
+    if not published_item_id:
+        raise StepFailed("Failed to publish the new product.")
+    return {"item_id": published_item_id}
+
+def shop_listing(product_template):
+    """
+    A shop's own fields of a global product, published with it (create_publish_task's "item"): the
+    listing name, price and logistics, which the global item leaves to each shop.
+    """
+    listing = {key: product_template.get(key) for key in ("item_name", "original_price", "logistic_info")}
+    return {key: value for key, value in listing.items() if value is not None}
+
+def _global_publish_step(context, outputs):
+    """
+    Step 6 of a global clone: publishes the global item to the target shops in one batched call.
+    Each shop is journaled as it is published (as "published:<shop_id>"), so the step isn't journaled
+    as a whole: a retry, or a later fan-out adding shops, publishes to just the shops still missing it.
+    """
+    log, result = context["log"], context["result"]
+    global_item_id = outputs["create"]["item_id"]
+    shops = context["shops"]
+    # Keyed by str(shop_id), as the journal stores JSON
+    published = {str(shop["shop_id"]): context["completed"][f"published:{shop['shop_id']}"]["item_id"]
+                 for shop in shops if f"published:{shop['shop_id']}" in context["completed"]}
+    product_template = context["product_template"] or prepare_product_template(outputs["fetch"]["source"])
+    listing = shop_listing(product_template)
+    pending = [dict(shop, item=listing) for shop in shops if str(shop["shop_id"]) not in published]
+    failed = {}
+    if pending:
+        log(f"\n[bold yellow]Step 6: Publishing global product to {len(pending)} shop(s)...[/bold yellow]")
+        item_ids, failed = yield ("publish_global_item", (global_item_id, pending))
+        for shop_id, item_id in item_ids.items():
+            context["record"](f"published:{shop_id}", {"item_id": item_id})
+            published[str(shop_id)] = item_id
+    if failed:
+        result["published"] = {int(shop_id): item_id for shop_id, item_id in published.items()}
+        result["publish_failures"] = {int(shop_id): reason for shop_id, reason in failed.items()}
+        raise StepFailed(f"Failed to publish to {len(failed)} of {len(shops)} shop(s): "
+                         + ", ".join(f"{shop_id} ({reason})" for shop_id, reason in failed.items()))
+    log(f"  ✓ Published to {len(published)} shop(s).")
+    return {"item_ids": published}
+
+# Steps are timed (and reported to on_step) under their PIPELINE_STEPS name. Option images are uploaded
+# while the cover is uploaded and the item created; everything else needs the step before it.
+CLONE_PIPELINE = (
+    pipeline_step("fetch", _fetch_step),
+    pipeline_step("upload", _upload_step, after=("fetch",), journaled=True),
+    pipeline_step("variation_images", _variation_images_step, after=("fetch",), journaled=True, timing="upload"),
+    pipeline_step("create", _create_step, after=("fetch", "upload"), journaled=True),
+    pipeline_step("variations", _variations_step, after=("create", "variation_images")),
+    pipeline_step("publish", _publish_step, after=("create", "variations"), journaled=True),
+)
+
+# A global (CNSC) product is created once for the merchant and published to several shops.
+GLOBAL_CLONE_PIPELINE = CLONE_PIPELINE[:-1] + (
+    pipeline_step("publish", _global_publish_step, after=("fetch", "create", "variations")),
+)
+
+_SHOP_METHODS = {
+    "create": "create_item", "find": "find_items_by_sku",
+    "init_tiers": "init_tier_variation", "add_models": "add_model", "model_list": "get_model_list",
+}
+_GLOBAL_METHODS = {
+    "create": "create_global_item", "find": "find_global_items_by_sku",
+    "init_tiers": "init_global_tier_variation", "add_models": "add_global_model", "model_list": "get_global_model_list",
+}
+
+def _resumable_steps(completed):
+    """Journaled outputs by step, with records of older pipeline versions mapped onto the current steps."""
+    completed = dict(completed or {})
+    create = completed.get("create")
+    if create and "variations" in create and "variation_images" not in completed:
+        # The variation payload used to be recorded along with the created item.
+        completed["variation_images"] = {"variations": create["variations"]}
+    # Global clones used to journal their published shops together, under "published" and then "publish".
+    for step in ("published", "publish"):
+        for shop_id, item_id in ((completed.get(step) or {}).get("item_ids") or {}).items():
+            completed.setdefault(f"published:{shop_id}", {"item_id": item_id})
+    return completed
+
+def _logger(verbose, log):
+    """The progress log: `log` if given, else the console when verbose."""
+    return log or (rich.print if verbose else _silent)
+
+def _start_clone(platform_client, source_item_id, image_hosting_url, shop_code_for_image, verbose, source_product_data,
+                 product_template, journal, log, global_shops):
+    """Creates the result record and pipeline context shared by the sync and async drivers."""
+    log = _logger(verbose, log)
+    result = _new_clone_result(source_item_id, shop_code_for_image)
+    # A global clone belongs to the merchant, not to one of its shops.
+    journal_shop_id = getattr(platform_client, "merchant_id" if global_shops is not None else "shop_id", None)
+    completed, record = {}, _silent
+    if journal is not None:
+        journaled = journal.completed_steps(source_item_id, shop_code_for_image, journal_shop_id)
+        completed = _resumable_steps(journaled)
+
+        def record(step, output):
+            journal.record_success(source_item_id, shop_code_for_image, journal_shop_id, step, output)
+        # Rewrite older records in the current form, so a failure of the step that held them can't lose them.
+        for step in completed.keys() - journaled.keys():
+            record(step, completed[step])
+        # The journal also holds partial progress (e.g. "models"); only whole steps are reported as resumed.
+        result["resumed_steps"] = sorted(step["name"] for step in CLONE_PIPELINE if step["name"] in completed)
+        if result["resumed_steps"]:
+            log(f"\n[bold yellow]Resuming: {', '.join(result['resumed_steps'])} finished by a previous attempt.[/bold yellow]")
+    context = {
+        "result": result,
+        "log": log,
+        "image_hosting_url": image_hosting_url,
+        "source_product_data": source_product_data,
+        "product_template": product_template,
+        "completed": completed,
+        "record": record,
+        "methods": _GLOBAL_METHODS if global_shops is not None else _SHOP_METHODS,
+        "shops": global_shops,
+        "journal_shop_id": journal_shop_id,
+    }
+    steps = GLOBAL_CLONE_PIPELINE if global_shops is not None else CLONE_PIPELINE
+    return result, steps, context
+
+def _metrics_for(platform_client):
+    """Pipeline metrics go to the same registry as the client's request metrics."""
+    return getattr(platform_client, "metrics", None) or get_default_metrics()
+
+def _finish_clone(platform_client, result, context, outcome, journal):
+    """Writes the pipeline's outcome into the result record, then records metrics and any failure."""
+    log, outputs = context["log"], outcome["outputs"]
+    result["timings"] = outcome["timings"]
+    if "upload" in outputs:
+        result["image_id"] = outputs["upload"]["image_id"]
+    if "create" in outputs:
+        result["image_id"] = outputs["create"]["image_id"]
+        result["global_item_id" if context["shops"] is not None else "new_item_id"] = outputs["create"]["item_id"]
+    if outcome["failed"] is not None:
+        step, error = outcome["failed"]
+        _fail(result, step, str(error), log)
+        result["retryable"] = error.retryable
+    else:
+        result["status"] = "success"
+        if context["shops"] is None:
+            log(f"  ✓ Product [bold cyan]{outputs['publish']['item_id']}[/bold cyan] published successfully!")
+        else:
+            result["published"] = {int(shop_id): item_id for shop_id, item_id in outputs["publish"]["item_ids"].items()}
+        log("\n[bold green]🎉 Product cloning process completed! 🎉[/bold green]")
+
+    metrics = _metrics_for(platform_client)
+    for step, seconds in result["timings"].items():
+        metrics.observe_step(step, seconds)
+    metrics.record_clone(result)
+    if journal is not None and result["status"] != "success" and result["failed_step"]:
+        journal.record_failure(result["source_item_id"], result["shop_code"], context["journal_shop_id"],
+                               result["failed_step"], result["error"])
+    return result
+
+def clone_single_product(platform_client, source_item_id, image_hosting_url, shop_code_for_image, verbose=True,
+                         source_product_data=None, journal=None, product_template=None, log=None, on_step=None,
+                         global_shops=None):
+    """
+    Clones a single product by fetching, modifying, and re-uploading.
+    Pass `source_product_data` when the source item was already fetched (e.g. by a batched fetch) to skip step 1,
+    and optionally its `product_template` when the same source is cloned into many shops.
+    With a `journal` (JobJournal), finished steps are recorded and steps finished by earlier runs are skipped.
+    Progress messages go to `log(message)` (rich markup) instead of the console if given, and
+    `on_step(step)` is called as each platform call starts.
+
+    With `global_shops` ([{"shop_id", "shop_region"}]), the clone is created as one global (CNSC) product
+    of the client's merchant and published to all of those shops; result["published"] maps each
+    published shop ID to its new item ID.
+    Returns a result dict with the outcome, new item ID and per-step timings (seconds).
+    """
+    result, steps, context = _start_clone(platform_client, source_item_id, image_hosting_url, shop_code_for_image, verbose,
+                                          source_product_data, product_template, journal, log, global_shops)
+
+    def call(method_name, args):
+        return getattr(platform_client, method_name)(*args)
+
+    outcome = run_pipeline(steps, call, context, completed=context["completed"], record=context["record"], on_call=on_step)
+    return _finish_clone(platform_client, result, context, outcome, journal)
+
+async def clone_single_product_async(platform_client, source_item_id, image_hosting_url, shop_code_for_image, verbose=True,
+                                     source_product_data=None, journal=None, product_template=None, log=None, on_step=None,
+                                     global_shops=None):
+    """Async variant of clone_single_product for clients whose platform methods are coroutines (e.g. AsyncShopeeClient)."""
+    result, steps, context = _start_clone(platform_client, source_item_id, image_hosting_url, shop_code_for_image, verbose,
+                                          source_product_data, product_template, journal, log, global_shops)
+
+    def call(method_name, args):
+        return getattr(platform_client, method_name)(*args)
+
+    outcome = await run_pipeline_async(steps, call, context, completed=context["completed"], record=context["record"],
+                                       on_call=on_step)
+    return _finish_clone(platform_client, result, context, outcome, journal)
+
+def _retry_delay(attempt, base_delay=CLONE_RETRY_BASE_DELAY, max_delay=CLONE_RETRY_MAX_DELAY):
+    """Exponential backoff with full jitter for the given (0-based) attempt."""
+    return random.uniform(0, min(max_delay, base_delay * 2 ** attempt))
+
+def _should_retry(result, attempt, max_attempts):
+    return result["status"] != "success" and result["retryable"] and attempt + 1 < max_attempts
+
+def clone_with_retry(platform_client, source_item_id, image_hosting_url, shop_code_for_image, journal=None,
+                     max_attempts=CLONE_MAX_ATTEMPTS, verbose=True, source_product_data=None, product_template=None,
+                     log=None, on_step=None, global_shops=None):
+    """
+    Runs clone_single_product up to `max_attempts` times, backing off between attempts.
+    Each retry resumes from the last finished step instead of starting over; with a `journal`, so
+    does a later run. Without one, the attempts share a journal kept in memory.
+    """
+    log = _logger(verbose, log)
+    own_journal = journal is None
+    if own_journal:
+        journal = JobJournal(":memory:")
+    try:
+        for attempt in range(max_attempts):
+            result = clone_single_product(platform_client, source_item_id, image_hosting_url, shop_code_for_image,
+                                          verbose=verbose, source_product_data=source_product_data, journal=journal,
+                                          product_template=product_template, log=log, on_step=on_step,
+                                          global_shops=global_shops)
+            result["attempts"] = attempt + 1
+            if not _should_retry(result, attempt, max_attempts):
+                return result
+            delay = _retry_delay(attempt)
+            _metrics_for(platform_client).record_clone_retry(result["failed_step"])
+            log(f"[yellow]Attempt {attempt + 1}/{max_attempts} failed at '{result['failed_step']}'; retrying in {delay:.1f}s...[/yellow]")
+            time.sleep(delay)
+    finally:
+        if own_journal:
+            journal.close()
+
+async def clone_with_retry_async(platform_client, source_item_id, image_hosting_url, shop_code_for_image, journal=None,
+                                 max_attempts=CLONE_MAX_ATTEMPTS, verbose=True, source_product_data=None, product_template=None,
+                                 log=None, on_step=None, global_shops=None):
+    """Async variant of clone_with_retry."""
+    log = _logger(verbose, log)
+    own_journal = journal is None
+    if own_journal:
+        journal = JobJournal(":memory:")
+    try:
+        for attempt in range(max_attempts):
+            result = await clone_single_product_async(platform_client, source_item_id, image_hosting_url, shop_code_for_image,
+                                                      verbose=verbose, source_product_data=source_product_data, journal=journal,
+                                                      product_template=product_template, log=log, on_step=on_step,
+                                                      global_shops=global_shops)
+            result["attempts"] = attempt + 1
+            if not _should_retry(result, attempt, max_attempts):
+                return result
+            delay = _retry_delay(attempt)
+            _metrics_for(platform_client).record_clone_retry(result["failed_step"])
+            log(f"[yellow]Attempt {attempt + 1}/{max_attempts} failed at '{result['failed_step']}'; retrying in {delay:.1f}s...[/yellow]")
+            await asyncio.sleep(delay)
+    finally:
+        if own_journal:
+            journal.close()
@@ -0,0 +1,167 @@
+# profile_store.py: SQLite-backed store of shop profiles, replacing whole-file users.json rewrites.
+
+import json
+import os
+import sqlite3
+import threading
+import time
+
+import rich
+
+from config import PROFILE_DB_PATH, USERS_JSON_PATH
+
+class ProfileStore:
+    """
+    Shop profiles ({username: profile}) in a local SQLite file (WAL mode), one row per username,
+    indexed by shop_id. Updates touch only their own row, so concurrent token refreshes never
+    overwrite each other. Reads are served from an in-process copy that is reloaded only when the
+    database changed, including changes made by other processes. Safe to share between threads.
+    """
+
+    def __init__(self, path=PROFILE_DB_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS profiles (
+                username TEXT PRIMARY KEY,
+                partner_id INTEGER,
+                shop_id INTEGER NOT NULL,
+                data TEXT NOT NULL,
+                updated_at REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS profiles_shop ON profiles (shop_id, partner_id);
+            """
+        )
+        self._cache = None
+        self._cache_version = None
+
+    def _data_version(self):
+        # Changes whenever another connection commits, so the cache knows when to reload.
+        return self._conn.execute("PRAGMA data_version").fetchone()[0]
+
+    def _profiles(self):
+        """The cached {username: profile}, reloaded if the database changed. Call with the lock held."""
+        version = self._data_version()
+        if self._cache is None or version != self._cache_version:
+            rows = self._conn.execute("SELECT username, data FROM profiles ORDER BY username").fetchall()
+            self._cache = {username: json.loads(data) for username, data in rows}
+            self._cache_version = version
+        return self._cache
+
+    def all(self):
+        """Returns every profile as {username: profile}."""
+        with self._lock:
+            return {username: dict(profile) for username, profile in self._profiles().items()}
+
+    def get(self, username):
+        with self._lock:
+            profile = self._profiles().get(username)
+        return dict(profile) if profile is not None else None
+
+    def find_by_shop(self, shop_id, partner_id=None):
+        """Returns {username: profile} for every profile of a shop."""
+        query = "SELECT username, data FROM profiles WHERE shop_id=?"
+        args = (int(shop_id),)
+        if partner_id is not None:
+            query, args = query + " AND (partner_id IS NULL OR partner_id=?)", (*args, int(partner_id))
+        with self._lock:
+            rows = self._conn.execute(query, args).fetchall()
+        return {username: json.loads(data) for username, data in rows}
+
+    _UPSERT = """
+        INSERT INTO profiles (username, partner_id, shop_id, data, updated_at) VALUES (?, ?, ?, ?, ?)
+        ON CONFLICT (username) DO UPDATE SET
+            partner_id=excluded.partner_id, shop_id=excluded.shop_id, data=excluded.data, updated_at=excluded.updated_at
+    """
+
+    @staticmethod
+    def _row(username, profile):
+        partner_id = profile.get("partner_id")
+        return (username, int(partner_id) if partner_id is not None else None, int(profile["shop_id"]),
+                json.dumps(profile), time.time())
+
+    def save(self, username, profile):
+        """Creates or replaces one profile."""
+        with self._lock:
+            self._conn.execute(self._UPSERT, self._row(username, profile))
+            self._cache = None
+
+    def save_many(self, users):
+        """Saves several profiles ({username: profile}) in one transaction."""
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._conn.executemany(self._UPSERT, [self._row(username, profile) for username, profile in users.items()])
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            finally:
+                self._cache = None
+
+    def update_tokens(self, partner_id, shop_id, tokens):
+        """
+        Sets the tokens ({"access_token", "refresh_token", "expire_at"}) of every profile of a shop
+        in a single statement, leaving the rest of each profile as it is. Returns the rows updated.
+        """
+        return self._set_fields(tokens, "shop_id=?", int(shop_id), partner_id)
+
+    def update_merchant_tokens(self, partner_id, merchant_id, fields):
+        """Sets fields (e.g. merchant_access_token) of every profile of a merchant's shops. Returns the rows updated."""
+        return self._set_fields(fields, "json_extract(data, '$.merchant_id')=?", int(merchant_id), partner_id)
+
+    def _set_fields(self, fields, condition, value, partner_id):
+        assignments = ", ".join("?, ?" for _ in fields)
+        args = [item for key, field_value in fields.items() for item in (f"$.{key}", field_value)]
+        with self._lock:
+            updated = self._conn.execute(
+                f"UPDATE profiles SET data=json_set(data, {assignments}), updated_at=? "
+                f"WHERE {condition} AND (partner_id IS NULL OR partner_id=?)",
+                (*args, time.time(), value, int(partner_id)),
+            ).rowcount
+            self._cache = None
+        return updated
+
+    def delete(self, username):
+        with self._lock:
+            self._conn.execute("DELETE FROM profiles WHERE username=?", (username,))
+            self._cache = None
+
+    def migrate_from_json(self, json_path):
+        """
+        Imports the profiles of a users.json file into an empty store. The JSON file is left in place.
+        Returns the number of profiles imported.
+        """
+        with self._lock:
+            has_profiles = self._conn.execute("SELECT 1 FROM profiles LIMIT 1").fetchone() is not None
+        if has_profiles or not os.path.exists(json_path):
+            return 0
+        try:
+            with open(json_path, 'r') as f:
+                users = json.load(f)
+        except json.JSONDecodeError:
+            rich.print(f"[yellow]Warning: Could not parse {json_path}; no profiles imported.[/yellow]")
+            return 0
+        self.save_many(users)
+        rich.print(f"[dim]Imported {len(users)} profile(s) from {json_path} into {self.path}.[/dim]")
+        return len(users)
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+_default_store = None
+_default_store_lock = threading.Lock()
+
+def get_default_profile_store():
+    """The process-wide profile store, created (and seeded from users.json) on first use."""
+    global _default_store
+    with _default_store_lock:
+        if _default_store is None:
+            _default_store = ProfileStore()
+            _default_store.migrate_from_json(USERS_JSON_PATH)
+        return _default_store
@@ -0,0 +1,220 @@
+# shard_processor.py: Very large clone runs split by shop across worker processes.
+
+import multiprocessing
+import queue
+import signal
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+
+import rich
+
+from config import (
+    SHARD_MAX_PROCESSES, SHARD_CHUNK_JOBS, BATCH_MAX_WORKERS, JOURNAL_DB_PATH,
+    RATE_LIMIT_PARTNER_QPS, RATE_LIMIT_PATH_QPS,
+)
+from batch_processor import run_batch, summarize_results
+from image_preflight import get_default_image_preflight
+from job_journal import JobJournal
+from metrics import get_default_metrics
+from platforms.rate_limiter import RequestScheduler
+from platforms.shopee_client import ShopeeClient
+from product_cache import ProductDetailsCache
+
+# Seconds the parent waits for worker messages before checking on the shards again.
+_POLL_INTERVAL = 0.2
+
+def shard_jobs(jobs, profiles):
+    """
+    Groups jobs ({"source_item_id", "shop_code", "profile"}) by target shop.
+    Returns [(profile_name, profile, jobs)], largest shard first so the long ones start early.
+    Profiles pointing at the same shop share one shard.
+    """
+    shards = {}
+    for job in jobs:
+        profile = profiles[job["profile"]]
+        key = (int(profile["partner_id"]), int(profile["shop_id"]))
+        if key not in shards:
+            shards[key] = (job["profile"], profile, [])
+        shards[key][2].append({"source_item_id": int(job["source_item_id"]), "shop_code": job["shop_code"]})
+    return sorted(shards.values(), key=lambda shard: len(shard[2]), reverse=True)
+
+def _partner_budgets(shards, processes):
+    """
+    Shopee's partner quota is shared by all of a partner's shops, so it is divided between the
+    processes that may serve that partner at the same time. Returns {partner_id: (partner_qps, path_qps)}.
+    """
+    shop_counts = {}
+    for _, profile, _ in shards:
+        partner_id = int(profile["partner_id"])
+        shop_counts[partner_id] = shop_counts.get(partner_id, 0) + 1
+    budgets = {}
+    for partner_id, shop_count in shop_counts.items():
+        share = min(processes, shop_count)
+        budgets[partner_id] = (RATE_LIMIT_PARTNER_QPS / share,
+                               {path: qps / share for path, qps in RATE_LIMIT_PATH_QPS.items()})
+    return budgets
+
+@contextmanager
+def _sigint_ignored():
+    """
+    Ignores Ctrl-C while worker processes are started; they inherit the ignored signal, so only
+    the parent sees Ctrl-C and stops them between chunks instead of killing them mid-item.
+    """
+    if threading.current_thread() is not threading.main_thread():
+        yield
+        return
+    previous = signal.signal(signal.SIGINT, signal.SIG_IGN)
+    try:
+        yield
+    finally:
+        signal.signal(signal.SIGINT, previous)
+
+# --- Worker process ---
+
+_worker = {}
+
+def _init_worker(results_queue, stop_event):
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    _worker.update(queue=results_queue, stop=stop_event)
+
+def _run_shard(shard_id, profile, jobs, options):
+    """
+    Clones one shop's jobs inside a worker process, a chunk at a time, streaming each result to the
+    parent as it finishes. The shop's client, scheduler and access token exist only in this process.
+    Returns the shard's totals and the metrics it recorded.
+    """
+    metrics = get_default_metrics()
+    metrics.reset() # One shard runs per process at a time; report only this shard's numbers
+    scheduler = RequestScheduler(partner_qps=options["partner_qps"], path_qps=options["path_qps"])
+    client = ShopeeClient.from_profile(profile, scheduler=scheduler, details_cache=ProductDetailsCache(),
+                                       **options["client_kwargs"])
+    preflight = get_default_image_preflight() if options["preflight"] else None
+
+    def on_result(result):
+        _worker["queue"].put((shard_id, result))
+
+    finished, missing_images = 0, []
+    journal = JobJournal(options["journal_path"])
+    try:
+        for start in range(0, len(jobs), options["chunk_jobs"]):
+            if _worker["stop"].is_set():
+                break
+            results, stats = run_batch(client, jobs[start:start + options["chunk_jobs"]], profile["hosting_url"],
+                                       max_workers=options["max_workers"], on_result=on_result, journal=journal,
+                                       max_attempts=options["max_attempts"], preflight=preflight)
+            finished += len(results)
+            missing_images.extend(stats["missing_images"])
+    finally:
+        journal.close()
+    return {"finished": finished, "missing_images": missing_images, "metrics": metrics.snapshot()}
+
+# --- Parent process ---
+
+def run_sharded(shards, max_processes=SHARD_MAX_PROCESSES, max_workers=BATCH_MAX_WORKERS, on_result=None,
+                journal_path=JOURNAL_DB_PATH, max_attempts=1, preflight=True, chunk_jobs=SHARD_CHUNK_JOBS,
+                client_kwargs=None, metrics=None):
+    """
+    Clones every shard from shard_jobs() in a pool of `max_processes` worker processes, one shop per
+    process at a time, each cloning with `max_workers` threads like run_batch. Journaled steps are
+    skipped, so an interrupted run resumes where it stopped. `client_kwargs` are extra ShopeeClient
+    arguments (e.g. base_url). Worker metrics are merged into `metrics` (the default registry).
+
+    Results are tagged with their shard's profile name and passed to `on_result` as they finish.
+    The first Ctrl-C lets every process finish its current chunk and cancels the rest; a second
+    Ctrl-C stops waiting for them.
+    Returns (results, stats) with results in completion order; stats["not_started"] counts the jobs
+    left over by a stop or a crashed worker, and stats["shard_errors"] lists crashed shards.
+    """
+    metrics = metrics or get_default_metrics()
+    started = time.perf_counter()
+    processes = max(1, min(max_processes, len(shards)))
+    budgets = _partner_budgets(shards, processes)
+    context = multiprocessing.get_context("spawn") # Forking a process that runs threads is unsafe
+    results_queue, stop_event = context.Queue(), context.Event()
+
+    results, received = [], {}
+    shard_errors, crashed, missing_images = [], [], []
+    not_started = 0
+    interrupted = False
+
+    def collect(timeout):
+        try:
+            shard_id, result = results_queue.get(timeout=timeout)
+        except queue.Empty:
+            return False
+        result["profile"] = shards[shard_id][0]
+        received[shard_id] = received.get(shard_id, 0) + 1
+        results.append(result)
+        if on_result:
+            on_result(result)
+        return True
+
+    with _sigint_ignored():
+        executor = ProcessPoolExecutor(max_workers=processes, mp_context=context,
+                                       initializer=_init_worker, initargs=(results_queue, stop_event))
+        futures = {}
+        for shard_id, (_, profile, jobs) in enumerate(shards):
+            partner_qps, path_qps = budgets[int(profile["partner_id"])]
+            options = {
+                "partner_qps": partner_qps, "path_qps": path_qps, "max_workers": max_workers,
+                "max_attempts": max_attempts, "journal_path": journal_path, "preflight": preflight,
+                "chunk_jobs": max(1, chunk_jobs), "client_kwargs": client_kwargs or {},
+            }
+            futures[executor.submit(_run_shard, shard_id, profile, jobs, options)] = shard_id
+
+    pending = set(futures)
+    try:
+        while pending:
+            try:
+                collect(_POLL_INTERVAL)
+                for future in [future for future in pending if future.done()]:
+                    pending.discard(future)
+                    shard_id = futures[future]
+                    shard_jobs_count = len(shards[shard_id][2])
+                    if future.cancelled():
+                        not_started += shard_jobs_count
+                        continue
+                    error = future.exception()
+                    if error is not None:
+                        # Jobs of a crashed shard that never reported a result were not run.
+                        crashed.append(shard_id)
+                        shard_errors.append({"profile": shards[shard_id][0], "error": f"{type(error).__name__}: {error}"})
+                        continue
+                    summary = future.result()
+                    # A result can still be in the queue after its shard returned.
+                    while received.get(shard_id, 0) < summary["finished"] and collect(_POLL_INTERVAL * 5):
+                        pass
+                    not_started += shard_jobs_count - summary["finished"]
+                    missing_images.extend(summary["missing_images"])
+                    metrics.merge(summary["metrics"])
+            except KeyboardInterrupt:
+                if interrupted:
+                    raise
+                interrupted = True
+                stop_event.set()
+                executor.shutdown(wait=False, cancel_futures=True)
+                rich.print("\n[yellow]Stopping: letting each shop finish its current chunk "
+                           "(press Ctrl-C again to stop waiting)...[/yellow]")
+        while collect(0):
+            pass
+    finally:
+        stop_event.set()
+        executor.shutdown(wait=not pending, cancel_futures=True)
+
+    not_started += sum(len(shards[shard_id][2]) - received.get(shard_id, 0) for shard_id in crashed)
+
+    stats = summarize_results(results, time.perf_counter() - started)
+    stats.update(processes=processes, shards=len(shards), not_started=not_started, interrupted=interrupted,
+                 shard_errors=shard_errors, missing_images=missing_images)
+    return results, stats
+
+def print_shard_report(stats):
+    """Prints what a sharded run left undone; throughput is printed by batch_processor.print_stats."""
+    rich.print(f"  {stats['shards']} shops across {stats['processes']} worker processes")
+    for error in stats["shard_errors"]:
+        rich.print(f"  [red]✗[/red] [cyan]{error['profile']}[/cyan]: worker failed - {error['error']}")
+    if stats["not_started"]:
+        rich.print(f"[yellow]{stats['not_started']} job(s) were not run{' (stopped)' if stats['interrupted'] else ''}. "
+                   "Run the same sheet again to resume; finished steps are skipped.[/yellow]")
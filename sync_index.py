@@ -0,0 +1,113 @@
+# sync_index.py: Local index of synced items, so each sync run only handles what changed.
+
+import json
+import sqlite3
+import threading
+import time
+
+from config import SYNC_INDEX_DB_PATH
+
+class SyncIndex:
+    """
+    For each (source shop, target shop) pair, remembers which target listing every source item was
+    cloned into and the fingerprints of the source data it was last synced from, plus the pair's
+    watermark (the source update_time up to which everything is in sync). Safe to share between threads.
+    """
+
+    def __init__(self, path=SYNC_INDEX_DB_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS synced_items (
+                source_shop_id INTEGER NOT NULL,
+                source_item_id INTEGER NOT NULL,
+                target_shop_id INTEGER NOT NULL,
+                target_item_id INTEGER NOT NULL,
+                update_time INTEGER,
+                fingerprints TEXT NOT NULL,
+                synced_at REAL NOT NULL,
+                PRIMARY KEY (source_shop_id, target_shop_id, source_item_id)
+            );
+            CREATE TABLE IF NOT EXISTS sync_watermarks (
+                source_shop_id INTEGER NOT NULL,
+                target_shop_id INTEGER NOT NULL,
+                watermark INTEGER NOT NULL,
+                updated_at REAL NOT NULL,
+                PRIMARY KEY (source_shop_id, target_shop_id)
+            );
+            """
+        )
+
+    def watermark(self, source_shop_id, target_shop_id):
+        """The source update_time the last successful run covered, or None if the pair was never synced."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT watermark FROM sync_watermarks WHERE source_shop_id=? AND target_shop_id=?",
+                (int(source_shop_id), int(target_shop_id)),
+            ).fetchone()
+        return row[0] if row else None
+
+    def set_watermark(self, source_shop_id, target_shop_id, watermark):
+        with self._lock:
+            self._conn.execute(
+                """
+                INSERT INTO sync_watermarks (source_shop_id, target_shop_id, watermark, updated_at) VALUES (?, ?, ?, ?)
+                ON CONFLICT (source_shop_id, target_shop_id) DO UPDATE SET
+                    watermark=excluded.watermark, updated_at=excluded.updated_at
+                """,
+                (int(source_shop_id), int(target_shop_id), int(watermark), time.time()),
+            )
+
+    def entries(self, source_shop_id, target_shop_id, source_item_ids):
+        """Returns {source_item_id: {"target_item_id", "update_time", "fingerprints"}} for the given items."""
+        item_ids = [int(item_id) for item_id in source_item_ids]
+        entries = {}
+        with self._lock:
+            # Chunked to stay under SQLite's bound-parameter limit.
+            for i in range(0, len(item_ids), 500):
+                chunk = item_ids[i:i + 500]
+                rows = self._conn.execute(
+                    f"""
+                    SELECT source_item_id, target_item_id, update_time, fingerprints FROM synced_items
+                    WHERE source_shop_id=? AND target_shop_id=? AND source_item_id IN ({",".join("?" * len(chunk))})
+                    """,
+                    (int(source_shop_id), int(target_shop_id), *chunk),
+                ).fetchall()
+                for source_item_id, target_item_id, update_time, fingerprints in rows:
+                    entries[source_item_id] = {
+                        "target_item_id": target_item_id,
+                        "update_time": update_time,
+                        "fingerprints": json.loads(fingerprints),
+                    }
+        return entries
+
+    def record(self, source_shop_id, target_shop_id, source_item_id, target_item_id, update_time, fingerprints):
+        """Remembers that a source item is in sync with its target listing."""
+        with self._lock:
+            self._conn.execute(
+                """
+                INSERT INTO synced_items (source_shop_id, source_item_id, target_shop_id, target_item_id, update_time,
+                                          fingerprints, synced_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT (source_shop_id, target_shop_id, source_item_id) DO UPDATE SET
+                    target_item_id=excluded.target_item_id, update_time=excluded.update_time,
+                    fingerprints=excluded.fingerprints, synced_at=excluded.synced_at
+                """,
+                (int(source_shop_id), int(source_item_id), int(target_shop_id), int(target_item_id), update_time,
+                 json.dumps(fingerprints), time.time()),
+            )
+
+    def count(self, source_shop_id, target_shop_id):
+        with self._lock:
+            return self._conn.execute(
+                "SELECT COUNT(*) FROM synced_items WHERE source_shop_id=? AND target_shop_id=?",
+                (int(source_shop_id), int(target_shop_id)),
+            ).fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
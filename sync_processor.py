@@ -0,0 +1,226 @@
+# sync_processor.py: Incremental sync of a source shop's catalog into a target shop.
+
+import hashlib
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import rich
+
+from config import BATCH_MAX_WORKERS, SYNC_WATERMARK_OVERLAP, MODEL_BATCH_SIZE
+from product_processor import (
+    prepare_product_template, prepare_variation_template, cover_image_url, _with_cover_image, _new_clone_result,
+    failed_clone_result, clone_with_retry,
+)
+from batch_processor import summarize_results
+
+# add_item payload fields that have their own update call; every other field goes through update_item.
+PRICE_FIELDS = ("original_price",)
+STOCK_FIELDS = ("stock_info_v2",)
+
+def _digest(value):
+    return hashlib.sha256(json.dumps(value, sort_keys=True, default=str).encode()).hexdigest()
+
+def product_fingerprints(product_template, variation_template=None):
+    """
+    Hashes of the fields a clone is built from, grouped by the API call that updates them. Items with
+    variations add "models": their models' prices and stock, which are updated per model.
+    """
+    fingerprints = {
+        "listing": _digest({k: v for k, v in product_template.items() if k not in PRICE_FIELDS + STOCK_FIELDS}),
+        "price": _digest({k: product_template.get(k) for k in PRICE_FIELDS}),
+        "stock": _digest({k: product_template.get(k) for k in STOCK_FIELDS}),
+    }
+    if variation_template:
+        fingerprints["models"] = _digest([{k: model.get(k) for k in ("tier_index",) + PRICE_FIELDS + STOCK_FIELDS}
+                                          for model in variation_template["model"]])
+    return fingerprints
+
+def _model_calls(target_client, result, target_item_id, variation_template):
+    """
+    The update_price / update_stock calls that bring the target item's models in line with the source's,
+    matched by tier_index, MODEL_BATCH_SIZE models per call. Returns None (filling in `result`) if the
+    target's models can't be listed or lack one of the source's.
+    """
+    started = time.perf_counter()
+    response = target_client.get_model_list(target_item_id)
+    result["timings"]["models"] = time.perf_counter() - started
+    if not response or not response.get("response"):
+        result.update(failed_step="models", error=f"Failed to list the models of item {target_item_id}.")
+        return None
+    model_ids = {tuple(model["tier_index"]): model["model_id"] for model in response["response"].get("model") or []}
+    missing = [model["tier_index"] for model in variation_template["model"] if tuple(model["tier_index"]) not in model_ids]
+    if missing:
+        result.update(failed_step="models", error=f"Item {target_item_id} has no model for {len(missing)} source variation(s); "
+                                                  f"variations added at the source are not synced.")
+        return None
+    calls = []
+    models = variation_template["model"]
+    for start in range(0, len(models), MODEL_BATCH_SIZE):
+        batch = models[start:start + MODEL_BATCH_SIZE]
+        prices = {model_ids[tuple(model["tier_index"])]: model["original_price"] for model in batch}
+        stocks = {model_ids[tuple(model["tier_index"])]: model["stock_info_v2"] for model in batch}
+        calls.append(("model_price", target_client.update_model_prices, (target_item_id, prices)))
+        calls.append(("model_stock", target_client.update_model_stocks, (target_item_id, stocks)))
+    return calls
+
+def _update_listing(target_client, result, target_item_id, product_template, changed, image_hosting_url,
+                    variation_template=None):
+    """Pushes the changed field groups to an existing target listing. Fills in `result`."""
+    result["new_item_id"] = target_item_id
+    if "listing" in changed:
+        cover_url = cover_image_url(image_hosting_url, product_template.get("item_sku"), result["shop_code"])
+        started = time.perf_counter()
+        upload_response = target_client.upload_image(cover_url)
+        result["timings"]["upload"] = time.perf_counter() - started
+        if not upload_response or not upload_response.get("response") or not upload_response["response"].get("image_info"):
+            result.update(failed_step="upload", error="Failed to upload the new image.")
+            return result
+        result["image_id"] = upload_response["response"]["image_info"]["image_id"]
+        listing = {k: v for k, v in _with_cover_image(product_template, result["image_id"]).items()
+                   if k not in PRICE_FIELDS + STOCK_FIELDS}
+        calls = [("update", target_client.update_item, (target_item_id, listing))]
+    else:
+        calls = []
+    if "price" in changed:
+        calls.append(("price", target_client.update_price, (target_item_id, product_template.get("original_price"))))
+    if "stock" in changed:
+        calls.append(("stock", target_client.update_stock, (target_item_id, product_template.get("stock_info_v2"))))
+    if "models" in changed:
+        model_calls = _model_calls(target_client, result, target_item_id, variation_template)
+        if model_calls is None:
+            return result
+        calls.extend(model_calls)
+
+    for step, call, args in calls:
+        started = time.perf_counter()
+        response = call(*args)
+        result["timings"][step] = result["timings"].get(step, 0.0) + time.perf_counter() - started
+        if not response or response.get("error") or (response.get("response") or {}).get("failure_list"):
+            result.update(failed_step=step, error=f"Failed to update the {step.replace('_', ' ')} of item {target_item_id}.")
+            return result
+    result["status"] = "success"
+    return result
+
+def _sync_item(source_item, source_product_data, entry, target_client, image_hosting_url, shop_code_for_image,
+               journal, max_attempts):
+    """Creates or updates the target listing of one new or changed source item."""
+    started = time.perf_counter()
+    item_id = int(source_item["item_id"])
+    try:
+        product_template = prepare_product_template(source_product_data)
+        variation_template = prepare_variation_template(source_product_data)
+        fingerprints = product_fingerprints(product_template, variation_template)
+        result = None
+        if entry is None:
+            # Through the journal, an item already cloned outside of sync is found instead of duplicated.
+            result = clone_with_retry(target_client, item_id, image_hosting_url, shop_code_for_image, journal=journal,
+                                      max_attempts=max_attempts, verbose=False, source_product_data=source_product_data,
+                                      product_template=product_template)
+            result["action"] = "created"
+            if result["status"] == "success" and "publish" in result.get("resumed_steps", ()):
+                # That listing may have been built from older source data, and the watermark won't list the
+                # item again until it changes: diff it against no fingerprints now, pushing every field group.
+                entry = {"target_item_id": result["new_item_id"], "fingerprints": {}}
+                result = None
+        if result is None:
+            changed = [group for group, digest in fingerprints.items() if entry["fingerprints"].get(group) != digest]
+            if source_product_data.get("has_model"):
+                # Prices and stock of items with variations are kept per model, and synced as "models".
+                changed = [group for group in changed if group not in ("price", "stock")]
+            result = _new_clone_result(item_id, shop_code_for_image)
+            result["action"] = "updated" if changed else "unchanged"
+            result["changed"] = changed
+            _update_listing(target_client, result, entry["target_item_id"], product_template, changed, image_hosting_url,
+                            variation_template)
+        result["fingerprints"] = fingerprints
+    except Exception as e:
+        result = failed_clone_result(item_id, shop_code_for_image, None, f"{type(e).__name__}: {e}")
+        result["action"] = "failed"
+    result["update_time"] = source_item.get("update_time")
+    result["elapsed"] = time.perf_counter() - started
+    return result
+
+def sync_shop(source_client, target_client, image_hosting_url, shop_code_for_image, index, max_workers=BATCH_MAX_WORKERS,
+              full=False, journal=None, max_attempts=1, on_result=None):
+    """
+    Brings the target shop in line with the source shop's listed items.
+
+    Only items updated since the pair's last sync are listed (all items on the first run, or with
+    `full`), and of those only the ones whose update_time differs from the index are fetched. New
+    items are cloned; items whose cloned fields changed have just the changed field groups
+    (listing, price, stock, or per model prices and stock) pushed to their existing target listing. The watermark only moves past
+    items that synced successfully, so failures are picked up again by the next run.
+    Returns (results, stats), or (None, None) if the source items could not be listed.
+    """
+    started = time.perf_counter()
+    run_started_at = int(time.time())
+    source_shop_id, target_shop_id = source_client.shop_id, target_client.shop_id
+
+    watermark = None if full else index.watermark(source_shop_id, target_shop_id)
+    update_time_from = watermark - SYNC_WATERMARK_OVERLAP if watermark is not None else None
+    listed = source_client.list_items(update_time_from=update_time_from,
+                                      update_time_to=run_started_at if update_time_from is not None else None)
+    if listed is None:
+        rich.print("[bold red]Error:[/bold red] could not list the source shop's items.")
+        return None, None
+
+    entries = index.entries(source_shop_id, target_shop_id, (item["item_id"] for item in listed))
+    delta = [item for item in listed
+             if item["item_id"] not in entries or entries[item["item_id"]]["update_time"] != item.get("update_time")]
+
+    details, missing = {}, {}
+    if delta:
+        delta_ids = [item["item_id"] for item in delta]
+        if source_client.details_cache is not None:
+            # These items changed at the source, so cached details of them are stale.
+            for item_id in delta_ids:
+                source_client.details_cache.invalidate(source_client.partner_id, source_shop_id, item_id)
+        details, missing = source_client.get_product_details_batch(delta_ids)
+
+    results = []
+    with ThreadPoolExecutor(max_workers=max(1, max_workers)) as executor:
+        futures = []
+        for item in delta:
+            item_id = int(item["item_id"])
+            if item_id not in details:
+                result = failed_clone_result(item_id, shop_code_for_image, "fetch",
+                                             f"Failed to fetch source product ({missing.get(item_id, 'not found')}).")
+                result.update(action="failed", update_time=item.get("update_time"), elapsed=0.0)
+                results.append(result)
+                if on_result:
+                    on_result(result)
+                continue
+            futures.append(executor.submit(_sync_item, item, details[item_id], entries.get(item_id), target_client,
+                                           image_hosting_url, shop_code_for_image, journal, max_attempts))
+        for future in as_completed(futures):
+            result = future.result()
+            if result["status"] == "success":
+                index.record(source_shop_id, target_shop_id, result["source_item_id"], result["new_item_id"],
+                             result["update_time"], result["fingerprints"])
+            results.append(result)
+            if on_result:
+                on_result(result)
+
+    failed_update_times = [r["update_time"] for r in results if r["status"] != "success" and r["update_time"]]
+    index.set_watermark(source_shop_id, target_shop_id, min(failed_update_times) if failed_update_times else run_started_at)
+
+    stats = summarize_results(results, time.perf_counter() - started)
+    stats.update(
+        listed=len(listed),
+        skipped=len(listed) - len(delta),
+        created=sum(1 for r in results if r.get("action") == "created" and r["status"] == "success"),
+        updated=sum(1 for r in results if r.get("action") == "updated" and r["status"] == "success"),
+        unchanged=sum(1 for r in results if r.get("action") == "unchanged"),
+    )
+    return results, stats
+
+def print_sync_report(results, stats):
+    """Prints what a sync run did and any failures."""
+    rich.print(f"\n[bold]Listed {stats['listed']} source item(s) updated since the last sync[/bold] "
+               f"({stats['skipped']} already in sync, {stats['total']} checked in {stats['elapsed']:.1f}s).")
+    rich.print(f"  [green]{stats['created']} created[/green], [cyan]{stats['updated']} updated[/cyan], "
+               f"{stats['unchanged']} unchanged, [red]{stats['failed']} failed[/red]")
+    for r in results:
+        if r["status"] != "success":
+            rich.print(f"  [red]✗[/red] {r['source_item_id']}: failed at {r['failed_step'] or 'error'} - {r['error']}")
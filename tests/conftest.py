@@ -0,0 +1,27 @@
+# tests/conftest.py: Fixtures shared by the tests, which run against an in-process MockShopeeServer.
+
+import pytest
+
+from mock_shopee_server import MockShopeeServer
+from platforms.rate_limiter import RequestScheduler
+from platforms.shopee_client import ShopeeClient
+from platforms.token_manager import TokenManager
+
+@pytest.fixture
+def mock():
+    """A mock Shopee API with five source items and no added latency."""
+    with MockShopeeServer(latency=0, jitter=0, catalog_size=5) as server:
+        yield server
+
+@pytest.fixture
+def client_for(mock):
+    """
+    Returns client_for(profile, cls=ShopeeClient, **kwargs): a client of the mock with unlimited quotas
+    and token managers of its own, so refreshed tokens are not written to the local profile store.
+    """
+    def client_for(profile, cls=ShopeeClient, **kwargs):
+        kwargs.setdefault("scheduler", RequestScheduler(partner_qps=1e9, shop_qps=1e9, path_qps={}, safety_factor=1.0))
+        kwargs.setdefault("token_manager", TokenManager(save_tokens=None))
+        kwargs.setdefault("merchant_token_manager", TokenManager(save_tokens=None, owner="merchant"))
+        return cls.from_profile(profile, base_url=mock.api_url, **kwargs)
+    return client_for
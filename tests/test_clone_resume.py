@@ -0,0 +1,110 @@
+# tests/test_clone_resume.py: Clones killed or cut off mid-way resume from the job journal without duplicating listings.
+
+import pytest
+
+import product_processor
+from job_journal import JobJournal
+from product_processor import clone_single_product, clone_with_retry
+
+SHOP_ID = 200
+
+class Killed(BaseException):
+    """Stands in for the process dying: nothing in the pipeline catches it."""
+
+def _kill_after(client, method_name):
+    """Makes the client's `method_name` send its call, then kill the run before the response is seen."""
+    send = getattr(client, method_name)
+    def call(*args):
+        send(*args)
+        raise Killed()
+    setattr(client, method_name, call)
+
+@pytest.fixture
+def journal_path(tmp_path):
+    return str(tmp_path / "journal.db")
+
+def _recorded_steps(journal_path):
+    journal = JobJournal(journal_path)
+    try:
+        return journal.completed_steps(1, "ONE", SHOP_ID)
+    finally:
+        journal.close()
+
+@pytest.fixture
+def clone(mock, client_for, journal_path):
+    """
+    Returns clone(kill_after=None): one run of the process cloning source item 1 into the target shop,
+    with a fresh client and journal connection. With `kill_after`, the run dies once that client method's call is sent.
+    """
+    def clone(kill_after=None):
+        client = client_for(mock.make_profile(SHOP_ID))
+        if kill_after:
+            _kill_after(client, kill_after)
+        journal = JobJournal(journal_path)
+        try:
+            return clone_single_product(client, 1, mock.image_url, "ONE", verbose=False, journal=journal)
+        finally:
+            journal.close()
+    return clone
+
+def test_run_killed_after_create_started_finds_its_item_instead_of_creating_another(mock, clone, journal_path):
+    with pytest.raises(Killed):
+        clone(kill_after="create_item")
+
+    recorded = _recorded_steps(journal_path)
+    assert {"create_started", "upload", "variation_images"} <= recorded.keys()
+    assert "create" not in recorded
+    assert len(mock.items) == 1 # The create call went through; only its response was lost
+    uploads = mock.calls["/media_space/upload_image"]
+
+    result = clone()
+
+    assert result["status"] == "success"
+    [item_id] = mock.items
+    assert result["new_item_id"] == item_id
+    assert mock.items[item_id]["item_status"] == "NORMAL"
+    assert mock.calls["/product/add_item"] == 1
+    assert mock.calls["/product/search_item"] == 1
+    # The upload steps resumed from the journal rather than uploading again.
+    assert result["resumed_steps"] == ["upload", "variation_images"]
+    assert mock.calls["/media_space/upload_image"] == uploads
+
+    recorded = _recorded_steps(journal_path)
+    assert recorded["create"]["item_id"] == item_id
+    assert recorded["publish"]["item_id"] == item_id
+
+def test_run_killed_mid_variations_continues_with_the_next_batch(mock, clone):
+    mock.models_per_item = 60 # Two batches: init_tier_variation with 50 models, then add_model with 10
+    with pytest.raises(Killed):
+        clone(kill_after="add_model")
+
+    result = clone()
+
+    assert result["status"] == "success"
+    [item_id] = mock.items
+    assert len(mock.items[item_id]["model"]) == 60
+    assert mock.calls["/product/add_item"] == 1
+    assert mock.calls["/product/init_tier_variation"] == 1
+    # The batch whose response was lost is checked against the model list instead of being sent again.
+    assert mock.calls["/product/add_model"] == 1
+    assert mock.calls["/product/get_model_list"] >= 1
+    assert "create" in result["resumed_steps"]
+
+def test_lost_create_response_is_found_by_the_next_attempt(mock, client_for, monkeypatch):
+    monkeypatch.setattr(product_processor, "_retry_delay", lambda attempt: 0)
+    client = client_for(mock.make_profile(SHOP_ID))
+    create_item = client.create_item
+    lost = []
+    def create_once_then_lose_response(item_data):
+        response = create_item(item_data)
+        if not lost:
+            lost.append(response)
+            return None
+        return response
+    client.create_item = create_once_then_lose_response
+
+    result = clone_with_retry(client, 1, mock.image_url, "ONE", verbose=False, max_attempts=2)
+
+    assert result["status"] == "success" and result["attempts"] == 2
+    assert list(mock.items) == [result["new_item_id"]]
+    assert mock.calls["/product/add_item"] == 1
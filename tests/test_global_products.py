@@ -0,0 +1,95 @@
+# tests/test_global_products.py: Global (CNSC) product clones, signed with the merchant's main-account token.
+
+import asyncio
+
+from fanout_processor import clone_to_shops, group_by_merchant
+from platforms.shopee_async_client import AsyncShopeeClient
+from platforms.token_manager import TokenManager
+from product_processor import clone_with_retry_async
+from profile_store import ProfileStore
+
+MERCHANT_ID = 77
+
+def _merchant_profiles(mock, count=3):
+    return {f"shop{index}": mock.make_profile(400 + index, merchant_id=MERCHANT_ID) for index in range(count)}
+
+def test_fanout_publishes_one_global_item_to_every_merchant_shop(mock, client_for):
+    source_client = client_for(mock.make_profile(100))
+    profiles = _merchant_profiles(mock)
+
+    results = list(clone_to_shops(source_client, 1, profiles, "ONE", client_factory=client_for, global_product=True))
+
+    assert sorted(result["status"] for result in results) == ["success"] * 3
+    assert len(mock.global_items) == 1
+    assert mock.calls["/global_product/add_global_item"] == 1
+    assert "/product/add_item" not in mock.calls
+    [global_item_id] = mock.global_items
+    for result in results:
+        item = mock.items[result["new_item_id"]]
+        assert item["shop_id"] == result["shop_id"]
+        assert item["global_item_id"] == global_item_id
+        assert item["item_name"] # The shop's own listing is sent with its publish task
+
+def test_global_calls_are_rejected_with_a_shop_token(mock, client_for):
+    profile = mock.make_profile(400, merchant_id=MERCHANT_ID)
+    client = client_for(dict(profile, merchant_access_token=profile["access_token"], merchant_refresh_token=None),
+                        merchant_token_manager=None)
+
+    assert client.get_global_item_list() is None
+    assert mock.calls["/global_product/get_global_item_list"] == 1
+
+def test_profiles_without_a_merchant_token_are_cloned_one_by_one(mock, client_for):
+    profiles = _merchant_profiles(mock, count=2)
+    for key in ("merchant_access_token", "merchant_refresh_token"):
+        del profiles["shop1"][key]
+
+    merchants, shops = group_by_merchant(profiles)
+
+    assert list(merchants) == [(1, MERCHANT_ID)]
+    assert list(merchants[(1, MERCHANT_ID)]) == ["shop0"]
+    assert list(shops) == ["shop1"]
+    assert not client_for(profiles["shop1"]).supports_global_items()
+
+def test_merchant_token_is_refreshed_and_saved_per_merchant(mock, client_for):
+    saved = []
+    merchant_tokens = TokenManager(save_tokens=lambda *args: saved.append(args), owner="merchant")
+    client = client_for(mock.make_profile(400, merchant_id=MERCHANT_ID), merchant_token_manager=merchant_tokens)
+
+    assert client.get_global_item_list() is not None
+
+    [(partner_id, merchant_id, tokens)] = saved
+    assert (partner_id, merchant_id) == (1, MERCHANT_ID)
+    assert tokens["access_token"].startswith(f"mock-merchant-token-{MERCHANT_ID}-")
+    assert client.merchant_access_token == tokens["access_token"]
+    assert client.access_token == "mock-token-400" # The shop's own token is untouched
+
+def test_async_client_clones_a_global_item(mock, client_for):
+    source_data = client_for(mock.make_profile(100)).get_product_details(2)["response"]["item_list"][0]
+    profiles = list(_merchant_profiles(mock, count=2).values())
+    shops = [{"shop_id": profile["shop_id"], "shop_region": profile["region"]} for profile in profiles]
+
+    async def clone():
+        async with client_for(profiles[0], cls=AsyncShopeeClient) as client:
+            return await clone_with_retry_async(client, 2, mock.image_url, "ONE", verbose=False,
+                                                source_product_data=source_data, global_shops=shops)
+
+    result = asyncio.run(clone())
+
+    assert result["status"] == "success"
+    assert sorted(result["published"]) == [400, 401]
+
+def test_profile_store_saves_merchant_tokens_to_every_shop_of_the_merchant(tmp_path):
+    store = ProfileStore(str(tmp_path / "profiles.db"))
+    store.save_many({
+        "a": {"partner_id": 1, "shop_id": 1, "merchant_id": MERCHANT_ID},
+        "b": {"partner_id": 1, "shop_id": 2, "merchant_id": MERCHANT_ID},
+        "c": {"partner_id": 1, "shop_id": 3, "merchant_id": 78},
+    })
+
+    updated = store.update_merchant_tokens(1, MERCHANT_ID, {"merchant_access_token": "new", "merchant_expire_at": 5.0})
+
+    assert updated == 2
+    profiles = store.all()
+    assert [profiles[name].get("merchant_access_token") for name in "abc"] == ["new", "new", None]
+    assert profiles["a"]["merchant_expire_at"] == 5.0
+    store.close()
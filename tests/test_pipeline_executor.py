@@ -0,0 +1,202 @@
+# tests/test_pipeline_executor.py: The step DAG runner, with stub steps and stub platform calls.
+
+import asyncio
+import threading
+
+import pytest
+
+from pipeline_executor import StepFailed, pipeline_step, run_pipeline, run_pipeline_async
+
+def _calling(*method_names):
+    """A step making one call per method name; its output is the list of responses."""
+    def run(context, outputs):
+        responses = []
+        for method_name in method_names:
+            responses.append((yield (method_name, ())))
+        return responses
+    return run
+
+def _failing(message, retryable=True, after_call=None):
+    def run(context, outputs):
+        if after_call:
+            yield (after_call, ())
+        raise StepFailed(message, retryable)
+    return run
+
+def _call_log():
+    """A stub `call` returning "<method>-ok", and the list of methods it was called with."""
+    log = []
+    def call(method_name, args):
+        log.append(method_name)
+        return f"{method_name}-ok"
+    return call, log
+
+def test_runs_steps_in_dependency_order_and_records_journaled_ones():
+    steps = [
+        pipeline_step("fetch", _calling("get"), journaled=True),
+        pipeline_step("create", _calling("add"), after=("fetch",), journaled=True),
+        pipeline_step("publish", lambda context, outputs: outputs["create"][0].upper(), after=("create",)),
+    ]
+    call, log = _call_log()
+    recorded = {}
+
+    outcome = run_pipeline(steps, call, {}, record=recorded.__setitem__)
+
+    assert log == ["get", "add"]
+    assert outcome["failed"] is None
+    assert outcome["outputs"] == {"fetch": ["get-ok"], "create": ["add-ok"], "publish": "ADD-OK"}
+    assert recorded == {"fetch": ["get-ok"], "create": ["add-ok"]}
+    assert set(outcome["timings"]) == {"fetch", "create"} # The plain step made no calls
+
+def test_journaled_steps_completed_earlier_are_not_run_again():
+    steps = [
+        pipeline_step("fetch", _calling("get")),
+        pipeline_step("create", _calling("add"), after=("fetch",), journaled=True),
+        pipeline_step("publish", _calling("list"), after=("create",)),
+    ]
+    call, log = _call_log()
+    recorded = {}
+
+    outcome = run_pipeline(steps, call, {}, completed={"create": ["add-earlier"]}, record=recorded.__setitem__)
+
+    # fetch is only needed by create, which was recorded, so it is skipped too.
+    assert log == ["list"]
+    assert outcome["outputs"]["create"] == ["add-earlier"]
+    assert "fetch" not in outcome["outputs"]
+    assert recorded == {}
+
+def test_unjournaled_steps_are_not_restored_from_completed():
+    steps = [pipeline_step("fetch", _calling("get")), pipeline_step("publish", _calling("list"), after=("fetch",))]
+    call, log = _call_log()
+
+    run_pipeline(steps, call, {}, completed={"fetch": ["stale"]})
+
+    assert log == ["get", "list"]
+
+def test_unneeded_steps_are_skipped_but_final_ones_still_run():
+    steps = [
+        pipeline_step("fetch", _calling("get")),
+        pipeline_step("upload", _calling("upload"), after=("fetch",), journaled=True),
+        pipeline_step("create", _calling("add"), after=("upload",), journaled=True),
+        pipeline_step("report", _calling("report"), after=("fetch",)), # Final, so always needed
+    ]
+    call, log = _call_log()
+
+    outcome = run_pipeline(steps, call, {}, completed={"upload": ["u"]})
+
+    assert sorted(log) == ["add", "get", "report"]
+    assert outcome["failed"] is None
+
+def test_step_failure_stops_dependents_and_keeps_retryable_flag():
+    steps = [
+        pipeline_step("fetch", _calling("get")),
+        pipeline_step("create", _failing("rejected", retryable=False, after_call="add"), after=("fetch",)),
+        pipeline_step("publish", _calling("list"), after=("create",)),
+    ]
+    call, log = _call_log()
+
+    outcome = run_pipeline(steps, call, {})
+
+    name, error = outcome["failed"]
+    assert name == "create"
+    assert str(error) == "rejected" and error.retryable is False
+    assert log == ["get", "add"]
+    assert "create" in outcome["timings"] # Time spent before failing still counts
+
+def test_step_failing_before_any_call_is_retryable_by_default():
+    steps = [pipeline_step("fetch", _failing("timeout"))]
+    call, log = _call_log()
+
+    name, error = run_pipeline(steps, call, {})["failed"]
+
+    assert (name, error.retryable) == ("fetch", True)
+    assert log == []
+
+def test_running_sibling_finishes_and_is_recorded_after_a_failure():
+    release = threading.Event()
+
+    def call(method_name, args):
+        if method_name == "slow":
+            assert release.wait(5)
+        return method_name
+
+    def fail_then_release(context, outputs):
+        yield ("fast", ())
+        release.set()
+        raise StepFailed("bad image")
+
+    steps = [
+        pipeline_step("fetch", _calling("get")),
+        pipeline_step("upload", fail_then_release, after=("fetch",)),
+        pipeline_step("variations", _calling("slow"), after=("fetch",), journaled=True),
+        pipeline_step("create", _calling("add"), after=("upload", "variations")),
+    ]
+    recorded = {}
+
+    outcome = run_pipeline(steps, call, {}, record=recorded.__setitem__)
+
+    assert outcome["failed"][0] == "upload"
+    assert recorded == {"variations": ["slow"]}
+    assert "create" not in outcome["outputs"]
+
+def test_independent_steps_make_their_calls_concurrently_on_threads():
+    # The two uploads each wait until both have started, so this only finishes if they run at the same time.
+    barrier = threading.Barrier(2, timeout=5)
+    threads = {}
+
+    def call(method_name, args):
+        threads[method_name] = threading.current_thread().name
+        if method_name.startswith("upload"):
+            barrier.wait()
+        return method_name
+
+    steps = [
+        pipeline_step("fetch", _calling("get")),
+        pipeline_step("upload", _calling("upload"), after=("fetch",)),
+        pipeline_step("variation_images", _calling("upload_variation"), after=("fetch",)),
+        pipeline_step("create", _calling("add"), after=("upload", "variation_images")),
+    ]
+
+    outcome = run_pipeline(steps, call, {})
+
+    assert outcome["failed"] is None
+    assert outcome["outputs"]["create"] == ["add"]
+    assert threads["upload"] != threads["upload_variation"]
+    assert threads["upload"].startswith("pipeline-step")
+    # A lone step runs in the calling thread.
+    assert threads["get"] == threads["add"] == threading.current_thread().name
+
+def test_steps_must_be_declared_after_the_steps_they_need():
+    steps = [pipeline_step("create", _calling("add"), after=("fetch",)), pipeline_step("fetch", _calling("get"))]
+
+    with pytest.raises(ValueError):
+        run_pipeline(steps, _call_log()[0], {})
+
+def test_async_pipeline_runs_independent_steps_concurrently_and_reports_failures():
+    async def scenario():
+        both_started = asyncio.Barrier(2)
+        log = []
+
+        async def call(method_name, args):
+            log.append(method_name)
+            if method_name.startswith("upload"):
+                await asyncio.wait_for(both_started.wait(), 5)
+            return method_name
+
+        steps = [
+            pipeline_step("fetch", _calling("get"), journaled=True),
+            pipeline_step("upload", _calling("upload"), after=("fetch",)),
+            pipeline_step("variation_images", _calling("upload_variation"), after=("fetch",)),
+            pipeline_step("create", _failing("rejected", retryable=False, after_call="add"),
+                          after=("upload", "variation_images")),
+            pipeline_step("publish", _calling("list"), after=("create",)),
+        ]
+        recorded = {}
+        outcome = await run_pipeline_async(steps, call, {}, record=recorded.__setitem__)
+        return outcome, log, recorded
+
+    outcome, log, recorded = asyncio.run(scenario())
+
+    assert outcome["failed"][0] == "create" and outcome["failed"][1].retryable is False
+    assert log[0] == "get" and sorted(log[1:3]) == ["upload", "upload_variation"] and log[3:] == ["add"]
+    assert recorded == {"fetch": ["get"]}
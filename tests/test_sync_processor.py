@@ -0,0 +1,119 @@
+# tests/test_sync_processor.py: Incremental sync pushes only the changed field groups and moves the watermark.
+
+import time
+
+import pytest
+
+from job_journal import JobJournal
+from product_processor import clone_with_retry
+from sync_index import SyncIndex
+from sync_processor import sync_shop
+
+SOURCE_SHOP_ID, TARGET_SHOP_ID = 100, 200
+OLD_UPDATE_TIME = 1700000000 # update_time of every untouched mock source item
+
+@pytest.fixture
+def index(tmp_path):
+    index = SyncIndex(str(tmp_path / "sync_index.db"))
+    yield index
+    index.close()
+
+@pytest.fixture
+def journal(tmp_path):
+    journal = JobJournal(str(tmp_path / "journal.db"))
+    yield journal
+    journal.close()
+
+@pytest.fixture
+def sync(mock, client_for, index, journal):
+    """Returns sync(**kwargs): one sync_shop run from the source shop into the target shop."""
+    source_client = client_for(mock.make_profile(SOURCE_SHOP_ID))
+    target_client = client_for(mock.make_profile(TARGET_SHOP_ID))
+    def sync(**kwargs):
+        return sync_shop(source_client, target_client, mock.image_url, "ONE", index, journal=journal, **kwargs)
+    return sync
+
+def _calls(mock, *paths):
+    return {path: mock.calls.get(f"/product/{path}", 0) for path in paths}
+
+def _target_item(mock, results, source_item_id):
+    [result] = [r for r in results if r["source_item_id"] == source_item_id]
+    return result, mock.items[result["new_item_id"]]
+
+def test_only_the_changed_field_groups_are_pushed(mock, sync, index):
+    results, stats = sync()
+    assert stats["created"] == 5
+    # Make the next run list every item again, as if the last sync were long ago.
+    index.set_watermark(SOURCE_SHOP_ID, TARGET_SHOP_ID, OLD_UPDATE_TIME)
+    mock.touch(2, price_info=[{"original_price": 25.0, "current_price": 25.0, "currency": "SGD"}])
+    mock.touch(3, stock_info_v2={"seller_stock": [{"stock": 7}]})
+    mock.touch(4, description="A new description.")
+    before = _calls(mock, "get_item_base_info", "update_item", "update_price", "update_stock", "add_item")
+    run_started = int(time.time())
+
+    results, stats = sync()
+
+    assert (stats["listed"], stats["skipped"], stats["updated"], stats["failed"]) == (5, 2, 3, 0)
+    after = _calls(mock, *before)
+    assert after["get_item_base_info"] - before["get_item_base_info"] == 1 # Only the 3 changed items, in one batch
+    assert after["add_item"] == before["add_item"]
+    assert after["update_price"] - before["update_price"] == 1
+    assert after["update_stock"] - before["update_stock"] == 1
+    assert after["update_item"] - before["update_item"] == 1
+
+    result, item = _target_item(mock, results, 2)
+    assert result["changed"] == ["price"] and item["original_price"] == 25.0
+    result, item = _target_item(mock, results, 3)
+    assert result["changed"] == ["stock"] and item["stock_info_v2"] == {"seller_stock": [{"stock": 7}]}
+    result, item = _target_item(mock, results, 4)
+    assert result["changed"] == ["listing"] and item["description"] == "A new description."
+    assert index.watermark(SOURCE_SHOP_ID, TARGET_SHOP_ID) >= run_started
+
+def test_unchanged_items_are_not_fetched_again(mock, sync, index):
+    sync()
+    watermark = index.watermark(SOURCE_SHOP_ID, TARGET_SHOP_ID)
+    fetches = mock.calls["/product/get_item_base_info"]
+
+    results, stats = sync()
+
+    assert results == [] and stats["listed"] == 0
+    assert mock.calls["/product/get_item_base_info"] == fetches
+    assert index.watermark(SOURCE_SHOP_ID, TARGET_SHOP_ID) >= watermark
+
+def test_watermark_stays_at_a_failed_item_until_it_syncs(mock, sync, index):
+    sync()
+    mock.touch(2, price_info=[{"original_price": 30.0, "current_price": 30.0, "currency": "SGD"}])
+    touched_at = mock._source(2)["update_time"]
+    update_price = mock.routes["/product/update_price"]
+    mock.routes["/product/update_price"] = lambda shop_id, body: {"error": "error_server", "message": "Unavailable."}
+
+    results, stats = sync()
+
+    assert stats["failed"] == 1 and results[0]["failed_step"] == "price"
+    assert index.watermark(SOURCE_SHOP_ID, TARGET_SHOP_ID) == touched_at
+
+    mock.routes["/product/update_price"] = update_price
+    run_started = int(time.time())
+    results, stats = sync()
+
+    assert stats["updated"] == 1
+    result, item = _target_item(mock, results, 2)
+    assert result["changed"] == ["price"] and item["original_price"] == 30.0
+    assert index.watermark(SOURCE_SHOP_ID, TARGET_SHOP_ID) >= run_started
+
+def test_item_cloned_before_its_first_sync_gets_every_field_group_pushed(mock, client_for, sync, journal):
+    # Cloned outside of sync (recorded in the same journal), then changed at the source before the first sync.
+    clone = clone_with_retry(client_for(mock.make_profile(TARGET_SHOP_ID)), 1, mock.image_url, "ONE", journal=journal,
+                             verbose=False)
+    mock.touch(1, description="Changed after the clone.")
+    mock.catalog_size = 1
+
+    results, stats = sync()
+
+    [result] = results
+    assert result["status"] == "success" and result["new_item_id"] == clone["new_item_id"]
+    # No fingerprints were recorded for the listing, so it is diffed against none and fully pushed.
+    assert result["action"] == "updated"
+    assert result["changed"] == ["listing", "price", "stock"]
+    assert list(mock.items) == [clone["new_item_id"]]
+    assert mock.items[clone["new_item_id"]]["description"] == "Changed after the clone."
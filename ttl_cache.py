@@ -0,0 +1,184 @@
+# ttl_cache.py: Thread-safe LRU cache with per-entry TTL and optional JSON persistence.
+
+import atexit
+import json
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError: # Windows: saves aren't serialized across processes
+    fcntl = None
+
+# Persistent caches are flushed to disk this often (seconds) by a background thread while they have
+# changes, and once more when the process exits.
+SAVE_INTERVAL = 2.0
+
+@contextmanager
+def _file_lock(path):
+    """Holds an exclusive lock on `path`.lock, so processes sharing a cache file save one at a time."""
+    with open(f"{path}.lock", "a") as lock_file:
+        if fcntl is not None:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+        yield
+
+class TTLCache:
+    """
+    Keeps at most `max_entries` string-keyed, JSON-serializable values, evicting the least recently
+    used entry when full. Entries older than `ttl` seconds are treated as missing.
+    If `path` is given the cache is loaded from and saved to that JSON file, off the calling threads.
+    Several processes may share the file: each save merges in the entries the others saved since.
+    """
+
+    def __init__(self, max_entries, ttl, path=None):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.path = path
+        self._entries = OrderedDict() # key -> (expires_at, value); wall-clock time so it survives restarts
+        self._lock = threading.RLock()
+        self._dirty = False
+        self._removed = set() # keys invalidated since the last save, so merging doesn't bring them back
+        self._cleared = False
+        self._save_lock = threading.Lock() # Serializes saves; never held together with _lock during file I/O
+        self.hits = 0
+        self.misses = 0
+        if path:
+            self._load()
+            atexit.register(self.save)
+            threading.Thread(target=self._flush_periodically, name="ttl-cache-flush", daemon=True).start()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        return self.get(key) is not None
+
+    def get(self, key, default=None):
+        """Returns the cached value, or `default` if it is missing or expired."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] < time.time():
+                if entry is not None:
+                    del self._entries[key]
+                    self._dirty = True
+                self.misses += 1
+                return default
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key, value, ttl=None):
+        with self._lock:
+            self._entries[key] = (time.time() + (self.ttl if ttl is None else ttl), value)
+            self._entries.move_to_end(key)
+            self._removed.discard(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            self._dirty = True
+
+    def invalidate(self, key):
+        """Removes one entry. Returns True if it was cached."""
+        with self._lock:
+            removed = self._entries.pop(key, None) is not None
+            if self.path:
+                self._removed.add(key)
+                self._dirty = True
+            return removed
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._removed.clear()
+            self._cleared = True
+            self._dirty = True
+            if self.path:
+                self.save()
+
+    def _read_file(self):
+        """The unexpired entries stored in the cache file, oldest first, as {key: (expires_at, value)}."""
+        try:
+            with open(self.path, "r") as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return {}
+        except (json.JSONDecodeError, OSError):
+            print(f"Warning: Could not read cache file {self.path}. Ignoring its entries.")
+            return {}
+        now = time.time()
+        # Stored oldest-first, so LRU order is preserved.
+        return OrderedDict((key, (expires_at, value)) for key, expires_at, value in data.get("entries", [])
+                           if expires_at >= now)
+
+    def _trim(self):
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def _load(self):
+        self._entries.update(self._read_file())
+        self._trim()
+
+    def _flush_periodically(self):
+        while True:
+            time.sleep(SAVE_INTERVAL)
+            try:
+                self.save()
+            except OSError as e:
+                print(f"Warning: Could not save cache file {self.path}: {e}")
+
+    def _merged(self, entries, removed, stored):
+        """
+        Our entries plus the file's entries that other processes saved, oldest first. Ours stay the most
+        recently used; for a key both have, the one set later (expiring later) wins.
+        """
+        merged = OrderedDict((key, entry) for key, entry in stored.items() if key not in entries and key not in removed)
+        for key, entry in entries.items():
+            theirs = stored.get(key)
+            merged[key] = theirs if theirs is not None and theirs[0] > entry[0] else entry
+        while len(merged) > self.max_entries:
+            merged.popitem(last=False)
+        return merged
+
+    def save(self):
+        """
+        Atomically writes the cache to its file, if it has one and has changed. The entries are copied
+        under the lock; reading, merging and writing the file happen outside it, so lookups never wait on disk.
+        """
+        if not self.path:
+            return
+        with self._save_lock:
+            with self._lock:
+                if not self._dirty:
+                    return
+                entries, removed, cleared = OrderedDict(self._entries), set(self._removed), self._cleared
+                self._dirty, self._cleared = False, False
+                self._removed.clear()
+            try:
+                with _file_lock(self.path):
+                    merged = entries if cleared else self._merged(entries, removed, self._read_file())
+                    # A temp file of our own, so concurrent saves never write into each other's
+                    with tempfile.NamedTemporaryFile("w", dir=os.path.dirname(os.path.abspath(self.path)),
+                                                     prefix=f"{os.path.basename(self.path)}.", suffix=".tmp", delete=False) as f:
+                        json.dump({"entries": [[key, expires_at, value] for key, (expires_at, value) in merged.items()]}, f)
+                    try:
+                        os.replace(f.name, self.path)
+                    except OSError:
+                        os.unlink(f.name)
+                        raise
+            except BaseException:
+                with self._lock: # Not saved: keep the changes for the next attempt
+                    self._dirty = True
+                    self._removed |= removed
+                    self._cleared = self._cleared or cleared
+                raise
+            with self._lock:
+                # Adopt what other processes saved, behind our own entries, unless changed here meanwhile.
+                if not self._cleared:
+                    for key in reversed(merged):
+                        if key not in self._entries and key not in self._removed and key not in entries:
+                            self._entries[key] = merged[key]
+                            self._entries.move_to_end(key, last=False)
+                    self._trim()
@@ -1,34 +1,68 @@
 # user_manager.py: Manages user data and access tokens
 
 import json
-import streamlit as st
+import sys
+from pathlib import Path
 
-USERS_FILE = "users.json"
+from profile_store import get_default_profile_store
+
+# Where Streamlit looks for secrets.toml (global, then project).
+_SECRETS_FILES = (Path.home() / ".streamlit" / "secrets.toml", Path(".streamlit") / "secrets.toml")
+
+_secrets_profiles = None # (raw secret, parsed profiles), so reruns don't re-parse the secret
+
+def _profiles_from_secrets():
+    """Profiles deployed through st.secrets["shopee_profiles"], or None when there are none."""
+    global _secrets_profiles
+    # Importing streamlit takes longer than the rest of the CLI's startup together, so it is only
+    # imported when it is already running (the web app) or there is a secrets file for it to read.
+    if "streamlit" not in sys.modules and not any(path.is_file() for path in _SECRETS_FILES):
+        return None
+    import streamlit as st
+    try:
+        if not hasattr(st, 'secrets') or "shopee_profiles" not in st.secrets:
+            return None
+    except FileNotFoundError:
+        # No secrets.toml at all, the usual case when running locally.
+        return None
+    raw = st.secrets["shopee_profiles"]
+    if _secrets_profiles is None or _secrets_profiles[0] != raw:
+        _secrets_profiles = (raw, json.loads(raw))
+    return {username: dict(profile) for username, profile in _secrets_profiles[1].items()}
 
 def load_users():
     """
     Loads user profiles.
     In Streamlit Cloud, it loads from st.secrets.
-    For local development, it falls back to users.json.
+    For local development, it reads the local profile store (seeded from users.json on first use).
     """
     # Prefer loading from Streamlit secrets if the app is deployed
-    if hasattr(st, 'secrets') and "shopee_profiles" in st.secrets:
-        return json.loads(st.secrets["shopee_profiles"])
-
-    # Fallback to local users.json file for local development
-    try:
-        with open(USERS_FILE, 'r') as f:
-            return json.load(f)
-    except FileNotFoundError:
-        # This is expected if the file hasn't been created yet locally.
-        return {}
-    except json.JSONDecodeError:
-        # This indicates a corrupted file.
-        print(f"Warning: Could not parse {USERS_FILE}. Returning empty profiles.")
-        return {}
+    profiles = _profiles_from_secrets()
+    if profiles is not None:
+        return profiles
+    return get_default_profile_store().all()
 
+def save_user(username, profile):
+    """Saves one profile to the local profile store (for local use only)."""
+    get_default_profile_store().save(username, profile)
 
 def save_users(users):
-    """Saves the users dictionary to the JSON file (for local use only)."""
-    with open(USERS_FILE, 'w') as f:
-        json.dump(users, f, indent=4)
+    """Saves every profile in the users dictionary to the local profile store (for local use only)."""
+    get_default_profile_store().save_many(users)
+
+def update_profile_tokens(partner_id, shop_id, tokens):
+    """
+    Writes refreshed tokens ({"access_token", "refresh_token", "expire_at"}) back to every local
+    profile of the shop. Profiles deployed through st.secrets can't be written and keep their
+    tokens in memory only.
+    """
+    get_default_profile_store().update_tokens(partner_id, shop_id, tokens)
+
+def update_merchant_tokens(partner_id, merchant_id, tokens):
+    """
+    Writes a merchant's refreshed main-account tokens ({"access_token", "refresh_token", "expire_at"})
+    back to every local profile of its shops, as merchant_access_token, merchant_refresh_token and
+    merchant_expire_at.
+    """
+    get_default_profile_store().update_merchant_tokens(
+        partner_id, merchant_id, {f"merchant_{key}": value for key, value in tokens.items()})